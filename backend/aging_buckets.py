@@ -0,0 +1,182 @@
+# aging_buckets.py
+from __future__ import annotations
+
+import logging
+import os
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from db import engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+#
+# Aging buckets shared by every aging fact table: in SQL where the
+# table is derived on the server, in pandas where it is built in the
+# loader. Both bucket a given number of days the same way.
+# -------------------------------------------------------------------
+
+# "upper bound in days (inclusive):label", ascending
+AGING_BUCKETS_SPEC = os.getenv(
+    "AGING_BUCKETS", "365:0-1Y,730:1-2Y,1825:2-5Y,2555:5-7Y,3650:7-10Y"
+)
+# Beyond the last bound. Rows with unknown days get no bucket (NULL).
+AGING_OVERFLOW_BUCKET = os.getenv("AGING_OVERFLOW_BUCKET", "10+Y")
+
+# Rows per UPDATE when re-bucketing history
+REBUCKET_CHUNK_ROWS = int(os.getenv("REBUCKET_CHUNK_ROWS", "50000"))
+
+DAYS_PER_YEAR = 365.0
+
+# Label columns are VARCHAR(10)
+_MAX_LABEL_LENGTH = 10
+
+
+def _parse_buckets(spec: str) -> tuple[np.ndarray, list[str]]:
+    bounds, labels = [], []
+    for item in spec.split(","):
+        bound, _, label = item.partition(":")
+        bounds.append(int(bound))
+        labels.append(label.strip())
+    labels.append(AGING_OVERFLOW_BUCKET)
+
+    if any(b >= a for b, a in zip(bounds, bounds[1:])):
+        raise ValueError(f"AGING_BUCKETS bounds must be ascending: {spec}")
+    if any(not label or len(label) > _MAX_LABEL_LENGTH for label in labels):
+        raise ValueError(
+            f"Aging bucket labels must be 1-{_MAX_LABEL_LENGTH} characters"
+        )
+    return np.array(bounds, dtype="int64"), labels
+
+
+# Upper bounds in days, and one label per bound plus the overflow label
+AGING_BOUNDS, AGING_LABELS = _parse_buckets(AGING_BUCKETS_SPEC)
+
+
+class AgingTable(NamedTuple):
+    """
+    A fact table with an aging_bucket column computed from days_column.
+    days_sql, when set, fills days_column where it is still NULL.
+    """
+
+    table: str
+    days_column: str
+    days_sql: str | None = None
+
+
+# Days since the date of income, for rows that only carry the date
+DAYS_OF_INCOME_SQL = "DATEDIFF(snapshot_date, date_of_income)"
+
+AGING_TABLES = [
+    AgingTable("fact_aging", "days"),
+    AgingTable("fact_final_aging", "days"),
+    AgingTable("fact_odoo_aging", "days_since_last_incoming"),
+    AgingTable("fact_zmmr015_power", "days", DAYS_OF_INCOME_SQL),
+]
+
+
+# -------------------------------------------------------------------
+# Bucketing
+# -------------------------------------------------------------------
+
+
+def aging_bucket_sql(days: str) -> str:
+    """
+    CASE expression bucketing the SQL expression `days`; NULL when days
+    is NULL.
+    """
+    whens = "\n".join(
+        f"                    WHEN {days} <= {bound} THEN '{label}'"
+        for bound, label in zip(AGING_BOUNDS, AGING_LABELS)
+    )
+    return (
+        f"CASE\n"
+        f"                    WHEN {days} IS NULL THEN NULL\n"
+        f"{whens}\n"
+        f"                    ELSE '{AGING_OVERFLOW_BUCKET}'\n"
+        f"                END"
+    )
+
+
+def aging_buckets(days: pd.Series) -> pd.Series:
+    """
+    Bucket label per row of a days column, as aging_bucket_sql would:
+    one searchsorted pass over the bounds, then a take of the labels.
+    Unknown days get None.
+    """
+    values = pd.to_numeric(days, errors="coerce").astype("float64")
+    unknown = values.isna().to_numpy()
+    positions = np.searchsorted(
+        AGING_BOUNDS, values.fillna(np.inf).to_numpy(), side="left"
+    )
+    buckets = np.array(AGING_LABELS, dtype=object)[positions]
+    buckets[unknown] = None
+    return pd.Series(buckets, index=days.index, dtype=object)
+
+
+# -------------------------------------------------------------------
+# Re-bucketing history
+# -------------------------------------------------------------------
+
+
+def _rebucket_table(conn: Connection, aging: AgingTable) -> int:
+    """
+    Rewrite aging_bucket in place, REBUCKET_CHUNK_ROWS ids per UPDATE and
+    transaction, touching only rows whose bucket changes.
+    """
+    low, high = conn.execute(
+        text(f"SELECT MIN(id), MAX(id) FROM `{aging.table}`")
+    ).one()
+    if low is None:
+        return 0
+
+    column = f"`{aging.days_column}`"
+    days = column
+    sets = []
+    if aging.days_sql:
+        # Bucket the filled-in value; assignment order is not relied on
+        days = f"COALESCE({column}, {aging.days_sql})"
+        sets.append(f"{column} = {days}")
+    sets.append(f"aging_bucket = {aging_bucket_sql(days)}")
+    # Null-safe comparison; labels are never empty
+    changed = (
+        f"COALESCE(aging_bucket, '') <> COALESCE({aging_bucket_sql(days)}, '')"
+    )
+    if aging.days_sql:
+        # Rows without days that days_sql can fill; rows it cannot fill
+        # would otherwise be rewritten on every run
+        changed = f"(({column} IS NULL AND {days} IS NOT NULL) OR {changed})"
+    sql = text(
+        f"""
+        UPDATE `{aging.table}`
+        SET {", ".join(sets)}
+        WHERE id >= :low AND id < :high AND {changed}
+        """
+    )
+
+    rows = 0
+    for start in range(low, high + 1, REBUCKET_CHUNK_ROWS):
+        rows += conn.execute(
+            sql, {"low": start, "high": start + REBUCKET_CHUNK_ROWS}
+        ).rowcount
+        conn.commit()
+    logger.info("%s: re-bucketed %d rows", aging.table, rows)
+    return rows
+
+
+def rebucket_aging(upload_batch_id: str, snapshot_date: date) -> int:
+    """
+    Ingest job: recompute aging_bucket for every snapshot of every aging
+    table with the current AGING_BUCKETS, e.g. after changing them.
+    snapshot_date is only the day the job was queued. Returns the number
+    of rows changed.
+    """
+    with engine.connect() as conn:
+        return sum(_rebucket_table(conn, aging) for aging in AGING_TABLES)
@@ -0,0 +1,120 @@
+# bench_kernels.py
+"""
+Row-wise apply vs the vectorized kernels in kernels.py, on synthetic
+columns shaped like the Odoo aging and ZMM345E extracts.
+
+    python benchmarks/bench_kernels.py [rows]
+"""
+from __future__ import annotations
+
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from kernels import days_since, zero_pad  # noqa: E402
+
+
+# -------------------------------------------------------------------
+# Previous row-wise implementations
+# -------------------------------------------------------------------
+
+
+def _days_since_apply(values: pd.Series, snapshot_date: date) -> pd.Series:
+    def _days_since(d):
+        if pd.isna(d):
+            return None
+        if isinstance(d, datetime):
+            d = d.date()
+        if isinstance(d, date):
+            return (snapshot_date - d).days
+        return None
+
+    return values.apply(_days_since)
+
+
+def _sloc_apply(values: pd.Series) -> pd.Series:
+    def _sloc_to_str(v):
+        if pd.isna(v):
+            return None
+        try:
+            return f"{int(v):04d}"
+        except Exception:
+            return str(v).strip()
+
+    return values.apply(_sloc_to_str)
+
+
+# -------------------------------------------------------------------
+# Data and timing
+# -------------------------------------------------------------------
+
+
+def _make_dates(rows: int, rng: np.random.Generator) -> pd.Series:
+    days = rng.integers(0, 4000, rows)
+    dates = (pd.Timestamp("2014-01-01") + pd.to_timedelta(days, unit="D")).date
+    values = pd.Series(dates, dtype=object)
+    values[rng.random(rows) < 0.05] = None
+    return values
+
+
+def _make_slocs(rows: int, rng: np.random.Generator) -> pd.Series:
+    choices = np.array([1, 20, 300, "0005", " 12 ", "A100", None], dtype=object)
+    return pd.Series(rng.choice(choices, rows), dtype=object)
+
+
+def _best_of(fn, repeat: int = 3) -> tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(rows: int) -> None:
+    rng = np.random.default_rng(0)
+    snapshot_date = date(2025, 1, 31)
+    dates = _make_dates(rows, rng)
+    slocs = _make_slocs(rows, rng)
+
+    def as_days(s):
+        return pd.to_numeric(s).astype("Int64")
+
+    def as_text(s):
+        return s.astype(object).where(s.notna(), None)
+
+    # (name, row-wise, vectorized, normalizer for the equality check)
+    cases = [
+        (
+            "days_since",
+            lambda: _days_since_apply(dates, snapshot_date),
+            lambda: days_since(dates, snapshot_date),
+            as_days,
+        ),
+        (
+            "zero_pad",
+            lambda: _sloc_apply(slocs),
+            lambda: zero_pad(slocs, 4),
+            as_text,
+        ),
+    ]
+
+    print(f"{rows} rows")
+    print(f"{'kernel':<12} {'apply s':>9} {'vector s':>9} {'speedup':>8}")
+    for name, old, new, normalize in cases:
+        old_s, old_result = _best_of(old)
+        new_s, new_result = _best_of(new)
+        if not normalize(old_result).equals(normalize(new_result)):
+            raise AssertionError(f"{name}: vectorized result differs")
+        print(f"{name:<12} {old_s:>9.3f} {new_s:>9.3f} {old_s / new_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,141 @@
+# bench_readers.py
+"""
+Parse time per reader backend (readers.READERS) on synthetic files with
+the MB52 and ZSDR030A layouts, read the way run_source reads them (only
+the spec's columns, text columns as str). Every backend must return the
+same frame as the openpyxl baseline.
+
+    python benchmarks/bench_readers.py [rows]
+"""
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import readers  # noqa: E402
+from source_spec import _read_dtypes, resolve_columns  # noqa: E402
+from sources import SOURCES  # noqa: E402
+
+# Columns in the files that no spec reads
+_UNUSED_COLUMNS = 10
+
+
+# -------------------------------------------------------------------
+# Data
+# -------------------------------------------------------------------
+
+
+def _column(name: str, kind: str | None, rows: int, rng: np.random.Generator):
+    if kind in ("number", "number_text"):
+        values = pd.Series(rng.random(rows) * 1000).round(2)
+    elif kind == "int":
+        values = pd.Series(rng.integers(0, 4000, rows), dtype="float64")
+    elif kind == "date":
+        days = rng.integers(0, 4000, rows)
+        values = pd.Timestamp("2014-01-01") + pd.to_timedelta(days, unit="D")
+        values = pd.Series(values)
+    else:
+        values = pd.Series([f"{name[:3].upper()}{i % 997:05d}" for i in range(rows)])
+    return values.mask(rng.random(rows) < 0.02)
+
+
+def _make_frame(spec_name: str, rows: int, rng: np.random.Generator):
+    spec = SOURCES[spec_name]
+    columns = {}
+    for name, headers in spec.columns.items():
+        header = headers if isinstance(headers, str) else headers[0]
+        if header not in columns:
+            columns[header] = _column(name, spec.kinds.get(name), rows, rng)
+    for i in range(_UNUSED_COLUMNS):
+        columns[f"Unused {i}"] = _column("unused", None, rows, rng)
+    return pd.DataFrame(columns)
+
+
+def _write_files(df: pd.DataFrame, directory: Path, stem: str) -> dict[str, Path]:
+    paths = {s: directory / f"{stem}{s}" for s in (".xlsx", ".csv", ".parquet")}
+    df.to_excel(paths[".xlsx"], index=False)
+    df.to_csv(paths[".csv"], index=False)
+    df.to_parquet(paths[".parquet"], index=False)
+    return paths
+
+
+# -------------------------------------------------------------------
+# Timing
+# -------------------------------------------------------------------
+
+
+def _read(path: Path, spec_name: str, chunksize: int = 0) -> pd.DataFrame:
+    spec = SOURCES[spec_name]
+    resolved = resolve_columns(spec, readers.read_header(path))
+    usecols = set(resolved.values()).__contains__
+    dtype = _read_dtypes(spec, resolved)
+    frames = list(readers.read_chunks(path, chunksize, usecols, dtype))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _best_of(fn, repeat: int = 3) -> tuple[float, pd.DataFrame]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _same(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    try:
+        pd.testing.assert_frame_equal(a, b, check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def main(rows: int) -> None:
+    rng = np.random.default_rng(0)
+    backends = [
+        ("openpyxl", ".xlsx", "openpyxl", 0),
+        ("openpyxl chunked", ".xlsx", "openpyxl", 10_000),
+        ("calamine", ".xlsx", "calamine", 0),
+        ("pyarrow csv", ".csv", None, 0),
+        ("pyarrow csv chunked", ".csv", None, 10_000),
+        ("parquet", ".parquet", None, 0),
+    ]
+    if readers._excel_engine() != "calamine":
+        readers.EXCEL_ENGINE = "calamine"
+        if readers._excel_engine() != "calamine":
+            backends = [b for b in backends if b[0] != "calamine"]
+            print("python-calamine not installed; skipping calamine")
+        readers.EXCEL_ENGINE = "openpyxl"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec_name in ("MB52", "ZSDR030A"):
+            df = _make_frame(spec_name, rows, rng)
+            paths = _write_files(df, Path(tmp), spec_name.lower())
+
+            print(f"\n{spec_name}: {rows} rows x {len(df.columns)} columns")
+            print(f"{'backend':<20} {'seconds':>8} {'vs openpyxl':>12}")
+            baseline_s, baseline = None, None
+            for label, suffix, engine, chunksize in backends:
+                if engine:
+                    readers.EXCEL_ENGINE = engine
+                seconds, frame = _best_of(
+                    lambda: _read(paths[suffix], spec_name, chunksize)
+                )
+                if baseline is None:
+                    baseline_s, baseline = seconds, frame
+                elif not _same(baseline, frame):
+                    raise AssertionError(f"{spec_name}/{label}: frame differs")
+                print(f"{label:<20} {seconds:>8.3f} {baseline_s / seconds:>11.1f}x")
+            readers.EXCEL_ENGINE = "openpyxl"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
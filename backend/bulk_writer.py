@@ -0,0 +1,242 @@
+# bulk_writer.py
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# "multirow": batched multi-row INSERT statements
+# "infile":   LOAD DATA LOCAL INFILE from a temporary CSV
+BULK_WRITE_MODE = os.getenv("BULK_WRITE_MODE", "multirow").lower()
+
+# Target number of cells (rows x columns) per multi-row INSERT. Keeps each
+# statement well below MariaDB's max_allowed_packet for wide tables while
+# still sending hundreds of rows per round trip for narrow ones.
+INSERT_BATCH_CELLS = int(os.getenv("INSERT_BATCH_CELLS", "20000"))
+INSERT_BATCH_MAX_ROWS = int(os.getenv("INSERT_BATCH_MAX_ROWS", "5000"))
+
+NULL_TOKEN = "\\N"
+
+# Table name overrides for this process: a replace-mode job points its
+# loader at staging tables through these (see snapshot_replace.py).
+# Ingest workers run one job at a time, so process-wide state is safe.
+_table_overrides: dict[str, str] = {}
+
+
+@dataclass
+class WriteStats:
+    table: str
+    mode: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _batch_rows(df: pd.DataFrame) -> int:
+    ncols = max(len(df.columns), 1)
+    return max(1, min(INSERT_BATCH_MAX_ROWS, INSERT_BATCH_CELLS // ncols))
+
+
+def _ensure_table(df: pd.DataFrame, table: str, conn: Connection) -> None:
+    # Zero-row append creates the table (pandas type mapping) when missing
+    df.head(0).to_sql(table, conn, if_exists="append", index=False)
+
+
+def _write_multirow(df: pd.DataFrame, table: str, conn: Connection) -> None:
+    df.to_sql(
+        table,
+        conn,
+        if_exists="append",
+        index=False,
+        method="multi",
+        chunksize=_batch_rows(df),
+    )
+
+
+def _to_load_data_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepare values for LOAD DATA: booleans as 0/1, backslashes escaped
+    (FIELDS ESCAPED BY '\\'), everything else left to to_csv.
+    """
+    out = df.copy()
+    for col in out.columns:
+        s = out[col]
+        if pd.api.types.is_bool_dtype(s):
+            out[col] = s.astype("Int8")
+        elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            out[col] = s.map(
+                lambda v: v.replace("\\", "\\\\") if isinstance(v, str) else v
+            )
+    return out
+
+
+def _write_infile(df: pd.DataFrame, table: str, conn: Connection) -> None:
+    _ensure_table(df, table, conn)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{table}_", suffix=".csv")
+    os.close(fd)
+    try:
+        _to_load_data_frame(df).to_csv(
+            tmp_path,
+            index=False,
+            header=False,
+            na_rep=NULL_TOKEN,
+            quoting=csv.QUOTE_MINIMAL,
+            lineterminator="\n",
+        )
+        columns = ", ".join(f"`{c}`" for c in df.columns)
+        conn.execute(
+            text(
+                f"""
+                LOAD DATA LOCAL INFILE :path
+                INTO TABLE `{table}`
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                ({columns})
+                """
+            ),
+            {"path": tmp_path},
+        )
+    finally:
+        os.remove(tmp_path)
+
+
+_WRITERS = {
+    "multirow": _write_multirow,
+    "infile": _write_infile,
+}
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+@contextmanager
+def redirect_tables(overrides: dict[str, str]) -> Iterator[None]:
+    """
+    Within the block, write_frame writes table t to overrides[t].
+    """
+    _table_overrides.update(overrides)
+    try:
+        yield
+    finally:
+        for table in overrides:
+            _table_overrides.pop(table, None)
+
+
+def target_table(table: str) -> str:
+    return _table_overrides.get(table, table)
+
+
+def write_frame(
+    df: pd.DataFrame,
+    table: str,
+    bind: Engine | Connection,
+    mode: str | None = None,
+) -> WriteStats:
+    """
+    Append df to table using the configured bulk write mode.
+
+    When given an Engine the whole frame is written in one explicit
+    transaction (no per-statement autocommit); when given a Connection the
+    caller owns the transaction. Loaders pass one Connection for the whole
+    upload batch, so every table commits once and a failure rolls back all
+    of them.
+    """
+    mode = (mode or BULK_WRITE_MODE).lower()
+    if mode not in _WRITERS:
+        raise ValueError(f"Unknown bulk write mode: {mode}")
+    writer = _WRITERS[mode]
+    table = target_table(table)
+
+    start = time.perf_counter()
+    if len(df) > 0:
+        if isinstance(bind, Engine):
+            with bind.begin() as conn:
+                writer(df, table, conn)
+        else:
+            writer(df, table, bind)
+    stats = WriteStats(
+        table=table,
+        mode=mode,
+        rows=len(df),
+        seconds=time.perf_counter() - start,
+    )
+
+    logger.info(
+        "%s: wrote %d rows via %s in %.2fs (%.0f rows/s)",
+        stats.table,
+        stats.rows,
+        stats.mode,
+        stats.seconds,
+        stats.rows_per_second,
+    )
+    return stats
+
+
+def insert_from_batch(
+    conn: Connection,
+    table: str,
+    source_table: str,
+    select: dict[str, str],
+    upload_batch_id: str,
+) -> int:
+    """
+    Derive rows of `table` on the server from the rows of one upload batch
+    already written to `source_table`:
+
+        INSERT INTO table (keys) SELECT values FROM source_table
+        WHERE upload_batch_id = :batch_id
+
+    `select` maps each target column to an SQL expression over the source
+    columns. The data never travels back through the client.
+    """
+    table = target_table(table)
+    source_table = target_table(source_table)
+    columns = ", ".join(f"`{c}`" for c in select)
+    exprs = ",\n                ".join(select.values())
+
+    start = time.perf_counter()
+    rows = conn.execute(
+        text(
+            f"""
+            INSERT INTO `{table}` ({columns})
+            SELECT
+                {exprs}
+            FROM `{source_table}`
+            WHERE upload_batch_id = :batch_id
+            """
+        ),
+        {"batch_id": upload_batch_id},
+    ).rowcount
+    seconds = time.perf_counter() - start
+
+    logger.info(
+        "%s: derived %d rows from %s in %.2fs", table, rows, source_table, seconds
+    )
+    return rows
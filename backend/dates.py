@@ -0,0 +1,198 @@
+# dates.py
+from __future__ import annotations
+
+import logging
+import os
+import re
+import warnings
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from kernels import text_mask
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# Text values sampled per column to infer its date format
+DATE_SAMPLE_ROWS = int(os.getenv("DATE_SAMPLE_ROWS", "200"))
+# A cached format is re-inferred when it parses less than this share of
+# a new sample (the source changed its layout)
+DATE_FORMAT_MIN_HIT_RATE = float(os.getenv("DATE_FORMAT_MIN_HIT_RATE", "0.9"))
+
+# "2024-06-03": dayfirst never applies when the year leads
+_YEAR_FIRST = re.compile(r"\d{4}\D")
+
+# (source, column) -> inferred strftime format, per process
+_format_cache: dict[tuple[str, str], str | None] = {}
+
+# "source.column" -> values set to NaT, while a job collects them (see
+# collect_coerced). Ingest workers run one job at a time.
+_coerced: Counter | None = None
+
+
+class ParsedDates(NamedTuple):
+    dates: pd.Series
+    # Non-empty values that could not be parsed and became NaT
+    coerced: int
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _hit_rate(sample: pd.Series, fmt: str) -> float:
+    parsed = pd.to_datetime(sample, format=fmt, errors="coerce")
+    return parsed.notna().mean() if len(sample) else 0.0
+
+
+def _guess(values: pd.Series, dayfirst: bool) -> pd.Series:
+    with warnings.catch_warnings():
+        # guess_datetime_format warns when a guess contradicts dayfirst
+        warnings.simplefilter("ignore", UserWarning)
+        return values.map(
+            lambda v: guess_datetime_format(
+                v, dayfirst=dayfirst and not _YEAR_FIRST.match(v)
+            )
+        )
+
+
+def _parse_outliers(text: pd.Series, dayfirst: bool) -> pd.Series:
+    """
+    Rows that do not match the column format: guess a format per value
+    and parse each group of same-format values in one pass. Values with
+    no guessable format ("3-Jun-24") get the historical dayfirst parse,
+    one by one.
+    """
+    guessed = _guess(text, dayfirst)
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt, group in text.groupby(guessed):
+        parsed[group.index] = pd.to_datetime(group, format=fmt, errors="coerce")
+    unguessed = text[guessed.isna()]
+    if len(unguessed):
+        parsed[unguessed.index] = pd.to_datetime(
+            unguessed, errors="coerce", dayfirst=dayfirst, format="mixed"
+        )
+    return parsed
+
+
+def _infer_format(sample: pd.Series, dayfirst: bool) -> str | None:
+    """
+    The candidate format (one guess per distinct sample value) that
+    parses the most sample values.
+    """
+    guesses = Counter(_guess(pd.Series(sample.unique()), dayfirst).dropna())
+    if not guesses:
+        return None
+    candidates = [fmt for fmt, _ in guesses.most_common()]
+    return max(candidates, key=lambda fmt: _hit_rate(sample, fmt))
+
+
+def _column_format(
+    text: pd.Series, source: str, column: str, dayfirst: bool
+) -> str | None:
+    sample = text.head(DATE_SAMPLE_ROWS)
+    key = (source, column)
+    fmt = _format_cache.get(key)
+    if fmt is not None and _hit_rate(sample, fmt) >= DATE_FORMAT_MIN_HIT_RATE:
+        return fmt
+
+    fmt = _infer_format(sample, dayfirst)
+    _format_cache[key] = fmt
+    logger.info("%s.%s: inferred date format %s", source, column, fmt)
+    return fmt
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+@contextmanager
+def collect_coerced() -> Iterator[Counter]:
+    """
+    Count the values parse_dates sets to NaT inside the block, per
+    "source.column".
+    """
+    global _coerced
+    previous, _coerced = _coerced, Counter()
+    try:
+        yield _coerced
+    finally:
+        _coerced = previous
+
+
+def parse_dates(
+    values: pd.Series | None,
+    source: str,
+    column: str,
+    dayfirst: bool = True,
+) -> ParsedDates:
+    """
+    Vectorized replacement for pd.to_datetime(values, errors="coerce",
+    dayfirst=...). Text is parsed in one pass with a format inferred
+    once per (source, column); only rows that do not match it go through
+    the per-element parser. Values that still fail become NaT; their
+    count is returned, logged and added to collect_coerced.
+    """
+    if values is None:
+        return ParsedDates(pd.Series(pd.NaT, dtype="datetime64[ns]"), 0)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return ParsedDates(values, 0)
+
+    is_text = text_mask(values)
+
+    text = values[is_text].astype(str).str.strip()
+    text = text[text != ""]
+    # Excel date cells arrive as datetimes already; numbers keep the
+    # historical to_datetime behavior
+    other = values[~is_text & values.notna()]
+
+    result = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    fallback = 0
+    fmt = None
+    if len(text):
+        fmt = _column_format(text, source, column, dayfirst)
+        if fmt is not None:
+            parsed = pd.to_datetime(text, format=fmt, errors="coerce")
+        else:
+            parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+        outliers = parsed.isna()
+        fallback = int(outliers.sum())
+        if fallback:
+            parsed[outliers] = _parse_outliers(text[outliers], dayfirst)
+        result[text.index] = parsed
+    if len(other):
+        result[other.index] = pd.to_datetime(
+            other, errors="coerce", dayfirst=dayfirst
+        )
+
+    total = len(text) + len(other)
+    coerced = int(result[text.index.union(other.index)].isna().sum())
+    if coerced:
+        if _coerced is not None:
+            _coerced[f"{source}.{column}"] += coerced
+        logger.warning(
+            "%s.%s: %d of %d date values could not be parsed (set to NULL)",
+            source,
+            column,
+            coerced,
+            total,
+        )
+    elif fallback:
+        logger.info(
+            "%s.%s: %d of %d date values needed the fallback parser (format %s)",
+            source,
+            column,
+            fallback,
+            total,
+            fmt,
+        )
+    return ParsedDates(result, coerced)
@@ -1,8 +1,13 @@
 # db.py
 import os
+import threading
+import time
 from datetime import datetime, date
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 
 # -------------------------------------------------------------------
 # Database configuration
@@ -13,58 +18,136 @@ DATABASE_URL = os.getenv(
     "mysql+pymysql://sapuser:sap_password@db:3306/sap_reporting",
 )
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Pool sizing, per process. Each ingest worker holds one connection per
+# running job; the API process also serves reads, so size it for
+# concurrent requests plus background tasks. Keep
+# (API + workers) x (pool_size + max_overflow) under max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+# Below MariaDB's wait_timeout so idle connections are replaced, not reused
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "3600"))
+
+# Checkouts slower than this count as waits on a saturated pool
+SLOW_CHECKOUT_SECONDS = float(os.getenv("DB_SLOW_CHECKOUT_SECONDS", "0.1"))
 
 
 # -------------------------------------------------------------------
-# Helpers
+# Instrumented pool
 # -------------------------------------------------------------------
 
 
-def ensure_core_tables() -> None:
+class InstrumentedQueuePool(QueuePool):
     """
-    Create core / shared tables if they do not exist.
-    For now we enforce the MB52-like raw + fact tables.
+    QueuePool that records checkout latency and saturation counters.
     """
-    create_raw_mb52 = """
-    CREATE TABLE IF NOT EXISTS raw_mb52 (
-        id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
-        upload_batch_id VARCHAR(36) NOT NULL,
-        bukrs VARCHAR(4) NULL,
-        werks VARCHAR(4) NULL,
-        lgort VARCHAR(10) NULL,
-        matnr VARCHAR(40) NULL,
-        mat_desc VARCHAR(255) NULL,
-        charg VARCHAR(20) NULL,
-        labst DECIMAL(18,3) NULL,
-        value_unrestricted DECIMAL(18,2) NULL,
-        meins VARCHAR(10) NULL,
-        snapshot_date DATE NOT NULL
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.slow_checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+        in_use = self.checkedout()
+        with self._stats_lock:
+            self.checkouts += 1
+            self.checkout_seconds_total += elapsed
+            self.checkout_seconds_max = max(self.checkout_seconds_max, elapsed)
+            if elapsed >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+            if in_use > self.size():
+                self.overflow_checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, in_use)
+        return conn
+
+    def recreate(self):
+        # Engine.dispose() swaps in a fresh pool; keep counting there
+        new_pool = super().recreate()
+        with self._stats_lock:
+            for name in (
+                "checkouts",
+                "checkout_seconds_total",
+                "checkout_seconds_max",
+                "slow_checkouts",
+                "overflow_checkouts",
+                "timeouts",
+                "peak_checked_out",
+            ):
+                setattr(new_pool, name, getattr(self, name))
+        return new_pool
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            avg = self.checkout_seconds_total / checkouts if checkouts else 0.0
+            return {
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": checkouts,
+                "checkout_ms_avg": round(1000 * avg, 3),
+                "checkout_ms_max": round(1000 * self.checkout_seconds_max, 3),
+                "slow_checkouts": self.slow_checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+            }
+
+
+def make_engine(url: str = DATABASE_URL) -> Engine:
     """
+    The one way to build an engine. Modules share the process-wide
+    `engine` below rather than calling this themselves.
+    """
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True,
+        # local_infile lets bulk_writer use LOAD DATA LOCAL INFILE
+        connect_args={"local_infile": True},
+    )
+
+
+engine = make_engine()
 
-    create_fact_inventory_snapshot = """
-    CREATE TABLE IF NOT EXISTS fact_inventory_snapshot (
-        id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
-        upload_batch_id VARCHAR(36) NOT NULL,
-        bukrs VARCHAR(4) NULL,
-        werks VARCHAR(4) NULL,
-        lgort VARCHAR(10) NULL,
-        matnr VARCHAR(40) NULL,
-        mat_desc VARCHAR(255) NULL,
-        charg VARCHAR(20) NULL,
-        qty DECIMAL(18,3) NULL,
-        value_unrestricted DECIMAL(18,2) NULL,
-        meins VARCHAR(10) NULL,
-        snapshot_date DATE NOT NULL,
-        source VARCHAR(20) NOT NULL,
-        total_value DECIMAL(18,2) NULL
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+def pool_metrics() -> dict:
+    """
+    Checkout latency and saturation counters for this process's pool.
     """
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.metrics()
+    return {"status": pool.status()}
 
-    with engine.begin() as conn:
-        conn.execute(text(create_raw_mb52))
-        conn.execute(text(create_fact_inventory_snapshot))
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
 
 
 def parse_snapshot_date(snapshot_date_str: str | None) -> date:
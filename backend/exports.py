@@ -0,0 +1,169 @@
+# exports.py
+from __future__ import annotations
+
+import csv
+import io
+import os
+import re
+import zlib
+from typing import Iterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from db import engine
+from schema import TABLES
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# Rows fetched from the server-side cursor at a time; also the Parquet
+# row group size
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd")
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+
+def exportable_tables() -> list[str]:
+    return [
+        name for name in TABLES if name.startswith(("fact_", "dim_", "agg_"))
+    ]
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _arrow_type(decl: str) -> pa.DataType:
+    """
+    Arrow type for a column declaration in schema.py, so every row group
+    of an export has the same schema.
+    """
+    t = decl.strip().upper()
+    decimal = re.match(r"DECIMAL\((\d+),\s*(\d+)\)", t)
+    if decimal:
+        return pa.decimal128(int(decimal.group(1)), int(decimal.group(2)))
+    if t.startswith(("TINYINT", "SMALLINT", "INT", "BIGINT")):
+        return pa.int64()
+    if t.startswith("DATETIME"):
+        return pa.timestamp("ms")
+    if t.startswith("DATE"):
+        return pa.date32()
+    return pa.string()
+
+
+def _arrow_schema(table: str) -> pa.Schema:
+    return pa.schema(
+        [(name, _arrow_type(decl)) for name, decl in TABLES[table].all_columns]
+    )
+
+
+def _batches(
+    table: str, filters: dict[str, object]
+) -> Iterator[tuple[list[str], list[tuple]]]:
+    """
+    (columns, rows) in batches of EXPORT_BATCH_ROWS, read through an
+    unbuffered server-side cursor so the client never holds more than
+    one batch.
+    """
+    columns = TABLES[table].column_names
+    where = " AND ".join(f"`{c}` = :{c}" for c in filters)
+    sql = f"SELECT {', '.join(f'`{c}`' for c in columns)} FROM `{table}`"
+    if where:
+        sql += f" WHERE {where}"
+
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, max_row_buffer=EXPORT_BATCH_ROWS
+        ).execute(text(sql), filters)
+        for rows in result.partitions(EXPORT_BATCH_ROWS):
+            yield columns, [tuple(row) for row in rows]
+
+
+def _csv_chunks(table: str, filters: dict[str, object]) -> Iterator[bytes]:
+    gzip = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(TABLES[table].column_names)
+
+    for _, rows in _batches(table, filters):
+        writer.writerows(rows)
+        chunk = gzip.compress(buffer.getvalue().encode())
+        buffer.seek(0)
+        buffer.truncate()
+        if chunk:
+            yield chunk
+    yield gzip.compress(buffer.getvalue().encode()) + gzip.flush()
+
+
+class _Drain(io.RawIOBase):
+    """
+    Write-only sink whose bytes are taken out after every row group.
+    """
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet_chunks(table: str, filters: dict[str, object]) -> Iterator[bytes]:
+    schema = _arrow_schema(table)
+    sink = _Drain()
+    with pq.ParquetWriter(
+        sink, schema, compression=EXPORT_PARQUET_COMPRESSION
+    ) as writer:
+        for columns, rows in _batches(table, filters):
+            data = dict(zip(columns, zip(*rows)))
+            writer.write_table(pa.table(data, schema=schema))
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    # The footer is written on close
+    yield sink.take()
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+def export_chunks(
+    table: str, filters: dict[str, object], fmt: str
+) -> Iterator[bytes]:
+    """
+    The rows of `table` matching the equality filters as a stream of
+    bytes: gzip-compressed CSV, or Parquet with one row group per batch.
+    Memory use is bounded by EXPORT_BATCH_ROWS whatever the table size.
+    """
+    if table not in exportable_tables():
+        raise ValueError(f"{table} cannot be exported")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    missing = set(filters) - set(TABLES[table].column_names)
+    if missing:
+        raise ValueError(f"{table} has no column {', '.join(sorted(missing))}")
+
+    if fmt == "csv":
+        return _csv_chunks(table, filters)
+    return _parquet_chunks(table, filters)
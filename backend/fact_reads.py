@@ -0,0 +1,227 @@
+# fact_reads.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import bindparam, text
+
+from aging_buckets import AGING_TABLES
+from db import engine
+from schema import TABLES
+from sources import SOURCES
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# Bytes of JSON pages kept in memory across all tables and queries
+READ_CACHE_BYTES = int(os.getenv("READ_CACHE_BYTES", str(64 * 1024 * 1024)))
+READ_MAX_PAGE_ROWS = int(os.getenv("READ_MAX_PAGE_ROWS", "10000"))
+# How long a table's data version is reused before asking the database
+# again; a new batch shows up in responses at most this much later
+READ_VERSION_TTL_SECONDS = float(os.getenv("READ_VERSION_TTL_SECONDS", "5"))
+
+# Fact tables served by GET /facts/{table}
+READ_TABLES = ("fact_inventory_snapshot", "fact_aging", "fact_zsdr030a")
+FILTER_COLUMNS = ("snapshot_date", "werks", "matnr")
+
+# Jobs that rewrite rows of existing snapshots in place
+_MAINTENANCE_WRITERS = {"REBUCKET_AGING": [aging.table for aging in AGING_TABLES]}
+
+# Jobs that write each table, by source; a finished job of any of them
+# changes the table's data version
+_WRITERS: dict[str, list[str]] = {
+    table: [name for name, spec in SOURCES.items() if table in spec.tables]
+    + [job for job, tables in _MAINTENANCE_WRITERS.items() if table in tables]
+    for table in READ_TABLES
+}
+
+# (table, filters, after, limit, version) -> JSON page, least recently
+# used first, and the total size of the pages
+_pages: OrderedDict[tuple, bytes] = OrderedDict()
+_pages_bytes = 0
+_pages_lock = threading.Lock()
+
+# table -> (monotonic time checked, version)
+_versions: dict[str, tuple[float, str]] = {}
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def parse_cursor(cursor: str) -> tuple[date, int]:
+    """
+    "2025-01-31:1234" -> (snapshot_date, id). Raises ValueError.
+    """
+    day, _, row_id = cursor.partition(":")
+    return date.fromisoformat(day), int(row_id)
+
+
+def _cursor(row: dict) -> str:
+    # str() of a date is its ISO form
+    return f"{row['snapshot_date']}:{row['id']}"
+
+
+def _cached_page(key: tuple) -> bytes | None:
+    with _pages_lock:
+        body = _pages.get(key)
+        if body is not None:
+            _pages.move_to_end(key)
+        return body
+
+
+def _cache_page(key: tuple, body: bytes) -> None:
+    """
+    Keep body, dropping least recently used pages until the cache fits in
+    READ_CACHE_BYTES. A page larger than the whole budget is not kept.
+    """
+    global _pages_bytes
+
+    if len(body) > READ_CACHE_BYTES:
+        return
+    with _pages_lock:
+        if key in _pages:
+            return
+        _pages[key] = body
+        _pages_bytes += len(body)
+        while _pages_bytes > READ_CACHE_BYTES:
+            _, dropped = _pages.popitem(last=False)
+            _pages_bytes -= len(dropped)
+
+
+def _query_page(
+    table: str,
+    filters: tuple[tuple[str, object], ...],
+    after: tuple[date, int] | None,
+    limit: int,
+) -> bytes:
+    columns = ", ".join(f"`{c}`" for c in TABLES[table].column_names)
+    where = [f"`{c}` = :{c}" for c, _ in filters]
+    params = {"limit": limit + 1, **dict(filters)}
+    if after is not None:
+        where.append(
+            "(snapshot_date > :after_date "
+            "OR (snapshot_date = :after_date AND id > :after_id))"
+        )
+        params.update(after_date=after[0], after_id=after[1])
+
+    with engine.connect() as conn:
+        rows = (
+            conn.execute(
+                text(
+                    f"""
+                    SELECT {columns}
+                    FROM `{table}`
+                    {"WHERE " + " AND ".join(where) if where else ""}
+                    ORDER BY snapshot_date, id
+                    LIMIT :limit
+                    """
+                ),
+                params,
+            )
+            .mappings()
+            .all()
+        )
+
+    # One extra row tells whether another page follows
+    page = [dict(row) for row in rows[:limit]]
+    next_cursor = _cursor(page[-1]) if len(rows) > limit else None
+    return json.dumps(
+        {"rows": page, "next": next_cursor}, default=_json_default
+    ).encode()
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+def data_version(table: str) -> str:
+    """
+    Batch id of the latest finished job that wrote `table`, and the
+    table's oldest snapshot date, which moves when retention drops a
+    partition. A failed job counts too: a rebucket commits its chunks as
+    it goes. Reused for READ_VERSION_TTL_SECONDS.
+    """
+    now = time.monotonic()
+    cached = _versions.get(table)
+    if cached is not None and now - cached[0] < READ_VERSION_TTL_SECONDS:
+        return cached[1]
+
+    with engine.connect() as conn:
+        batch_id = conn.execute(
+            text(
+                """
+                SELECT upload_batch_id FROM ingest_jobs
+                WHERE status IN ('done', 'failed') AND source IN :sources
+                ORDER BY finished_at DESC
+                LIMIT 1
+                """
+            ).bindparams(bindparam("sources", expanding=True)),
+            {"sources": _WRITERS[table]},
+        ).scalar()
+        oldest = conn.execute(
+            text(f"SELECT MIN(snapshot_date) FROM `{table}`")
+        ).scalar()
+    version = f"{batch_id or 'empty'}:{oldest}"
+    _versions[table] = (now, version)
+    return version
+
+
+def page_etag(
+    table: str,
+    filters: dict[str, object],
+    after: tuple[date, int] | None,
+    limit: int,
+    version: str,
+) -> str:
+    key = json.dumps(
+        [table, sorted(filters.items()), after, limit, version],
+        default=_json_default,
+    )
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+def read_page(
+    table: str,
+    filters: dict[str, object],
+    after: tuple[date, int] | None,
+    limit: int,
+    version: str,
+) -> bytes:
+    """
+    One page of `table` as JSON: {"rows": [...], "next": cursor}. Rows
+    come in (snapshot_date, id) order after the keyset `after` (None for
+    the first page); pass the parsed `next` back for the following page,
+    null on the last one. Filters are equality tests on FILTER_COLUMNS.
+    """
+    if table not in READ_TABLES:
+        raise ValueError(f"{table} is not readable")
+    unknown = set(filters) - set(FILTER_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot filter on {', '.join(sorted(unknown))}")
+    # version only keys the cache: a new batch makes older pages
+    # unreachable and they age out of the LRU
+    key = (table, tuple(sorted(filters.items())), after, limit, version)
+    body = _cached_page(key)
+    if body is None:
+        body = _query_page(table, key[1], after, limit)
+        _cache_page(key, body)
+    return body
@@ -0,0 +1,290 @@
+# final_aging.py
+from __future__ import annotations
+
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from aging_buckets import DAYS_PER_YEAR, aging_buckets
+from bulk_writer import write_frame
+from db import engine
+from schema import project_to_table
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Final aging
+#
+# ZMMR014 restarts the date of income when stock moves between systems.
+# The stock's real age comes from the earlier receipt recorded in
+# ZMMR015 Power or in Odoo, which used to be looked up by hand into the
+# "ZMMR015 Power", "Odoo" and "Final Aging" columns of the ZMMR014
+# export. For every fact_aging row of the snapshot's latest ZMMR014 batch:
+#   - ZMMR015 Power: the latest date of income of the same plant and
+#     material on or before the ZMMR014 one (as-of join)
+#   - Odoo: the latest incoming date of the same product on or before
+#     the ZMMR014 date, product_code mapped to matnr
+# and the earliest of the three dates is the final date of income. Rows
+# without a ZMMR014 date look up the latest dates on or before the
+# snapshot date instead.
+# -------------------------------------------------------------------
+
+# Candidate date column per source, in order of preference on ties
+_CANDIDATES = {
+    "ZMMR014": "zmmr014_date_of_income",
+    "ZMMR015_POWER": "zmmr015_power_date_of_income",
+    "ODOO_AGING": "odoo_last_incoming",
+}
+
+_AGING_COLUMNS = [
+    "bukrs",
+    "werks",
+    "lgort",
+    "matnr",
+    "mat_desc",
+    "date_of_income",
+    "days",
+    "aging_qty",
+    "aging_val",
+    "currency",
+]
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def material_key(values: pd.Series) -> pd.Series:
+    """
+    Join key for material codes across systems: trimmed, upper case and,
+    for numeric SAP codes, without the zero padding ("000000000000123456"
+    and "123456" match).
+    """
+    key = values.astype("string").str.strip().str.upper()
+    numeric = key.str.fullmatch(r"\d+", na=False)
+    return key.mask(numeric, key.str.lstrip("0").replace("", "0"))
+
+
+def plant_key(values: pd.Series) -> pd.Series:
+    """
+    Join key for plant codes: trimmed and upper case.
+    """
+    return values.astype("string").str.strip().str.upper()
+
+
+def _timestamps(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values).astype("datetime64[ns]")
+
+
+def _as_of(
+    left: pd.DataFrame, right: pd.DataFrame, right_date: str, by: list[str]
+) -> pd.Series:
+    """
+    For every left row, the latest right_date with the same `by` keys on
+    or before the row's as_of date (NaT when there is none).
+    """
+    result = pd.Series(pd.NaT, index=left.index, dtype="datetime64[ns]")
+    right = right.dropna(subset=[*by, right_date])
+    known = left.dropna(subset=[*by, "as_of"])
+    if known.empty or right.empty:
+        return result
+
+    matched = pd.merge_asof(
+        known[[*by, "as_of"]].reset_index().sort_values("as_of"),
+        right[[*by, right_date]].drop_duplicates().sort_values(right_date),
+        left_on="as_of",
+        right_on=right_date,
+        by=by,
+        direction="backward",
+    )
+    result[matched["index"].to_numpy()] = matched[right_date].to_numpy()
+    return result
+
+
+def combine_aging(
+    aging: pd.DataFrame,
+    power: pd.DataFrame,
+    odoo: pd.DataFrame,
+    snapshot_date: date,
+) -> pd.DataFrame:
+    """
+    fact_aging rows with the candidate dates of income, the final one and
+    its source, and days, years and bucket recomputed from it.
+    """
+    df = aging.rename(columns={"date_of_income": "zmmr014_date_of_income"})
+    # One resolution for every date: merge_asof keys must match exactly
+    df["zmmr014_date_of_income"] = _timestamps(df["zmmr014_date_of_income"])
+    df["material_key"] = material_key(df["matnr"])
+    df["plant_key"] = plant_key(df["werks"])
+    df["as_of"] = df["zmmr014_date_of_income"].fillna(pd.Timestamp(snapshot_date))
+
+    power = power.assign(
+        material_key=material_key(power["matnr"]),
+        plant_key=plant_key(power["werks"]),
+        power_date=_timestamps(power["date_of_income"]),
+    )
+    # Odoo has no plant; its products match on the material alone
+    odoo = odoo.assign(
+        material_key=material_key(odoo["product_code"]),
+        odoo_date=_timestamps(odoo["last_incoming"]),
+    )
+    df["zmmr015_power_date_of_income"] = _as_of(
+        df, power, "power_date", ["plant_key", "material_key"]
+    )
+    df["odoo_last_incoming"] = _as_of(df, odoo, "odoo_date", ["material_key"])
+
+    # Earliest candidate; argmin keeps the first source on ties, and a
+    # row without any date keeps ZMMR014's (missing) one
+    candidates = df[list(_CANDIDATES.values())].to_numpy("datetime64[ns]")
+    ordinal = np.where(
+        np.isnat(candidates), np.iinfo(np.int64).max, candidates.view("int64")
+    )
+    first = ordinal.argmin(axis=1)
+    final = candidates[np.arange(len(df)), first]
+    df["date_of_income"] = final
+    df["final_source"] = np.array(list(_CANDIDATES), dtype=object)[first]
+
+    # Keep SAP's day count and add the days gained by the earlier date.
+    # Without a ZMMR014 date or day count, count from the snapshot date;
+    # without any date, keep SAP's count.
+    gained = (df["zmmr014_date_of_income"] - df["date_of_income"]).dt.days
+    from_snapshot = (pd.Timestamp(snapshot_date) - df["date_of_income"]).dt.days
+    days = pd.to_numeric(df["days"], errors="coerce").astype("Int64")
+    df["days"] = (
+        days.add(gained.astype("Int64"))
+        .fillna(from_snapshot.astype("Int64"))
+        .fillna(days)
+    )
+    df["aging_years"] = df["days"].astype("float64") / DAYS_PER_YEAR
+    df["aging_bucket"] = aging_buckets(df["days"])
+
+    for col in [*_CANDIDATES.values(), "date_of_income"]:
+        df[col] = df[col].dt.date
+    return df.drop(columns=["material_key", "plant_key", "as_of"])
+
+
+def _latest_snapshot(conn: Connection, table: str, snapshot_date: date):
+    return conn.execute(
+        text(
+            f"""
+            SELECT MAX(snapshot_date) FROM `{table}`
+            WHERE snapshot_date <= :snapshot_date
+            """
+        ),
+        {"snapshot_date": snapshot_date},
+    ).scalar()
+
+
+def _latest_batch(conn: Connection, snapshot_date: date) -> str | None:
+    """
+    The ZMMR014 batch the final aging is built from: that of the latest
+    finished ZMMR014 job for the date, or the last one loaded when no
+    job recorded it. Appending a second file for the same date must not
+    double the aging rows.
+    """
+    batch_id = conn.execute(
+        text(
+            """
+            SELECT upload_batch_id FROM ingest_jobs
+            WHERE source = 'ZMMR014' AND status = 'done'
+              AND snapshot_date = :snapshot_date
+            ORDER BY finished_at DESC
+            LIMIT 1
+            """
+        ),
+        {"snapshot_date": snapshot_date},
+    ).scalar()
+    if batch_id is not None:
+        return batch_id
+    return conn.execute(
+        text(
+            """
+            SELECT upload_batch_id FROM fact_aging
+            WHERE snapshot_date = :snapshot_date
+            ORDER BY id DESC
+            LIMIT 1
+            """
+        ),
+        {"snapshot_date": snapshot_date},
+    ).scalar()
+
+
+def _read_snapshot(
+    conn: Connection,
+    table: str,
+    columns: list[str],
+    snapshot_date,
+    upload_batch_id: str | None = None,
+) -> pd.DataFrame:
+    params = {"snapshot_date": snapshot_date}
+    where = "snapshot_date = :snapshot_date"
+    if upload_batch_id is not None:
+        where += " AND upload_batch_id = :batch_id"
+        params["batch_id"] = upload_batch_id
+    return pd.read_sql(
+        text(f"SELECT {', '.join(columns)} FROM `{table}` WHERE {where}"),
+        conn,
+        params=params,
+    )
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+def build_final_aging(upload_batch_id: str, snapshot_date: date) -> int:
+    """
+    Compute fact_final_aging for the latest ZMMR014 batch of a snapshot,
+    against the latest ZMMR015 Power and Odoo snapshots on or before it,
+    replacing any rows already built for that date. Returns the row count.
+    """
+    with engine.begin() as conn:
+        aging_batch = _latest_batch(conn, snapshot_date)
+        aging = _read_snapshot(
+            conn, "fact_aging", _AGING_COLUMNS, snapshot_date, aging_batch
+        )
+        if aging.empty:
+            raise ValueError(f"No ZMMR014 aging loaded for {snapshot_date}")
+
+        power_date = _latest_snapshot(conn, "fact_zmmr015_power", snapshot_date)
+        power = _read_snapshot(
+            conn,
+            "fact_zmmr015_power",
+            ["werks", "matnr", "date_of_income"],
+            power_date,
+        )
+        odoo_date = _latest_snapshot(conn, "fact_odoo_aging", snapshot_date)
+        odoo = _read_snapshot(
+            conn, "fact_odoo_aging", ["product_code", "last_incoming"], odoo_date
+        )
+
+        final = combine_aging(aging, power, odoo, snapshot_date).assign(
+            source="FINAL_AGING",
+            upload_batch_id=upload_batch_id,
+            snapshot_date=snapshot_date,
+        )
+        conn.execute(
+            text("DELETE FROM fact_final_aging WHERE snapshot_date = :snapshot_date"),
+            {"snapshot_date": snapshot_date},
+        )
+        table = project_to_table(final, "fact_final_aging")
+        write_frame(table, "fact_final_aging", conn)
+
+    logger.info(
+        "Final aging %s: %d rows (ZMMR014 batch %s, ZMMR015 Power %s, Odoo %s); "
+        "earlier date from ZMMR015 Power %d, Odoo %d",
+        snapshot_date,
+        len(final),
+        aging_batch,
+        power_date,
+        odoo_date,
+        int((final["final_source"] == "ZMMR015_POWER").sum()),
+        int((final["final_source"] == "ODOO_AGING").sum()),
+    )
+    return len(final)
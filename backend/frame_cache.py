@@ -0,0 +1,102 @@
+# frame_cache.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+FRAME_CACHE_DIR = Path(os.getenv("FRAME_CACHE_DIR", "/tmp/frame_cache"))
+FRAME_CACHE_MAX_BYTES = int(
+    os.getenv("FRAME_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024))
+)
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _evict() -> None:
+    """
+    Drop least recently used entries until the cache fits its budget.
+    Entries are touched on every hit, so mtime order is LRU order.
+    """
+    entries = []
+    for path in FRAME_CACHE_DIR.glob("*.parquet"):
+        st = path.stat()
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= FRAME_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        logger.info("Frame cache evicted %s", path.name)
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+def cached_frame(
+    name: str,
+    version: int,
+    file_path: Path,
+    build: Callable[[Path], pd.DataFrame],
+    sha256: str | None = None,
+) -> pd.DataFrame:
+    """
+    Return build(file_path), served from a Parquet cache keyed by the
+    file's content hash. Bump `version` whenever the normalization done
+    by `build` changes so stale entries are never read.
+    """
+    sha256 = sha256 or file_sha256(file_path)
+    entry = FRAME_CACHE_DIR / f"{name}-v{version}-{sha256}.parquet"
+
+    if entry.exists():
+        try:
+            df = pd.read_parquet(entry)
+            entry.touch()
+            return df
+        except Exception:
+            logger.warning("Frame cache entry %s unreadable, rebuilding", entry)
+            entry.unlink(missing_ok=True)
+
+    df = build(file_path)
+
+    FRAME_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = entry.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, entry)
+    except Exception:
+        logger.warning("Could not cache %s frame", name, exc_info=True)
+        tmp.unlink(missing_ok=True)
+    else:
+        _evict()
+
+    return df
@@ -0,0 +1,60 @@
+# indexes.py
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import text
+
+from db import engine
+from schema import INDEXES
+
+logger = logging.getLogger(__name__)
+
+
+def _existing_indexes(conn) -> set[tuple[str, str]]:
+    """
+    (table, index) pairs for the whole schema, in one query.
+    """
+    rows = conn.execute(
+        text(
+            """
+            SELECT DISTINCT table_name, index_name
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+            """
+        )
+    )
+    return {(table, index) for table, index in rows}
+
+
+def missing_indexes() -> dict[str, dict[str, tuple[str, ...]]]:
+    with engine.connect() as conn:
+        existing = _existing_indexes(conn)
+
+    missing: dict[str, dict[str, tuple[str, ...]]] = {}
+    for table, indexes in INDEXES.items():
+        for name, columns in indexes.items():
+            if (table, name) not in existing:
+                missing.setdefault(table, {})[name] = columns
+    return missing
+
+
+def reconcile_indexes() -> list[str]:
+    """
+    Create every declared index that does not exist yet, one ALTER per
+    table. Online DDL (ALGORITHM=INPLACE, LOCK=NONE) keeps the tables
+    readable and writable while the index builds.
+    """
+    created: list[str] = []
+    for table, indexes in missing_indexes().items():
+        adds = ", ".join(
+            f"ADD INDEX `{name}` ({', '.join(f'`{c}`' for c in columns)})"
+            for name, columns in indexes.items()
+        )
+        logger.info("Creating indexes on %s: %s", table, ", ".join(indexes))
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"ALTER TABLE `{table}` {adds}, ALGORITHM=INPLACE, LOCK=NONE")
+            )
+        created.extend(indexes)
+    return created
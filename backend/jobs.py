@@ -0,0 +1,544 @@
+# jobs.py
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack, contextmanager
+from datetime import date
+from typing import Iterator, NamedTuple
+
+from sqlalchemy import text
+
+from dates import collect_coerced
+from db import engine
+from rollups import refresh_after_load
+from snapshot_replace import replace_snapshot
+from upload_store import record_catalog
+from mb52 import process_mb52
+from zmmr014 import process_zmmr014
+from zmmr015_power import process_zmmr015_power
+from odoo_aging import process_odoo_aging
+from zsdr030a import process_zsdr030a
+from zsdr004 import process_zsdr004
+from ZMM345E import _process_zmm345e
+from material_master import build_material_master
+from final_aging import build_final_aging
+from aging_buckets import rebucket_aging
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+# A running job holds a lease its worker renews every heartbeat. Another
+# API process only re-queues the job once the lease has expired.
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+# How often every API process looks for expired leases (see
+# recover_expired_jobs)
+JOB_SWEEP_INTERVAL_SECONDS = int(os.getenv("JOB_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Source name -> loader. Every loader takes its file path(s) (if any) as keyword
+# arguments plus upload_batch_id / snapshot_date and returns a row count.
+PROCESSORS = {
+    "MB52": process_mb52,
+    "ZMMR014": process_zmmr014,
+    "ZMMR015_POWER": process_zmmr015_power,
+    "ODOO_AGING": process_odoo_aging,
+    "ZSDR030A": process_zsdr030a,
+    "ZSDR004": process_zsdr004,
+    "ZMM345E": _process_zmm345e,
+    "MATERIAL_MASTER": build_material_master,
+    "FINAL_AGING": build_final_aging,
+    "REBUCKET_AGING": rebucket_aging,
+}
+
+
+class _Pool(NamedTuple):
+    executor: ProcessPoolExecutor
+    # Prefix of the worker ids of this pool's processes
+    pool_id: str
+
+
+_pool: _Pool | None = None
+# Guards replacing a broken pool, which done-callbacks may race to do
+_pool_lock = threading.Lock()
+
+# Set in each worker process: "<pool id>:<host>:<pid>"
+_worker_id: str | None = None
+
+
+# -------------------------------------------------------------------
+# Job table (ingest_jobs, declared in schema.py)
+# -------------------------------------------------------------------
+
+
+def enqueue_job(
+    source: str,
+    upload_batch_id: str,
+    snapshot_date: date,
+    file_paths: dict[str, str],
+    options: dict | None = None,
+    file_sha256: str | None = None,
+    file_bytes: int | None = None,
+) -> str:
+    """
+    Record a queued job and hand it to the worker pool.
+    """
+    if source not in PROCESSORS:
+        raise ValueError(f"Unknown ingest source: {source}")
+
+    job_id = str(uuid.uuid4())
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO ingest_jobs
+                    (job_id, source, upload_batch_id, snapshot_date,
+                     file_paths, file_sha256, file_bytes, options,
+                     status, created_at)
+                VALUES
+                    (:job_id, :source, :batch_id, :snapshot_date,
+                     :file_paths, :file_sha256, :file_bytes, :options,
+                     'queued', NOW(3))
+                """
+            ),
+            {
+                "job_id": job_id,
+                "source": source,
+                "batch_id": upload_batch_id,
+                "snapshot_date": snapshot_date,
+                "file_paths": json.dumps({k: str(v) for k, v in file_paths.items()}),
+                "file_sha256": file_sha256,
+                "file_bytes": file_bytes,
+                "options": json.dumps(options or {}),
+            },
+        )
+
+    _submit(job_id)
+    return job_id
+
+
+def get_job(job_id: str) -> dict | None:
+    with engine.connect() as conn:
+        row = (
+            conn.execute(
+                text(
+                    """
+                    SELECT job_id, source, upload_batch_id, snapshot_date,
+                           file_sha256, file_bytes, status, attempts,
+                           worker_id, rows_loaded, dates_coerced, error,
+                           created_at, started_at, finished_at,
+                           duration_seconds
+                    FROM ingest_jobs
+                    WHERE job_id = :job_id
+                    """
+                ),
+                {"job_id": job_id},
+            )
+            .mappings()
+            .first()
+        )
+
+    if row is None:
+        return None
+
+    job = dict(row)
+    for key in ("snapshot_date", "created_at", "started_at", "finished_at"):
+        if job[key] is not None:
+            job[key] = job[key].isoformat()
+    if job["duration_seconds"] is not None:
+        job["duration_seconds"] = float(job["duration_seconds"])
+    job["dates_coerced"] = json.loads(job["dates_coerced"] or "{}")
+    return job
+
+
+def find_active_job(
+    source: str, file_sha256: str, snapshot_date: date
+) -> dict | None:
+    """
+    A queued or running job for the same file, source and snapshot date.
+    """
+    with engine.connect() as conn:
+        job_id = conn.execute(
+            text(
+                """
+                SELECT job_id FROM ingest_jobs
+                WHERE source = :source AND file_sha256 = :sha
+                  AND snapshot_date = :snapshot_date
+                  AND status IN ('queued', 'running')
+                ORDER BY created_at
+                LIMIT 1
+                """
+            ),
+            {"source": source, "sha": file_sha256, "snapshot_date": snapshot_date},
+        ).scalar()
+    return get_job(job_id) if job_id else None
+
+
+# -------------------------------------------------------------------
+# Worker side
+# -------------------------------------------------------------------
+
+
+def _claim_job(job_id: str) -> dict | None:
+    with engine.begin() as conn:
+        claimed = conn.execute(
+            text(
+                """
+                UPDATE ingest_jobs
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    started_at = NOW(3),
+                    worker_id = :worker_id,
+                    lease_expires_at = NOW(3) + INTERVAL :lease SECOND
+                WHERE job_id = :job_id AND status = 'queued'
+                """
+            ),
+            {
+                "job_id": job_id,
+                "worker_id": _worker_id or f"local:{socket.gethostname()}",
+                "lease": JOB_LEASE_SECONDS,
+            },
+        ).rowcount
+        if not claimed:
+            return None
+
+        return dict(
+            conn.execute(
+                text(
+                    """
+                    SELECT source, upload_batch_id, snapshot_date,
+                           file_paths, file_sha256, file_bytes, options
+                    FROM ingest_jobs
+                    WHERE job_id = :job_id
+                    """
+                ),
+                {"job_id": job_id},
+            )
+            .mappings()
+            .one()
+        )
+
+
+def _finish_job(
+    job_id: str,
+    status: str,
+    duration: float,
+    rows_loaded: int | None = None,
+    error: str | None = None,
+    job: dict | None = None,
+    dates_coerced: dict[str, int] | None = None,
+) -> None:
+    with engine.begin() as conn:
+        if status == "done" and job is not None and job["file_sha256"]:
+            record_catalog(
+                conn,
+                job["file_sha256"],
+                job["source"],
+                job["snapshot_date"],
+                job["upload_batch_id"],
+                job["file_bytes"],
+            )
+        conn.execute(
+            text(
+                """
+                UPDATE ingest_jobs
+                SET status = :status,
+                    rows_loaded = :rows_loaded,
+                    dates_coerced = :dates_coerced,
+                    error = :error,
+                    finished_at = NOW(3),
+                    duration_seconds = :duration,
+                    lease_expires_at = NULL
+                WHERE job_id = :job_id
+                """
+            ),
+            {
+                "job_id": job_id,
+                "status": status,
+                "rows_loaded": rows_loaded,
+                "dates_coerced": json.dumps(dates_coerced) if dates_coerced else None,
+                "error": error,
+                "duration": round(duration, 3),
+            },
+        )
+
+
+@contextmanager
+def _heartbeat(job_id: str) -> Iterator[None]:
+    """
+    Renew the job's lease from a background thread while the block runs.
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text(
+                            """
+                            UPDATE ingest_jobs
+                            SET lease_expires_at = NOW(3) + INTERVAL :lease SECOND
+                            WHERE job_id = :job_id AND status = 'running'
+                            """
+                        ),
+                        {"job_id": job_id, "lease": JOB_LEASE_SECONDS},
+                    )
+            except Exception:
+                logger.exception("Heartbeat for job %s failed", job_id)
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job_id: str) -> None:
+    """
+    Execute one queued job. Runs inside a worker process.
+    """
+    job = _claim_job(job_id)
+    if job is None:
+        # Already picked up (or finished) elsewhere
+        return
+
+    with _heartbeat(job_id):
+        _run_claimed(job_id, job)
+
+
+def _run_claimed(job_id: str, job: dict) -> None:
+    start = time.perf_counter()
+    try:
+        processor = PROCESSORS[job["source"]]
+        options = json.loads(job["options"] or "{}")
+        mode = options.pop("mode", "append")
+        with ExitStack() as stack:
+            coerced = stack.enter_context(collect_coerced())
+            if mode == "replace":
+                stack.enter_context(
+                    replace_snapshot(
+                        job["source"], job["snapshot_date"], job["upload_batch_id"]
+                    )
+                )
+            rows = processor(
+                **json.loads(job["file_paths"]),
+                **options,
+                upload_batch_id=job["upload_batch_id"],
+                snapshot_date=job["snapshot_date"],
+            )
+    except Exception:
+        logger.exception("Ingest job %s failed", job_id)
+        _finish_job(
+            job_id,
+            "failed",
+            time.perf_counter() - start,
+            error=traceback.format_exc(),
+        )
+        return
+
+    duration = time.perf_counter() - start
+    # After the replace swap, so the rollups see the final rows. The load
+    # has succeeded either way; refresh failures are recorded as stale.
+    try:
+        refresh_after_load(
+            job["source"], job["snapshot_date"], job["upload_batch_id"]
+        )
+    except Exception:
+        logger.exception("Rollup refresh after job %s failed", job_id)
+    _finish_job(
+        job_id,
+        "done",
+        duration,
+        rows_loaded=rows,
+        job=job,
+        dates_coerced=dict(coerced),
+    )
+
+
+def _init_worker(pool_id: str) -> None:
+    global _worker_id
+    _worker_id = f"{pool_id}:{socket.gethostname()}:{os.getpid()}"
+    logging.basicConfig(level=logging.INFO)
+
+
+# -------------------------------------------------------------------
+# Pool lifecycle (API process)
+# -------------------------------------------------------------------
+
+
+def _new_pool() -> _Pool:
+    pool_id = uuid.uuid4().hex[:12]
+    executor = ProcessPoolExecutor(
+        max_workers=INGEST_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(pool_id,),
+    )
+    return _Pool(executor, pool_id)
+
+
+def _replace_broken(broken: _Pool) -> None:
+    """
+    A worker died (killed, out of memory, segfault): the pool refuses all
+    further work. Swap in a fresh one, once however many callers notice.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not broken:
+            return
+        logger.error("Ingest worker pool is broken; starting a new one")
+        broken.executor.shutdown(wait=False, cancel_futures=True)
+        _pool = _new_pool()
+
+
+def _fail_crashed(job_id: str, pool_id: str) -> bool:
+    """
+    Mark the job failed if a worker of the broken pool was running it.
+    False when it had not started there (still queued, or claimed by
+    another process).
+    """
+    with engine.begin() as conn:
+        return bool(
+            conn.execute(
+                text(
+                    """
+                    UPDATE ingest_jobs
+                    SET status = 'failed',
+                        error = 'Worker process died while running the job',
+                        finished_at = NOW(3),
+                        lease_expires_at = NULL
+                    WHERE job_id = :job_id AND status = 'running'
+                      AND worker_id LIKE :pool
+                    """
+                ),
+                {"job_id": job_id, "pool": f"{pool_id}:%"},
+            ).rowcount
+        )
+
+
+def _on_done(job_id: str, pool: _Pool, future: Future) -> None:
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+    _replace_broken(pool)
+    if _fail_crashed(job_id, pool.pool_id):
+        logger.error("Ingest job %s failed: its worker process died", job_id)
+    else:
+        # Never started in the broken pool; run it in the new one
+        _submit(job_id)
+
+
+def _submit(job_id: str) -> None:
+    pool = _pool
+    if pool is None:
+        # Pool not started (e.g. CLI use): the job stays queued and is
+        # picked up by the next start_workers().
+        return
+    try:
+        future = pool.executor.submit(run_job, job_id)
+    except BrokenProcessPool:
+        _replace_broken(pool)
+        _submit(job_id)
+        return
+    future.add_done_callback(lambda f: _on_done(job_id, pool, f))
+
+
+def requeue_expired_jobs() -> list[str]:
+    """
+    Re-queue running jobs whose lease has expired: their worker, in this
+    or another API process, died without finishing them. Jobs other
+    processes are still running keep renewing their lease and are left
+    alone. Returns the ids re-queued by this call.
+    """
+    expired = (
+        "status = 'running' "
+        "AND (lease_expires_at IS NULL OR lease_expires_at < NOW(3))"
+    )
+    requeued = []
+    with engine.begin() as conn:
+        candidates = conn.execute(
+            text(f"SELECT job_id FROM ingest_jobs WHERE {expired}")
+        ).scalars().all()
+        for job_id in candidates:
+            # Conditional again: another process may sweep at the same time
+            updated = conn.execute(
+                text(
+                    f"""
+                    UPDATE ingest_jobs
+                    SET status = 'queued', worker_id = NULL,
+                        lease_expires_at = NULL
+                    WHERE job_id = :job_id AND {expired}
+                    """
+                ),
+                {"job_id": job_id},
+            ).rowcount
+            if updated:
+                requeued.append(job_id)
+    return requeued
+
+
+def recover_expired_jobs() -> list[str]:
+    """
+    Re-queue jobs with an expired lease and hand them to the pool. Runs
+    at startup and every JOB_SWEEP_INTERVAL_SECONDS: a worker that died
+    in a restart still holds its lease when the new process starts.
+    """
+    requeued = requeue_expired_jobs()
+    for job_id in requeued:
+        _submit(job_id)
+    if requeued:
+        logger.info("Re-queued %d ingest jobs with an expired lease", len(requeued))
+    return requeued
+
+
+def start_workers() -> None:
+    """
+    Start the worker pool and resume queued jobs and jobs left behind by
+    a restart.
+    """
+    global _pool
+
+    _pool = _new_pool()
+
+    requeued = requeue_expired_jobs()
+    if requeued:
+        logger.info("Re-queued %d ingest jobs with an expired lease", len(requeued))
+    with engine.connect() as conn:
+        pending = conn.execute(
+            text(
+                """
+                SELECT job_id FROM ingest_jobs
+                WHERE status = 'queued'
+                ORDER BY created_at
+                """
+            )
+        ).scalars().all()
+
+    # Queued jobs another process also submits are claimed only once
+    for job_id in pending:
+        _submit(job_id)
+    if pending:
+        logger.info("Resumed %d queued ingest jobs", len(pending))
+
+
+def stop_workers() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.executor.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,88 @@
+# kernels.py
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------------------------
+# Vectorized normalization kernels shared by the loaders. Each one
+# replaces a per-row Python function with whole-column operations and
+# keeps the result of the code it replaced.
+# -------------------------------------------------------------------
+
+_INT_TEXT = r"\s*[+-]?\d+\s*"
+
+
+def text_mask(values: pd.Series) -> pd.Series:
+    """
+    True where the value is a Python/pandas string.
+    """
+    if pd.api.types.is_object_dtype(values):
+        return values.map(lambda v: isinstance(v, str)).astype(bool)
+    if pd.api.types.is_string_dtype(values):
+        return values.notna()
+    return pd.Series(False, index=values.index)
+
+
+def clean_text(values: pd.Series) -> pd.Series:
+    """
+    Codes and descriptions as stripped text.
+    """
+    return values.astype(str).str.strip()
+
+
+def to_number(values: pd.Series | None, thousands: bool = False) -> pd.Series:
+    """
+    Numeric column with unparseable values as NaN. `thousands` drops ","
+    separators first (text exports such as MB52).
+    """
+    if thousands and values is not None:
+        values = values.astype(str).str.replace(",", "", regex=False).str.strip()
+    return pd.to_numeric(values, errors="coerce")
+
+
+def _zero_pad_distinct(values: pd.Series, width: int) -> pd.Series:
+    result = pd.Series(None, index=values.index, dtype=object)
+    is_text = text_mask(values)
+
+    # Numbers: int() truncates, so floats go through the same path
+    numbers = pd.to_numeric(values[~is_text], errors="coerce")
+    finite = numbers.notna() & (numbers.abs() != float("inf"))
+    ints = numbers[finite].astype("int64")
+    result[ints.index] = ints.astype(str).str.zfill(width)
+    result[numbers[~finite].index] = clean_text(values[numbers[~finite].index])
+
+    text = values[is_text].astype(str)
+    int_like = text.str.fullmatch(_INT_TEXT)
+    parsed = text[int_like].str.strip().astype("int64")
+    result[parsed.index] = parsed.astype(str).str.zfill(width)
+    result[text[~int_like].index] = text[~int_like].str.strip()
+
+    return result
+
+
+def zero_pad(values: pd.Series, width: int) -> pd.Series:
+    """
+    Integer-like values as zero-padded text (7 -> "0007", "12" -> "0012");
+    anything else as stripped text, missing values as None. Same output
+    as applying f"{int(v):0{width}d}" with a str(v).strip() fallback.
+
+    Code columns repeat a handful of values, so the padding runs once per
+    distinct value and is broadcast back with a take.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    padded = _zero_pad_distinct(pd.Series(uniques, dtype=object), width)
+    out = np.append(padded.to_numpy(dtype=object), None)
+    # Missing values have code -1, which picks the trailing None
+    return pd.Series(out[codes], index=values.index, dtype=object)
+
+
+def days_since(values: pd.Series, ref_date: date) -> pd.Series:
+    """
+    Whole days from each date to ref_date (nullable Int64; missing dates
+    stay missing).
+    """
+    dates = pd.to_datetime(values, errors="coerce")
+    return (pd.Timestamp(ref_date) - dates).dt.days.astype("Int64")
@@ -1,24 +1,117 @@
 #Fadi
+import asyncio
+import logging
 import uuid
 
+from contextlib import asynccontextmanager, suppress
+from datetime import date
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy import text
 
-from db import engine, ensure_core_tables, parse_snapshot_date
-from mb52 import process_mb52
-from zmmr014 import process_zmmr014
-from zmmr015_power import process_zmmr015_power
-from odoo_aging import process_odoo_aging
-from zsdr030a import process_zsdr030a
-from zsdr004 import process_zsdr004
-from ZMM345E import _process_zmm345e
-from material_master import build_material_master, get_material_master_stats
+from db import engine, parse_snapshot_date, pool_metrics
+from exports import export_chunks
+from fact_reads import (
+    READ_MAX_PAGE_ROWS,
+    READ_TABLES,
+    data_version,
+    page_etag,
+    parse_cursor,
+    read_page,
+)
+from jobs import (
+    JOB_SWEEP_INTERVAL_SECONDS,
+    enqueue_job,
+    find_active_job,
+    get_job,
+    recover_expired_jobs,
+    start_workers,
+    stop_workers,
+)
+from material_master import (
+    get_material_master_stats,
+    get_material_master_stats_history,
+)
+from indexes import reconcile_indexes
+from migrations import follow_up_jobs, run_migrations
+from partitions import PARTITION_MAINTENANCE_INTERVAL_SECONDS, maintain_partitions
+from readers import reader_for
+from snapshot_replace import SNAPSHOT_TABLES, UPLOAD_MODES
+from sources import get_source
+from upload_store import (
+    UPLOAD_GC_INTERVAL_SECONDS,
+    StoredUpload,
+    UploadTooLarge,
+    collect_garbage,
+    combine_uploads,
+    find_cataloged_batch,
+    save_upload,
+)
 
-app = FastAPI(title="SAP Reporting Backend")
+logger = logging.getLogger(__name__)
+
+
+async def _reconcile_indexes():
+    # Index builds on big tables can take minutes; they run online, so
+    # the API starts serving while they finish.
+    try:
+        await run_in_threadpool(reconcile_indexes)
+    except Exception:
+        logger.exception("Index reconciliation failed")
+
+
+async def _upload_gc_loop():
+    while True:
+        try:
+            await run_in_threadpool(collect_garbage)
+        except Exception:
+            logger.exception("Upload garbage collection failed")
+        await asyncio.sleep(UPLOAD_GC_INTERVAL_SECONDS)
+
+
+async def _partition_maintenance_loop():
+    while True:
+        try:
+            await run_in_threadpool(maintain_partitions)
+        except Exception:
+            logger.exception("Partition maintenance failed")
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+
+async def _job_sweep_loop():
+    # Leases of workers that died in a restart expire after startup
+    while True:
+        await asyncio.sleep(JOB_SWEEP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(recover_expired_jobs)
+        except Exception:
+            logger.exception("Ingest job lease sweep failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    applied = run_migrations()
+    start_workers()
+    for source in follow_up_jobs(applied):
+        enqueue_job(source, str(uuid.uuid4()), date.today(), {})
+    index_task = asyncio.create_task(_reconcile_indexes())
+    gc_task = asyncio.create_task(_upload_gc_loop())
+    partition_task = asyncio.create_task(_partition_maintenance_loop())
+    sweep_task = asyncio.create_task(_job_sweep_loop())
+    yield
+    for task in (sweep_task, partition_task, gc_task, index_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    stop_workers()
+
+
+app = FastAPI(title="SAP Reporting Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,48 +137,161 @@ def health():
         return {"status": "error", "detail": str(e)}
 
 
+@app.get("/metrics/db")
+def db_metrics():
+    # Counters cover the API process; each ingest worker has its own pool
+    return pool_metrics()
+
+
 # ------------------------------------------------------
 # Helper: Save uploaded file
 # ------------------------------------------------------
 
 
-def _save_upload(file: UploadFile):
+def _save_upload(file: UploadFile) -> StoredUpload:
+    try:
+        # Excel, CSV or Parquet; the stored file keeps the extension
+        reader_for(Path(file.filename or ""))
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    try:
+        return save_upload(file.file, file.filename)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def _queue_upload(
+    source: str,
+    file_paths: dict[str, Path],
+    snapshot_date_obj: date,
+    stored: StoredUpload | None = None,
+    mode: str = "append",
+):
+    """
+    Queue an ingest job, or short-circuit when the same file was already
+    loaded (or is being loaded) for this source and snapshot date.
+
+    mode="replace" swaps out the source's existing rows for the snapshot
+    date instead of appending; it always reloads.
+    """
+    if mode not in UPLOAD_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"mode must be one of {', '.join(UPLOAD_MODES)}"
+        )
+    if mode == "replace" and source not in SNAPSHOT_TABLES:
+        raise HTTPException(
+            status_code=400, detail=f"Replace mode is not supported for {source}"
+        )
+
+    if stored is not None and mode == "append":
+        existing_batch = find_cataloged_batch(
+            stored.sha256, source, snapshot_date_obj
+        )
+        if existing_batch:
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "status": "duplicate",
+                    "source": source,
+                    "batch_id": existing_batch,
+                    "snapshot_date": snapshot_date_obj.isoformat(),
+                },
+            )
+
+        active = find_active_job(source, stored.sha256, snapshot_date_obj)
+        if active:
+            return {
+                "status": active["status"],
+                "source": source,
+                "job_id": active["job_id"],
+                "batch_id": active["upload_batch_id"],
+                "snapshot_date": snapshot_date_obj.isoformat(),
+            }
+
     batch_id = str(uuid.uuid4())
-    upload_dir = Path("/tmp/uploads")
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    job_id = enqueue_job(
+        source,
+        batch_id,
+        snapshot_date_obj,
+        file_paths,
+        options={"mode": mode} if mode != "append" else None,
+        file_sha256=stored.sha256 if stored else None,
+        file_bytes=stored.size if stored else None,
+    )
+    return {
+        "status": "queued",
+        "source": source,
+        "job_id": job_id,
+        "batch_id": batch_id,
+        "snapshot_date": snapshot_date_obj.isoformat(),
+        "mode": mode,
+    }
 
-    upload_path = upload_dir / f"{batch_id}_{file.filename}"
 
-    content = file.file.read()
-    with open(upload_path, "wb") as f:
-        f.write(content)
+@app.post("/uploads/gc")
+def upload_gc():
+    return collect_garbage()
 
-    return batch_id, upload_path
+
+@app.post("/partitions/maintain")
+def partition_maintenance():
+    return maintain_partitions()
 
 
 # ------------------------------------------------------
-# MB52
+# Ingest jobs
+# ------------------------------------------------------
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# ------------------------------------------------------
+# Any single-file source (driven by the spec registry)
 # ------------------------------------------------------
 
 
-@app.post("/upload_MB52")
-async def upload_mb52(
+@app.post("/upload/{source}", status_code=202)
+def upload_source(
+    source: str,
     file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
 ):
-    ensure_core_tables()
+    spec = get_source(source)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown source: {source}")
 
-    batch_id, upload_path = _save_upload(file)
+    stored = _save_upload(file)
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    process_mb52(upload_path, batch_id, snapshot_date_obj)
+    return _queue_upload(
+        spec.name, {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
-    return {
-        "status": "ok",
-        "source": "MB52",
-        "batch_id": batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
+
+# ------------------------------------------------------
+# MB52
+# ------------------------------------------------------
+
+
+@app.post("/upload_MB52", status_code=202)
+def upload_mb52(
+    file: UploadFile = File(...),
+    snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
+):
+    stored = _save_upload(file)
+    snapshot_date_obj = parse_snapshot_date(snapshot_date)
+
+    return _queue_upload(
+        "MB52", {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
 
 # ------------------------------------------------------
@@ -93,24 +299,18 @@ async def upload_mb52(
 # ------------------------------------------------------
 
 
-@app.post("/upload_ZMMR014")
-async def upload_zmmr014(
+@app.post("/upload_ZMMR014", status_code=202)
+def upload_zmmr014(
     file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
 ):
-    ensure_core_tables()
-
-    batch_id, upload_path = _save_upload(file)
+    stored = _save_upload(file)
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    process_zmmr014(upload_path, batch_id, snapshot_date_obj)
-
-    return {
-        "status": "ok",
-        "source": "ZMMR014",
-        "batch_id": batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
+    return _queue_upload(
+        "ZMMR014", {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
 
 # ------------------------------------------------------
@@ -118,24 +318,18 @@ async def upload_zmmr014(
 # ------------------------------------------------------
 
 
-@app.post("/upload_ZMMR015_Power")
-async def upload_zmmr015_power(
+@app.post("/upload_ZMMR015_Power", status_code=202)
+def upload_zmmr015_power(
     file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
 ):
-    ensure_core_tables()
-
-    batch_id, upload_path = _save_upload(file)
+    stored = _save_upload(file)
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    process_zmmr015_power(upload_path, batch_id, snapshot_date_obj)
-
-    return {
-        "status": "ok",
-        "source": "ZMMR015_POWER",
-        "batch_id": batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
+    return _queue_upload(
+        "ZMMR015_POWER", {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
 
 # ------------------------------------------------------
@@ -143,24 +337,18 @@ async def upload_zmmr015_power(
 # ------------------------------------------------------
 
 
-@app.post("/upload_Odoo_Aging")
-async def upload_odoo_aging(
+@app.post("/upload_Odoo_Aging", status_code=202)
+def upload_odoo_aging(
     file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
 ):
-    ensure_core_tables()
-
-    batch_id, upload_path = _save_upload(file)
+    stored = _save_upload(file)
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    process_odoo_aging(upload_path, batch_id, snapshot_date_obj)
-
-    return {
-        "status": "ok",
-        "source": "ODOO_AGING",
-        "batch_id": batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
+    return _queue_upload(
+        "ODOO_AGING", {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
 
 # ------------------------------------------------------
@@ -168,24 +356,18 @@ async def upload_odoo_aging(
 # ------------------------------------------------------
 
 
-@app.post("/upload_ZSDR030A")
-async def upload_zsdr030a(
+@app.post("/upload_ZSDR030A", status_code=202)
+def upload_zsdr030a(
     file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
 ):
-    ensure_core_tables()
-
-    batch_id, upload_path = _save_upload(file)
+    stored = _save_upload(file)
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    process_zsdr030a(upload_path, batch_id, snapshot_date_obj)
-
-    return {
-        "status": "ok",
-        "source": "ZSDR030A",
-        "batch_id": batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
+    return _queue_upload(
+        "ZSDR030A", {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
 
 # ------------------------------------------------------
@@ -193,24 +375,18 @@ async def upload_zsdr030a(
 # ------------------------------------------------------
 
 
-@app.post("/upload_ZSDR004")
-async def upload_zsdr004(
+@app.post("/upload_ZSDR004", status_code=202)
+def upload_zsdr004(
     file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
 ):
-    ensure_core_tables()
-
-    batch_id, upload_path = _save_upload(file)
+    stored = _save_upload(file)
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    process_zsdr004(upload_path, batch_id, snapshot_date_obj)
-
-    return {
-        "status": "ok",
-        "source": "ZSDR004",
-        "batch_id": batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
+    return _queue_upload(
+        "ZSDR004", {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
 
 # ------------------------------------------------------
@@ -218,24 +394,18 @@ async def upload_zsdr004(
 # ------------------------------------------------------
 
 
-@app.post("/upload_ZMM345E")
-async def upload_zmm345e(
+@app.post("/upload_ZMM345E", status_code=202)
+def upload_zmm345e(
     file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
+    mode: str = Form("append"),
 ):
-    ensure_core_tables()
-
-    batch_id, upload_path = _save_upload(file)
+    stored = _save_upload(file)
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    _process_zmm345e(upload_path, batch_id, snapshot_date_obj)
-
-    return {
-        "status": "ok",
-        "source": "ZMM345E",
-        "batch_id": batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
+    return _queue_upload(
+        "ZMM345E", {"file_path": stored.path}, snapshot_date_obj, stored, mode
+    )
 
 
 # ------------------------------------------------------
@@ -243,8 +413,8 @@ async def upload_zmm345e(
 # ------------------------------------------------------
 
 
-@app.post("/upload_material_master")
-async def upload_material_master(
+@app.post("/upload_material_master", status_code=202)
+def upload_material_master(
     zmm345e_file: UploadFile = File(...),
     storage_location_file: UploadFile = File(...),
     material_group_file: UploadFile = File(...),
@@ -252,38 +422,144 @@ async def upload_material_master(
     mkvz_file: UploadFile = File(...),
     snapshot_date: Optional[str] = Form(None),
 ):
-    ensure_core_tables()
-
-    # One unified batch ID for the combined master table
-    unified_batch_id = str(uuid.uuid4())
-
     # Save all files to disk
-    _, zmm_path = _save_upload(zmm345e_file)
-    _, sloc_path = _save_upload(storage_location_file)
-    _, mg_path = _save_upload(material_group_file)
-    _, mt_path = _save_upload(material_type_file)
-    _, mkvz_path = _save_upload(mkvz_file)
+    stored = {
+        "zmm345e_path": _save_upload(zmm345e_file),
+        "storage_location_path": _save_upload(storage_location_file),
+        "material_group_path": _save_upload(material_group_file),
+        "material_type_path": _save_upload(material_type_file),
+        "mkvz_path": _save_upload(mkvz_file),
+    }
 
     snapshot_date_obj = parse_snapshot_date(snapshot_date)
 
-    # Build material master table
-    build_material_master(
-        zmm345e_path=zmm_path,
-        storage_location_path=sloc_path,
-        material_group_path=mg_path,
-        material_type_path=mt_path,
-        mkvz_path=mkvz_path,
-        upload_batch_id=unified_batch_id,
-        snapshot_date=snapshot_date_obj,
+    # Build material master table in the background (one unified batch ID).
+    # The same five files for the same date are loaded once.
+    return _queue_upload(
+        "MATERIAL_MASTER",
+        {role: upload.path for role, upload in stored.items()},
+        snapshot_date_obj,
+        combine_uploads(stored),
     )
 
-    return {
-        "status": "ok",
-        "source": "MATERIAL_MASTER",
-        "batch_id": unified_batch_id,
-        "snapshot_date": snapshot_date_obj.isoformat(),
-    }
-    @app.get("/material_master/diagnostics")
+
+@app.get("/material_master/diagnostics")
 def material_master_diagnostics():
-    ensure_core_tables()
     return get_material_master_stats()
+
+
+@app.get("/material_master/diagnostics/history")
+def material_master_diagnostics_history(limit: int = Query(100, ge=1, le=1000)):
+    return get_material_master_stats_history(limit)
+
+
+# ------------------------------------------------------
+# Aging (no upload): final aging across sources, re-bucketing
+# ------------------------------------------------------
+
+
+@app.post("/final_aging/build", status_code=202)
+def final_aging_build(snapshot_date: Optional[str] = Form(None)):
+    snapshot_date_obj = parse_snapshot_date(snapshot_date)
+    return _queue_upload("FINAL_AGING", {}, snapshot_date_obj)
+
+
+@app.post("/aging/rebucket", status_code=202)
+def aging_rebucket():
+    # Rewrites the buckets of every aging table with the current config
+    return _queue_upload("REBUCKET_AGING", {}, date.today())
+
+
+# ------------------------------------------------------
+# Fact table reads
+# ------------------------------------------------------
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in {
+        tag.strip().removeprefix("W/") for tag in header.split(",")
+    }
+
+
+@app.get("/facts/{table}")
+def read_fact_table(
+    table: str,
+    request: Request,
+    snapshot_date: Optional[date] = None,
+    werks: Optional[str] = None,
+    matnr: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=READ_MAX_PAGE_ROWS),
+):
+    """
+    Page through a fact table; pass the response's "next" as `after` to
+    continue. Responses carry an ETag that changes when a new batch lands.
+    """
+    if table not in READ_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    try:
+        keyset = parse_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
+    filters = {
+        name: value
+        for name, value in (
+            ("snapshot_date", snapshot_date),
+            ("werks", werks),
+            ("matnr", matnr),
+        )
+        if value is not None
+    }
+
+    version = data_version(table)
+    etag = page_etag(table, filters, keyset, limit, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = read_page(table, filters, keyset, limit, version)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# ------------------------------------------------------
+# Exports
+# ------------------------------------------------------
+
+
+@app.get("/export/{table}")
+def export_table(
+    table: str,
+    format: str = "csv",
+    snapshot_date: Optional[date] = None,
+    werks: Optional[str] = None,
+    matnr: Optional[str] = None,
+):
+    """
+    Stream a table (or one snapshot of it) as gzip-compressed CSV or as
+    Parquet, which compresses itself.
+    """
+    filters = {
+        name: value
+        for name, value in (
+            ("snapshot_date", snapshot_date),
+            ("werks", werks),
+            ("matnr", matnr),
+        )
+        if value is not None
+    }
+    try:
+        chunks = export_chunks(table, filters, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"{table}_{snapshot_date or 'all'}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "csv":
+        headers["Content-Encoding"] = "gzip"
+        media_type = "text/csv"
+    else:
+        media_type = "application/vnd.apache.parquet"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -1,22 +1,55 @@
 # material_master.py Fadi
 from __future__ import annotations
 
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import date
 
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection
 
 from db import engine
+from bulk_writer import write_frame
+from frame_cache import cached_frame
+from kernels import to_number
+from readers import read_frame
+from rollups import mark_stale
 
+logger = logging.getLogger(__name__)
+
+# Processes parsing the four reference files while this process parses
+# ZMM345E (0 = parse everything here, one file after another)
+MATERIAL_MASTER_PARSE_WORKERS = int(
+    os.getenv("MATERIAL_MASTER_PARSE_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# Serializes dimension builds (the diff reads the current versions)
+MATERIAL_MASTER_LOCK = "dim_material_master_build"
+MATERIAL_MASTER_LOCK_TIMEOUT_SECONDS = 600
+
+# Material codes per IN (...) list when closing versions
+_CODES_PER_STATEMENT = 1000
+
+# How long /material_master/diagnostics serves its cached stats before
+# checking whether a newer build has landed
+MATERIAL_MASTER_STATS_CHECK_SECONDS = float(
+    os.getenv("MATERIAL_MASTER_STATS_CHECK_SECONDS", "5")
+)
 
 # ------------------------------------------------------
 # Helpers
 # ------------------------------------------------------
 
 
-def _read_excel(path: Path) -> pd.DataFrame:
-    return pd.read_excel(path)
+def _read_file(path: Path) -> pd.DataFrame:
+    # Excel, CSV or Parquet, by extension
+    return read_frame(path)
 
 
 def _ensure_columns(df: pd.DataFrame, required: list[str], source_name: str) -> None:
@@ -36,30 +69,16 @@ def _normalize_str(series: pd.Series) -> pd.Series:
 
 
 # ------------------------------------------------------
-# Main builder
+# Per-file loaders (read + normalize)
 # ------------------------------------------------------
 
+# Bump when a reference loader's output changes, to invalidate cached frames
+REFERENCE_CACHE_VERSION = 1
 
-def build_material_master(
-    zmm345e_path: Path,
-    storage_location_path: Path,
-    material_group_path: Path,
-    material_type_path: Path,
-    mkvz_path: Path,
-    upload_batch_id: str,
-    snapshot_date: date,
-) -> None:
-    """
-    Build unified dim_material_master from:
-      - ZMM345E (main material master)
-      - Storage Location table
-      - Material Group table
-      - Material Type table
-      - MKVZ vendor table
-    """
 
-    # ---------------- ZMM345E (main material) ----------------
-    zmm = _read_excel(zmm345e_path)
+def _load_zmm345e(path: Path) -> pd.DataFrame:
+    """ZMM345E (main material)."""
+    zmm = _read_file(path)
     zmm.columns = zmm.columns.astype(str).str.strip()
 
     required_zmm_cols = [
@@ -162,13 +181,15 @@ def build_material_master(
     zmm_renamed["product_series"] = _normalize_str(zmm_renamed["product_series"])
 
     # Numeric fields
-    zmm_renamed["standard_price"] = pd.to_numeric(
-        zmm_renamed.get("standard_price"), errors="coerce"
-    )
+    zmm_renamed["standard_price"] = to_number(zmm_renamed.get("standard_price"))
     zmm_renamed["price_control"] = _normalize_str(zmm_renamed.get("price_control"))
 
-    # ---------------- Storage Location ----------------
-    sloc_df = _read_excel(storage_location_path)
+    return zmm_renamed
+
+
+def _load_storage_locations(path: Path) -> pd.DataFrame:
+    """Storage Location table."""
+    sloc_df = _read_file(path)
     sloc_df.columns = sloc_df.columns.astype(str).str.strip()
 
     required_sloc_cols = ["SLoc", "Description", "Storage Group"]
@@ -185,8 +206,12 @@ def build_material_master(
     sloc_df["sloc_description"] = _normalize_str(sloc_df["sloc_description"])
     sloc_df["storage_group"] = _normalize_str(sloc_df["storage_group"])
 
-    # ---------------- Material Group ----------------
-    mg_df = _read_excel(material_group_path)
+    return sloc_df[["sloc", "sloc_description", "storage_group"]]
+
+
+def _load_material_groups(path: Path) -> pd.DataFrame:
+    """Material Group table."""
+    mg_df = _read_file(path)
     mg_df.columns = mg_df.columns.astype(str).str.strip()
 
     required_mg_cols = ["Matl Group"]
@@ -207,8 +232,19 @@ def build_material_master(
         mg_df.get("material_group_display_desc")
     )
 
-    # ---------------- Material Type ----------------
-    mt_df = _read_excel(material_type_path)
+    return mg_df[
+        [
+            "material_group_code",
+            "material_group_desc",
+            "material_group_desc2",
+            "material_group_display_desc",
+        ]
+    ]
+
+
+def _load_material_types(path: Path) -> pd.DataFrame:
+    """Material Type table."""
+    mt_df = _read_file(path)
     mt_df.columns = mt_df.columns.astype(str).str.strip()
 
     required_mt_cols = ["MTyp"]
@@ -225,8 +261,14 @@ def build_material_master(
     mt_df["material_type_desc"] = _normalize_str(mt_df.get("material_type_desc"))
     mt_df["material_type_group"] = _normalize_str(mt_df.get("material_type_group"))
 
-    # ---------------- MKVZ (Vendor) ----------------
-    mkvz_df = _read_excel(mkvz_path)
+    return mt_df[
+        ["material_type_code", "material_type_desc", "material_type_group"]
+    ]
+
+
+def _load_mkvz(path: Path) -> pd.DataFrame:
+    """MKVZ vendor table."""
+    mkvz_df = _read_file(path)
     mkvz_df.columns = mkvz_df.columns.astype(str).str.strip()
 
     required_mkvz_cols = ["Vendor"]
@@ -261,6 +303,118 @@ def build_material_master(
     mkvz_df["vendor_postal_code"] = _normalize_str(mkvz_df.get("vendor_postal_code"))
     mkvz_df["vendor_search_term"] = _normalize_str(mkvz_df.get("vendor_search_term"))
 
+    return mkvz_df[
+        [
+            "vendor_code",
+            "vendor_country",
+            "vendor_postal_code",
+            "vendor_search_term",
+        ]
+    ]
+
+
+# ------------------------------------------------------
+# Parallel parsing
+# ------------------------------------------------------
+
+_pool: ProcessPoolExecutor | None = None
+
+_REFERENCE_LOADERS = {
+    "storage_location": _load_storage_locations,
+    "material_group": _load_material_groups,
+    "material_type": _load_material_types,
+    "mkvz": _load_mkvz,
+}
+
+
+def _load_reference(name: str, path: Path) -> pd.DataFrame:
+    # The reference lists rarely change, so their normalized frames come
+    # from the Parquet cache
+    return cached_frame(name, REFERENCE_CACHE_VERSION, path, _REFERENCE_LOADERS[name])
+
+
+def _parse_pool() -> ProcessPoolExecutor:
+    """
+    Kept for the life of the process so only the first build pays for
+    starting the workers.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=MATERIAL_MASTER_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _load_inputs(
+    zmm345e_path: Path, reference_paths: dict[str, Path]
+) -> tuple[pd.DataFrame, dict[str, pd.DataFrame]]:
+    """
+    Parse and normalize ZMM345E and the reference lists. The parses are
+    independent and CPU-bound: the reference files go to worker processes
+    while ZMM345E, the largest, is parsed here (its frame never has to be
+    pickled), so the total is about the time of the largest file.
+    """
+    start = time.perf_counter()
+    if MATERIAL_MASTER_PARSE_WORKERS <= 0:
+        zmm = _load_zmm345e(zmm345e_path)
+        references = {
+            name: _load_reference(name, path)
+            for name, path in reference_paths.items()
+        }
+    else:
+        pool = _parse_pool()
+        futures = {
+            name: pool.submit(_load_reference, name, path)
+            for name, path in reference_paths.items()
+        }
+        zmm = _load_zmm345e(zmm345e_path)
+        references = {name: f.result() for name, f in futures.items()}
+
+    logger.info(
+        "Material master inputs parsed in %.2fs", time.perf_counter() - start
+    )
+    return zmm, references
+
+
+# ------------------------------------------------------
+# Main builder
+# ------------------------------------------------------
+
+
+def build_material_master(
+    zmm345e_path: Path,
+    storage_location_path: Path,
+    material_group_path: Path,
+    material_type_path: Path,
+    mkvz_path: Path,
+    upload_batch_id: str,
+    snapshot_date: date,
+) -> int:
+    """
+    Build unified dim_material_master from:
+      - ZMM345E (main material master)
+      - Storage Location table
+      - Material Group table
+      - Material Type table
+      - MKVZ vendor table
+    """
+
+    zmm_renamed, references = _load_inputs(
+        zmm345e_path,
+        {
+            "storage_location": storage_location_path,
+            "material_group": material_group_path,
+            "material_type": material_type_path,
+            "mkvz": mkvz_path,
+        },
+    )
+    sloc_df = references["storage_location"]
+    mg_df = references["material_group"]
+    mt_df = references["material_type"]
+    mkvz_df = references["mkvz"]
+
     # ---------------- Merge everything ----------------
     merged = zmm_renamed.merge(
         sloc_df[["sloc", "sloc_description", "storage_group"]],
@@ -347,96 +501,387 @@ def build_material_master(
         ]
     ].copy()
 
-    dim["upload_batch_id"] = upload_batch_id
-    dim["snapshot_date"] = snapshot_date
-    dim["source"] = "MATERIAL_MASTER"
-
     dim["is_serialized"] = dim["is_serialized"].astype(bool)
 
-    dim.to_sql(
-        "dim_material_master",
-        engine,
-        if_exists="append",
-        index=False,
-    )
-
-    # Indexes
-    _ensure_material_master_indexes()
+    return _write_versions(dim, upload_batch_id, snapshot_date)
 
 
 # ------------------------------------------------------
-# Index + diagnostics
+# SCD type 2 versions
 # ------------------------------------------------------
 
+# Columns that make up a material's version (everything but bookkeeping)
+_VERSION_COLUMNS = [
+    "material_code",
+    "description",
+    "brand",
+    "product_line",
+    "product_group",
+    "product_series",
+    "material_group_code",
+    "material_group_desc",
+    "material_group_desc2",
+    "material_group_display_desc",
+    "material_type_code",
+    "material_type_desc",
+    "material_type_group",
+    "sloc",
+    "sloc_description",
+    "storage_group",
+    "old_part_no",
+    "serial_number_profile",
+    "is_serialized",
+    "standard_price",
+    "price_control",
+    "vendor_code",
+    "vendor_country",
+    "vendor_postal_code",
+    "vendor_search_term",
+]
+
+
+def _canonical_text(values: pd.Series) -> pd.Series:
+    """
+    Values as they compare once stored: prices at DECIMAL(18,4), flags
+    as 0/1, text stripped; missing values get a marker of their own.
+    """
+    if values.name == "standard_price":
+        text_values = values.map(lambda v: f"{v:.4f}")
+    elif values.name == "is_serialized":
+        text_values = values.astype(int).astype(str)
+    else:
+        text_values = values.astype(str).str.strip()
+    return text_values.where(values.notna(), "\\N")
 
-def _index_exists(index_name: str) -> bool:
-    query = text(
-        """
-        SELECT COUNT(1)
-        FROM information_schema.statistics
-        WHERE table_schema = DATABASE()
-          AND table_name = 'dim_material_master'
-          AND index_name = :idx
-        """
-    )
-    with engine.connect() as conn:
-        return bool(conn.execute(query, {"idx": index_name}).scalar())
 
+def _md5(values) -> list[str]:
+    return [hashlib.md5(v.encode()).hexdigest() for v in values]
 
-def _ensure_material_master_indexes() -> None:
-    indexes = {
-        "idx_dim_mm_material_code": "CREATE INDEX idx_dim_mm_material_code ON dim_material_master (material_code)",
-        "idx_dim_mm_is_serialized": "CREATE INDEX idx_dim_mm_is_serialized ON dim_material_master (is_serialized)",
-        "idx_dim_mm_brand_group": "CREATE INDEX idx_dim_mm_brand_group ON dim_material_master (brand, material_group_code)",
-    }
 
-    with engine.begin() as conn:
-        for name, stmt in indexes.items():
-            if not _index_exists(name):
-                conn.execute(text(stmt))
+def material_hashes(dim: pd.DataFrame) -> pd.Series:
+    """
+    One hash per material_code over all of its rows (in any order),
+    broadcast to the rows. A material whose rows are unchanged keeps its
+    hash from build to build.
+    """
+    columns = [_canonical_text(dim[c]) for c in _VERSION_COLUMNS]
+    row_text = columns[0].str.cat(columns[1:], sep="\x1f")
+    rows = pd.DataFrame(
+        {"material_code": dim["material_code"], "row": _md5(row_text)},
+        index=dim.index,
+    )
+    per_material = (
+        rows.sort_values(["material_code", "row"])
+        .groupby("material_code", sort=False)["row"]
+        .agg("".join)
+    )
+    hashes = pd.Series(_md5(per_material), index=per_material.index)
+    return rows["material_code"].map(hashes)
+
+
+def _current_hashes(conn: Connection) -> tuple[dict[str, str | None], date | None]:
+    rows = conn.execute(
+        text(
+            """
+            SELECT material_code, MIN(row_hash)
+            FROM dim_material_master
+            WHERE is_current = 1
+            GROUP BY material_code
+            """
+        )
+    ).all()
+    latest = conn.execute(
+        text(
+            "SELECT MAX(valid_from) FROM dim_material_master WHERE is_current = 1"
+        )
+    ).scalar()
+    return dict(rows), latest
+
 
+def _close_versions(conn: Connection, codes: list[str], snapshot_date: date) -> None:
+    """
+    End the current version of each material at snapshot_date. Versions
+    that started on snapshot_date itself (a re-upload of the same day)
+    are replaced outright rather than closed.
+    """
+    params = {"snapshot_date": snapshot_date}
+    delete = text(
+        """
+        DELETE FROM dim_material_master
+        WHERE is_current = 1 AND valid_from = :snapshot_date
+          AND material_code IN :codes
+        """
+    ).bindparams(bindparam("codes", expanding=True))
+    close = text(
+        """
+        UPDATE dim_material_master
+        SET is_current = 0, valid_to = :snapshot_date
+        WHERE is_current = 1 AND material_code IN :codes
+        """
+    ).bindparams(bindparam("codes", expanding=True))
+    for i in range(0, len(codes), _CODES_PER_STATEMENT):
+        batch = codes[i : i + _CODES_PER_STATEMENT]
+        conn.execute(delete, {**params, "codes": batch})
+        conn.execute(close, {**params, "codes": batch})
 
-def get_material_master_stats() -> dict:
+
+def _write_versions(
+    dim: pd.DataFrame, upload_batch_id: str, snapshot_date: date
+) -> int:
     """
-    Simple diagnostics helper for FastAPI:
-    - total rows
-    - serialized vs not serialized
-    - distinct brands, material groups, vendors
+    Diff the new dimension against the current versions by material hash:
+    new and changed materials get a version starting at snapshot_date,
+    the versions they replace (and those of materials no longer in the
+    file) end there. Unchanged materials are not written. Returns the
+    number of rows written.
     """
+    missing_code = dim["material_code"].isna()
+    if missing_code.any():
+        logger.warning(
+            "Material master: skipping %d rows without a material code",
+            int(missing_code.sum()),
+        )
+        dim = dim[~missing_code]
+
+    dim = dim.assign(row_hash=material_hashes(dim))
+    new_hashes = dim.groupby("material_code", sort=False)["row_hash"].first()
+
     with engine.connect() as conn:
-        total = conn.execute(
-            text("SELECT COUNT(*) FROM dim_material_master")
+        got_lock = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {
+                "name": MATERIAL_MASTER_LOCK,
+                "timeout": MATERIAL_MASTER_LOCK_TIMEOUT_SECONDS,
+            },
         ).scalar()
-
-        serialized = conn.execute(
-            text(
-                "SELECT COUNT(*) FROM dim_material_master WHERE is_serialized = 1"
+        if not got_lock:
+            raise RuntimeError("Timed out waiting for the material master lock")
+
+        try:
+            current, latest = _current_hashes(conn)
+            if latest is not None and snapshot_date < pd.Timestamp(latest).date():
+                raise ValueError(
+                    f"Material master snapshot {snapshot_date} is older than "
+                    f"the current version ({latest})"
+                )
+
+            changed = [
+                code for code, h in new_hashes.items() if current.get(code) != h
+            ]
+            removed = [code for code in current if code not in new_hashes.index]
+            _close_versions(conn, changed + removed, snapshot_date)
+
+            versions = dim[dim["material_code"].isin(changed)].assign(
+                upload_batch_id=upload_batch_id,
+                snapshot_date=snapshot_date,
+                source="MATERIAL_MASTER",
+                valid_from=snapshot_date,
+                valid_to=None,
+                is_current=1,
             )
-        ).scalar()
-
-        not_serialized = conn.execute(
-            text(
-                "SELECT COUNT(*) FROM dim_material_master WHERE is_serialized = 0"
+            write_frame(versions, "dim_material_master", conn)
+            _record_stats(conn, dim, upload_batch_id, snapshot_date, len(versions))
+            if changed or removed:
+                # Rollups join the version valid on their snapshot date
+                mark_stale(conn, snapshot_date, "material master changed")
+            conn.commit()
+        finally:
+            conn.rollback()
+            conn.execute(
+                text("SELECT RELEASE_LOCK(:name)"), {"name": MATERIAL_MASTER_LOCK}
             )
-        ).scalar()
+            conn.commit()
+
+    logger.info(
+        "Material master %s: %d new or changed materials (%d rows), "
+        "%d removed, %d unchanged",
+        snapshot_date,
+        len(changed),
+        len(versions),
+        len(removed),
+        len(new_hashes) - len(changed),
+    )
+    return len(versions)
 
-        distinct_brands = conn.execute(
-            text("SELECT COUNT(DISTINCT brand) FROM dim_material_master")
-        ).scalar()
 
-        distinct_groups = conn.execute(
-            text("SELECT COUNT(DISTINCT material_group_code) FROM dim_material_master")
-        ).scalar()
+def backfill_versions(conn: Connection) -> None:
+    """
+    Migration: turn the appended full builds into versions. Each batch
+    is valid from its snapshot date until the next batch's; the latest
+    batch is current. Its row_hash stays NULL, so the first build after
+    the migration rewrites every material once.
+    """
+    conn.execute(
+        text(
+            """
+            UPDATE dim_material_master d
+            JOIN (
+                SELECT upload_batch_id,
+                       LEAD(snapshot_date) OVER (
+                           ORDER BY snapshot_date, first_id
+                       ) AS next_date
+                FROM (
+                    SELECT upload_batch_id,
+                           MIN(snapshot_date) AS snapshot_date,
+                           MIN(id) AS first_id
+                    FROM dim_material_master
+                    GROUP BY upload_batch_id
+                ) batches
+            ) b ON b.upload_batch_id = d.upload_batch_id
+            SET d.valid_from = d.snapshot_date,
+                d.valid_to = b.next_date,
+                d.is_current = (b.next_date IS NULL)
+            """
+        )
+    )
 
-        distinct_vendors = conn.execute(
-            text("SELECT COUNT(DISTINCT vendor_code) FROM dim_material_master")
-        ).scalar()
 
+# ------------------------------------------------------
+# Diagnostics
+# ------------------------------------------------------
+
+_STATS_COLUMNS = (
+    "total_rows",
+    "serialized_rows",
+    "not_serialized_rows",
+    "distinct_brands",
+    "distinct_material_groups",
+    "distinct_vendors",
+)
+
+# Latest stats row as served by this API process, and when it was last
+# checked. Builds run in the job worker processes and cannot reach this
+# cache; the new material_master_stats row they insert is the signal.
+_stats_cache: dict = {"id": None, "stats": None, "checked_at": 0.0}
+
+
+def dimension_stats(dim: pd.DataFrame) -> dict[str, int]:
+    """
+    Diagnostics of a built dimension, from the frame in memory. After a
+    build the current versions are exactly these rows.
+    """
+    serialized = dim["is_serialized"].astype(bool)
     return {
-        "total_rows": int(total or 0),
-        "serialized_rows": int(serialized or 0),
-        "not_serialized_rows": int(not_serialized or 0),
-        "distinct_brands": int(distinct_brands or 0),
-        "distinct_material_groups": int(distinct_groups or 0),
-        "distinct_vendors": int(distinct_vendors or 0),
+        "total_rows": len(dim),
+        "serialized_rows": int(serialized.sum()),
+        "not_serialized_rows": int((~serialized).sum()),
+        "distinct_brands": int(dim["brand"].nunique()),
+        "distinct_material_groups": int(dim["material_group_code"].nunique()),
+        "distinct_vendors": int(dim["vendor_code"].nunique()),
     }
+
+
+def _record_stats(
+    conn: Connection,
+    dim: pd.DataFrame,
+    upload_batch_id: str,
+    snapshot_date: date,
+    rows_written: int,
+) -> None:
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO material_master_stats
+                (upload_batch_id, snapshot_date, {", ".join(_STATS_COLUMNS)},
+                 rows_written, created_at)
+            VALUES
+                (:upload_batch_id, :snapshot_date,
+                 {", ".join(f":{c}" for c in _STATS_COLUMNS)},
+                 :rows_written, NOW(3))
+            """
+        ),
+        {
+            "upload_batch_id": upload_batch_id,
+            "snapshot_date": snapshot_date,
+            "rows_written": rows_written,
+            **dimension_stats(dim),
+        },
+    )
+
+
+def _scan_stats(conn: Connection) -> dict[str, int]:
+    """
+    The same counts in one pass over the current rows, for databases
+    built before stats were recorded.
+    """
+    row = conn.execute(
+        text(
+            """
+            SELECT COUNT(*),
+                   COALESCE(SUM(is_serialized = 1), 0),
+                   COALESCE(SUM(is_serialized = 0), 0),
+                   COUNT(DISTINCT brand),
+                   COUNT(DISTINCT material_group_code),
+                   COUNT(DISTINCT vendor_code)
+            FROM dim_material_master
+            WHERE is_current = 1
+            """
+        )
+    ).one()
+    return {name: int(value or 0) for name, value in zip(_STATS_COLUMNS, row)}
+
+
+def get_material_master_stats() -> dict:
+    """
+    Diagnostics of the current dimension (row count, serialized vs not,
+    distinct brands, material groups and vendors), as recorded by the
+    latest build. Served from memory; at most every
+    MATERIAL_MASTER_STATS_CHECK_SECONDS, MAX(id) of material_master_stats
+    tells whether another process has since recorded a newer build.
+    """
+    now = time.monotonic()
+    cached = _stats_cache["stats"]
+    if (
+        cached is not None
+        and now - _stats_cache["checked_at"] < MATERIAL_MASTER_STATS_CHECK_SECONDS
+    ):
+        return cached
+
+    with engine.connect() as conn:
+        latest_id = conn.execute(
+            text("SELECT MAX(id) FROM material_master_stats")
+        ).scalar()
+        if cached is None or latest_id != _stats_cache["id"]:
+            if latest_id is None:
+                cached = _scan_stats(conn)
+            else:
+                row = (
+                    conn.execute(
+                        text(
+                            f"""
+                            SELECT upload_batch_id, snapshot_date,
+                                   {", ".join(_STATS_COLUMNS)}
+                            FROM material_master_stats
+                            WHERE id = :id
+                            """
+                        ),
+                        {"id": latest_id},
+                    )
+                    .mappings()
+                    .one()
+                )
+                cached = dict(row)
+
+    _stats_cache.update(id=latest_id, stats=cached, checked_at=now)
+    return cached
+
+
+def get_material_master_stats_history(limit: int = 100) -> list[dict]:
+    """
+    Recorded stats per build, newest first.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                f"""
+                SELECT upload_batch_id, snapshot_date,
+                       {", ".join(_STATS_COLUMNS)},
+                       rows_written, created_at
+                FROM material_master_stats
+                ORDER BY id DESC
+                LIMIT :limit
+                """
+            ),
+            {"limit": limit},
+        ).mappings()
+        return [dict(row) for row in rows]
@@ -2,89 +2,53 @@
 from pathlib import Path
 from datetime import date
 
-import pandas as pd
-
-from db import engine, ensure_core_tables
-
-
-def process_mb52(file_path: Path, upload_batch_id: str, snapshot_date: date) -> None:
+from source_spec import Derived, SourceSpec, run_source
+
+# fact_inventory_snapshot, derived on the server from raw_mb52
+_FACT_SELECT = {
+    "upload_batch_id": "upload_batch_id",
+    "bukrs": "bukrs",
+    "werks": "werks",
+    "lgort": "lgort",
+    "matnr": "matnr",
+    "mat_desc": "mat_desc",
+    "charg": "charg",
+    "qty": "COALESCE(labst, 0)",
+    "value_unrestricted": "COALESCE(value_unrestricted, 0)",
+    "meins": "meins",
+    "snapshot_date": "snapshot_date",
+    "source": "'MB52'",
+    "total_value": "COALESCE(value_unrestricted, 0)",
+}
+
+
+MB52_SPEC = SourceSpec(
+    name="MB52",
+    columns={
+        "bukrs": "Company Code",
+        "werks": "Plant",
+        "lgort": "Storage Location",
+        "matnr": "Material",
+        "mat_desc": "Material Description",
+        "charg": "Batch",
+        "labst": "Unrestricted",
+        "value_unrestricted": "Value Unrestricted",
+        "meins": "Base Unit of Measure",
+    },
+    kinds={"labst": "number_text", "value_unrestricted": "number_text"},
+    outputs={"raw_mb52": {}},
+    derived=(Derived("fact_inventory_snapshot", "raw_mb52", _FACT_SELECT),),
+)
+
+
+def process_mb52(
+    file_path: Path,
+    upload_batch_id: str,
+    snapshot_date: date,
+    chunksize: int | None = None,
+) -> int:
     """
     Load MB52 Excel, clean it, and insert into raw_mb52 and fact_inventory_snapshot.
+    With a chunksize the workbook is streamed and loaded chunk by chunk.
     """
-    ensure_core_tables()
-
-    df = pd.read_excel(file_path)
-
-    column_map = {
-        "Company Code": "bukrs",
-        "Plant": "werks",
-        "Storage Location": "lgort",
-        "Material": "matnr",
-        "Material Description": "mat_desc",
-        "Batch": "charg",
-        "Unrestricted": "labst",
-        "Value Unrestricted": "value_unrestricted",
-        "Base Unit of Measure": "meins",
-    }
-    df = df.rename(columns=column_map)
-
-    for col in [
-        "bukrs",
-        "werks",
-        "lgort",
-        "matnr",
-        "mat_desc",
-        "charg",
-        "labst",
-        "value_unrestricted",
-        "meins",
-    ]:
-        if col not in df.columns:
-            df[col] = None
-
-    for col in ["labst", "value_unrestricted"]:
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    raw_df = pd.DataFrame(
-        {
-            "upload_batch_id": upload_batch_id,
-            "bukrs": df.get("bukrs"),
-            "werks": df.get("werks"),
-            "lgort": df.get("lgort"),
-            "matnr": df.get("matnr"),
-            "mat_desc": df.get("mat_desc"),
-            "charg": df.get("charg"),
-            "labst": df.get("labst"),
-            "value_unrestricted": df.get("value_unrestricted"),
-            "meins": df.get("meins"),
-            "snapshot_date": snapshot_date,
-        }
-    )
-
-    raw_df.to_sql("raw_mb52", engine, if_exists="append", index=False)
-
-    fact_df = pd.DataFrame(
-        {
-            "upload_batch_id": upload_batch_id,
-            "bukrs": raw_df["bukrs"],
-            "werks": raw_df["werks"],
-            "lgort": raw_df["lgort"],
-            "matnr": raw_df["matnr"],
-            "mat_desc": raw_df["mat_desc"],
-            "charg": raw_df["charg"],
-            "qty": raw_df["labst"].fillna(0),
-            "value_unrestricted": raw_df["value_unrestricted"].fillna(0),
-            "meins": raw_df["meins"],
-            "snapshot_date": raw_df["snapshot_date"],
-            "source": "MB52",
-            "total_value": raw_df["value_unrestricted"].fillna(0),
-        }
-    )
-
-    fact_df.to_sql("fact_inventory_snapshot", engine, if_exists="append", index=False)
+    return run_source(MB52_SPEC, file_path, upload_batch_id, snapshot_date, chunksize)
@@ -0,0 +1,591 @@
+# migration_ddl.py
+from __future__ import annotations
+
+# -------------------------------------------------------------------
+# CREATE TABLE statements as the migrations running them shipped.
+#
+# Copies, not generated from schema.py, so editing a declaration there
+# never changes what a numbered migration does. A schema change gets a
+# new migration with its own DDL.
+# -------------------------------------------------------------------
+
+# Migration 1: every table declared when versioned migrations began
+V1_TABLES: dict[str, str] = {
+    "raw_mb52": """
+        CREATE TABLE IF NOT EXISTS `raw_mb52` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `bukrs` VARCHAR(4) NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `charg` VARCHAR(20) NULL,
+            `labst` DECIMAL(18,3) NULL,
+            `value_unrestricted` DECIMAL(18,2) NULL,
+            `meins` VARCHAR(10) NULL,
+            `snapshot_date` DATE NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "fact_inventory_snapshot": """
+        CREATE TABLE IF NOT EXISTS `fact_inventory_snapshot` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `bukrs` VARCHAR(4) NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `charg` VARCHAR(20) NULL,
+            `qty` DECIMAL(18,3) NULL,
+            `value_unrestricted` DECIMAL(18,2) NULL,
+            `meins` VARCHAR(10) NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `total_value` DECIMAL(18,2) NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "raw_zmmr014": """
+        CREATE TABLE IF NOT EXISTS `raw_zmmr014` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `bukrs` VARCHAR(4) NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `charg` VARCHAR(20) NULL,
+            `qty` DECIMAL(18,3) NULL,
+            `value_unrestricted` DECIMAL(18,2) NULL,
+            `meins` VARCHAR(10) NULL,
+            `plant` VARCHAR(10) NULL,
+            `material` VARCHAR(40) NULL,
+            `model_no` VARCHAR(255) NULL,
+            `prod_hierarchy` VARCHAR(40) NULL,
+            `material_type` VARCHAR(10) NULL,
+            `description` VARCHAR(255) NULL,
+            `prod_group` VARCHAR(255) NULL,
+            `prod_cat` VARCHAR(255) NULL,
+            `prod_line` VARCHAR(255) NULL,
+            `movement_type` VARCHAR(10) NULL,
+            `movement_desc` VARCHAR(255) NULL,
+            `date_of_income` DATE NULL,
+            `days` INT NULL,
+            `aging_qty` DECIMAL(18,3) NULL,
+            `std_price` DECIMAL(18,4) NULL,
+            `currency` VARCHAR(5) NULL,
+            `aging_val` DECIMAL(18,2) NULL,
+            `report_date` DATE NULL,
+            `report_time` VARCHAR(20) NULL,
+            `zmmr015_power` VARCHAR(50) NULL,
+            `odoo` VARCHAR(50) NULL,
+            `final_aging` VARCHAR(50) NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "fact_aging": """
+        CREATE TABLE IF NOT EXISTS `fact_aging` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `source` VARCHAR(20) NOT NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `bukrs` VARCHAR(4) NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `date_of_income` DATE NULL,
+            `days` INT NULL,
+            `aging_qty` DECIMAL(18,3) NULL,
+            `std_price` DECIMAL(18,4) NULL,
+            `currency` VARCHAR(5) NULL,
+            `aging_val` DECIMAL(18,2) NULL,
+            `aging_years` DECIMAL(10,4) NULL,
+            `aging_bucket` VARCHAR(10) NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "raw_zmmr015_power": """
+        CREATE TABLE IF NOT EXISTS `raw_zmmr015_power` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `werks` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `date_of_income` DATE NULL,
+            `aging_qty` DECIMAL(18,3) NULL,
+            `aging_val` DECIMAL(18,2) NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `extra_json` JSON NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "fact_zmmr015_power": """
+        CREATE TABLE IF NOT EXISTS `fact_zmmr015_power` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `werks` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `date_of_income` DATE NULL,
+            `aging_qty` DECIMAL(18,3) NULL,
+            `aging_val` DECIMAL(18,2) NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "raw_odoo_aging": """
+        CREATE TABLE IF NOT EXISTS `raw_odoo_aging` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `product_code` VARCHAR(40) NULL,
+            `product_name` VARCHAR(255) NULL,
+            `last_incoming` DATE NULL,
+            `last_outgoing` DATE NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "fact_odoo_aging": """
+        CREATE TABLE IF NOT EXISTS `fact_odoo_aging` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `product_code` VARCHAR(40) NULL,
+            `product_name` VARCHAR(255) NULL,
+            `last_incoming` DATE NULL,
+            `last_outgoing` DATE NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `days_since_last_incoming` INT NULL,
+            `days_since_last_outgoing` INT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "raw_zsdr030a": """
+        CREATE TABLE IF NOT EXISTS `raw_zsdr030a` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `channel` VARCHAR(40) NULL,
+            `sales_office` VARCHAR(40) NULL,
+            `sales_doc` VARCHAR(20) NULL,
+            `document_date` DATE NULL,
+            `creation_date` DATE NULL,
+            `so_type` VARCHAR(10) NULL,
+            `sold_to_number` VARCHAR(40) NULL,
+            `sold_to_name` VARCHAR(255) NULL,
+            `sold_to_country` VARCHAR(40) NULL,
+            `ship_to_number` VARCHAR(40) NULL,
+            `ship_to_name` VARCHAR(255) NULL,
+            `ship_to_country` VARCHAR(40) NULL,
+            `bill_to_number` VARCHAR(40) NULL,
+            `bill_to_name` VARCHAR(255) NULL,
+            `bill_to_country` VARCHAR(40) NULL,
+            `item` VARCHAR(20) NULL,
+            `item_type` VARCHAR(10) NULL,
+            `po_number` VARCHAR(255) NULL,
+            `po_item_number` VARCHAR(40) NULL,
+            `material` VARCHAR(40) NULL,
+            `brand` VARCHAR(40) NULL,
+            `material_desc` VARCHAR(255) NULL,
+            `storage_location` VARCHAR(10) NULL,
+            `unit_price` DECIMAL(18,4) NULL,
+            `so_qty` DECIMAL(18,3) NULL,
+            `dn_qty` DECIMAL(18,3) NULL,
+            `pgi_qty` DECIMAL(18,3) NULL,
+            `to_pgi_qty` DECIMAL(18,3) NULL,
+            `invoiced_qty` DECIMAL(18,3) NULL,
+            `to_invoice_qty` DECIMAL(18,3) NULL,
+            `open_so_qty` DECIMAL(18,3) NULL,
+            `so_amount` DECIMAL(18,2) NULL,
+            `delivered_amount` DECIMAL(18,2) NULL,
+            `inv_amount` DECIMAL(18,2) NULL,
+            `inv_date` DATE NULL,
+            `so_open_amount` DECIMAL(18,2) NULL,
+            `foc` VARCHAR(10) NULL,
+            `cancel_reason` VARCHAR(255) NULL,
+            `req_deliv_date` DATE NULL,
+            `planned_gi_date` DATE NULL,
+            `actual_gi_date` DATE NULL,
+            `item_deliv_status` VARCHAR(40) NULL,
+            `delivery_status` VARCHAR(40) NULL,
+            `channel_code` VARCHAR(40) NULL,
+            `acctassgr` VARCHAR(10) NULL,
+            `inside_sales_no` VARCHAR(40) NULL,
+            `inside_sales` VARCHAR(255) NULL,
+            `sales_employee_no` VARCHAR(40) NULL,
+            `sales_employee` VARCHAR(255) NULL,
+            `payment_term` VARCHAR(40) NULL,
+            `delivery_block` VARCHAR(40) NULL,
+            `debit_down_payment` DECIMAL(18,2) NULL,
+            `cleared_down_payment` DECIMAL(18,2) NULL,
+            `open_dp_amount` DECIMAL(18,2) NULL,
+            `crm_id` VARCHAR(40) NULL,
+            `related_order` VARCHAR(40) NULL,
+            `related_order_item` VARCHAR(40) NULL,
+            `combination_no` VARCHAR(40) NULL,
+            `incompl_due_to` VARCHAR(255) NULL,
+            `glt_di_fee_item` VARCHAR(40) NULL,
+            `glt_di_fee_header` VARCHAR(40) NULL,
+            `model_no` VARCHAR(255) NULL,
+            `product_series` VARCHAR(255) NULL,
+            `product_category` VARCHAR(255) NULL,
+            `fob_stdprice` DECIMAL(18,4) NULL,
+            `moving_price` DECIMAL(18,4) NULL,
+            `price_ctl` VARCHAR(10) NULL,
+            `contract` VARCHAR(40) NULL,
+            `profit_percent` DECIMAL(12,4) NULL,
+            `project` VARCHAR(255) NULL,
+            `order_comments_header` TEXT NULL,
+            `currency` VARCHAR(5) NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `open_qty` DECIMAL(18,3) NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "fact_zsdr030a": """
+        CREATE TABLE IF NOT EXISTS `fact_zsdr030a` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `channel` VARCHAR(40) NULL,
+            `sales_office` VARCHAR(40) NULL,
+            `sales_doc` VARCHAR(20) NULL,
+            `document_date` DATE NULL,
+            `creation_date` DATE NULL,
+            `so_type` VARCHAR(10) NULL,
+            `sold_to_number` VARCHAR(40) NULL,
+            `sold_to_name` VARCHAR(255) NULL,
+            `sold_to_country` VARCHAR(40) NULL,
+            `ship_to_number` VARCHAR(40) NULL,
+            `ship_to_name` VARCHAR(255) NULL,
+            `ship_to_country` VARCHAR(40) NULL,
+            `bill_to_number` VARCHAR(40) NULL,
+            `bill_to_name` VARCHAR(255) NULL,
+            `bill_to_country` VARCHAR(40) NULL,
+            `item` VARCHAR(20) NULL,
+            `item_type` VARCHAR(10) NULL,
+            `po_number` VARCHAR(255) NULL,
+            `po_item_number` VARCHAR(40) NULL,
+            `material` VARCHAR(40) NULL,
+            `brand` VARCHAR(40) NULL,
+            `material_desc` VARCHAR(255) NULL,
+            `storage_location` VARCHAR(10) NULL,
+            `unit_price` DECIMAL(18,4) NULL,
+            `so_qty` DECIMAL(18,3) NULL,
+            `dn_qty` DECIMAL(18,3) NULL,
+            `pgi_qty` DECIMAL(18,3) NULL,
+            `to_pgi_qty` DECIMAL(18,3) NULL,
+            `invoiced_qty` DECIMAL(18,3) NULL,
+            `to_invoice_qty` DECIMAL(18,3) NULL,
+            `open_so_qty` DECIMAL(18,3) NULL,
+            `so_amount` DECIMAL(18,2) NULL,
+            `delivered_amount` DECIMAL(18,2) NULL,
+            `inv_amount` DECIMAL(18,2) NULL,
+            `inv_date` DATE NULL,
+            `so_open_amount` DECIMAL(18,2) NULL,
+            `foc` VARCHAR(10) NULL,
+            `cancel_reason` VARCHAR(255) NULL,
+            `req_deliv_date` DATE NULL,
+            `planned_gi_date` DATE NULL,
+            `actual_gi_date` DATE NULL,
+            `item_deliv_status` VARCHAR(40) NULL,
+            `delivery_status` VARCHAR(40) NULL,
+            `channel_code` VARCHAR(40) NULL,
+            `acctassgr` VARCHAR(10) NULL,
+            `inside_sales_no` VARCHAR(40) NULL,
+            `inside_sales` VARCHAR(255) NULL,
+            `sales_employee_no` VARCHAR(40) NULL,
+            `sales_employee` VARCHAR(255) NULL,
+            `payment_term` VARCHAR(40) NULL,
+            `delivery_block` VARCHAR(40) NULL,
+            `debit_down_payment` DECIMAL(18,2) NULL,
+            `cleared_down_payment` DECIMAL(18,2) NULL,
+            `open_dp_amount` DECIMAL(18,2) NULL,
+            `crm_id` VARCHAR(40) NULL,
+            `related_order` VARCHAR(40) NULL,
+            `related_order_item` VARCHAR(40) NULL,
+            `combination_no` VARCHAR(40) NULL,
+            `incompl_due_to` VARCHAR(255) NULL,
+            `glt_di_fee_item` VARCHAR(40) NULL,
+            `glt_di_fee_header` VARCHAR(40) NULL,
+            `model_no` VARCHAR(255) NULL,
+            `product_series` VARCHAR(255) NULL,
+            `product_category` VARCHAR(255) NULL,
+            `fob_stdprice` DECIMAL(18,4) NULL,
+            `moving_price` DECIMAL(18,4) NULL,
+            `price_ctl` VARCHAR(10) NULL,
+            `contract` VARCHAR(40) NULL,
+            `profit_percent` DECIMAL(12,4) NULL,
+            `project` VARCHAR(255) NULL,
+            `order_comments_header` TEXT NULL,
+            `currency` VARCHAR(5) NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `open_qty` DECIMAL(18,3) NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "raw_zsdr004": """
+        CREATE TABLE IF NOT EXISTS `raw_zsdr004` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `sales_org` VARCHAR(40) NULL,
+            `sales_office` VARCHAR(40) NULL,
+            `sales_group` VARCHAR(40) NULL,
+            `werks` VARCHAR(10) NULL,
+            `item_net_value_usd` VARCHAR(255) NULL,
+            `order_quantity` VARCHAR(255) NULL,
+            `sales_quantity` VARCHAR(255) NULL,
+            `item_net_value_usd_num` DECIMAL(18,2) NULL,
+            `order_quantity_num` DECIMAL(18,3) NULL,
+            `sales_quantity_num` DECIMAL(18,3) NULL,
+            `billing_date_raw` VARCHAR(255) NULL,
+            `billing_date` DATE NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `extra_json` JSON NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "fact_zsdr004": """
+        CREATE TABLE IF NOT EXISTS `fact_zsdr004` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `sales_org` VARCHAR(40) NULL,
+            `sales_office` VARCHAR(40) NULL,
+            `sales_group` VARCHAR(40) NULL,
+            `werks` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `billing_date` DATE NULL,
+            `item_net_value_usd` DECIMAL(18,2) NULL,
+            `order_quantity` DECIMAL(18,3) NULL,
+            `sales_quantity` DECIMAL(18,3) NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "raw_zmm345e": """
+        CREATE TABLE IF NOT EXISTS `raw_zmm345e` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `material` VARCHAR(40) NULL,
+            `industry_sector` VARCHAR(10) NULL,
+            `mat_type` VARCHAR(10) NULL,
+            `plant` VARCHAR(10) NULL,
+            `sloc` VARCHAR(10) NULL,
+            `sales_org` VARCHAR(10) NULL,
+            `dist_channel` VARCHAR(10) NULL,
+            `description` VARCHAR(255) NULL,
+            `base_uom` VARCHAR(10) NULL,
+            `mat_group` VARCHAR(40) NULL,
+            `old_part_no` VARCHAR(40) NULL,
+            `division` VARCHAR(10) NULL,
+            `item_category_basic` VARCHAR(10) NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "fact_zmm345e": """
+        CREATE TABLE IF NOT EXISTS `fact_zmm345e` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `material_type` VARCHAR(10) NULL,
+            `material_group` VARCHAR(40) NULL,
+            `base_uom` VARCHAR(10) NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "dim_material_master": """
+        CREATE TABLE IF NOT EXISTS `dim_material_master` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `material_code` VARCHAR(40) NULL,
+            `description` VARCHAR(255) NULL,
+            `brand` VARCHAR(40) NULL,
+            `product_line` VARCHAR(255) NULL,
+            `product_group` VARCHAR(255) NULL,
+            `product_series` VARCHAR(255) NULL,
+            `material_group_code` VARCHAR(40) NULL,
+            `material_group_desc` VARCHAR(255) NULL,
+            `material_group_desc2` VARCHAR(255) NULL,
+            `material_group_display_desc` VARCHAR(255) NULL,
+            `material_type_code` VARCHAR(10) NULL,
+            `material_type_desc` VARCHAR(255) NULL,
+            `material_type_group` VARCHAR(255) NULL,
+            `sloc` VARCHAR(10) NULL,
+            `sloc_description` VARCHAR(255) NULL,
+            `storage_group` VARCHAR(40) NULL,
+            `old_part_no` VARCHAR(40) NULL,
+            `serial_number_profile` VARCHAR(10) NULL,
+            `is_serialized` TINYINT(1) NULL,
+            `standard_price` DECIMAL(18,4) NULL,
+            `price_control` VARCHAR(10) NULL,
+            `vendor_code` VARCHAR(40) NULL,
+            `vendor_country` VARCHAR(40) NULL,
+            `vendor_postal_code` VARCHAR(40) NULL,
+            `vendor_search_term` VARCHAR(255) NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "ingest_jobs": """
+        CREATE TABLE IF NOT EXISTS `ingest_jobs` (
+            `job_id` VARCHAR(36) NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `file_paths` TEXT NOT NULL,
+            `file_sha256` CHAR(64) NULL,
+            `file_bytes` BIGINT NULL,
+            `options` TEXT NULL,
+            `status` VARCHAR(10) NOT NULL,
+            `attempts` INT NOT NULL DEFAULT 0,
+            `rows_loaded` BIGINT NULL,
+            `error` TEXT NULL,
+            `created_at` DATETIME(3) NOT NULL,
+            `started_at` DATETIME(3) NULL,
+            `finished_at` DATETIME(3) NULL,
+            `duration_seconds` DECIMAL(12,3) NULL,
+            PRIMARY KEY (`job_id`),
+            KEY `idx_ingest_jobs_status` (`status`, `created_at`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "upload_catalog": """
+        CREATE TABLE IF NOT EXISTS `upload_catalog` (
+            `file_sha256` CHAR(64) NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `file_bytes` BIGINT NULL,
+            `created_at` DATETIME(3) NOT NULL,
+            PRIMARY KEY (`file_sha256`, `source`, `snapshot_date`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+}
+
+
+# Migration 5
+V5_TABLES: dict[str, str] = {
+    "material_master_stats": """
+        CREATE TABLE IF NOT EXISTS `material_master_stats` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `total_rows` INT NOT NULL,
+            `serialized_rows` INT NOT NULL,
+            `not_serialized_rows` INT NOT NULL,
+            `distinct_brands` INT NOT NULL,
+            `distinct_material_groups` INT NOT NULL,
+            `distinct_vendors` INT NOT NULL,
+            `rows_written` INT NOT NULL,
+            `created_at` DATETIME(3) NOT NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+}
+
+
+# Migration 6
+V6_TABLES: dict[str, str] = {
+    "agg_inventory_group": """
+        CREATE TABLE IF NOT EXISTS `agg_inventory_group` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `material_group_code` VARCHAR(40) NULL,
+            `row_count` INT NOT NULL,
+            `material_count` INT NOT NULL,
+            `total_qty` DECIMAL(20,3) NULL,
+            `total_value` DECIMAL(20,2) NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "agg_inventory_plant": """
+        CREATE TABLE IF NOT EXISTS `agg_inventory_plant` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `snapshot_date` DATE NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `werks` VARCHAR(10) NULL,
+            `row_count` INT NOT NULL,
+            `material_count` INT NOT NULL,
+            `total_qty` DECIMAL(20,3) NULL,
+            `total_value` DECIMAL(20,2) NULL,
+            PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "rollup_refresh_status": """
+        CREATE TABLE IF NOT EXISTS `rollup_refresh_status` (
+            `rollup` VARCHAR(64) NOT NULL,
+            `source` VARCHAR(20) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `upload_batch_id` VARCHAR(36) NULL,
+            `status` VARCHAR(10) NOT NULL,
+            `rows_written` INT NULL,
+            `refreshed_at` DATETIME(3) NULL,
+            `duration_seconds` DECIMAL(12,3) NULL,
+            `error` TEXT NULL,
+            PRIMARY KEY (`rollup`, `source`, `snapshot_date`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+}
+
+
+# Migration 7
+V7_TABLES: dict[str, str] = {
+    "fact_final_aging": """
+        CREATE TABLE IF NOT EXISTS `fact_final_aging` (
+            `id` BIGINT NOT NULL AUTO_INCREMENT,
+            `source` VARCHAR(20) NOT NULL,
+            `upload_batch_id` VARCHAR(36) NOT NULL,
+            `snapshot_date` DATE NOT NULL,
+            `bukrs` VARCHAR(4) NULL,
+            `werks` VARCHAR(10) NULL,
+            `lgort` VARCHAR(10) NULL,
+            `matnr` VARCHAR(40) NULL,
+            `mat_desc` VARCHAR(255) NULL,
+            `aging_qty` DECIMAL(18,3) NULL,
+            `aging_val` DECIMAL(18,2) NULL,
+            `currency` VARCHAR(5) NULL,
+            `zmmr014_date_of_income` DATE NULL,
+            `zmmr015_power_date_of_income` DATE NULL,
+            `odoo_last_incoming` DATE NULL,
+            `date_of_income` DATE NULL,
+            `final_source` VARCHAR(20) NOT NULL,
+            `days` INT NULL,
+            `aging_years` DECIMAL(10,4) NULL,
+            `aging_bucket` VARCHAR(10) NULL,
+            PRIMARY KEY (`id`, `snapshot_date`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        PARTITION BY RANGE COLUMNS(snapshot_date)
+            (PARTITION pmax VALUES LESS THAN (MAXVALUE))
+    """,
+}
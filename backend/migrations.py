@@ -0,0 +1,308 @@
+# migrations.py
+from __future__ import annotations
+
+import logging
+import re
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from db import engine
+from material_master import backfill_versions
+from migration_ddl import V1_TABLES, V5_TABLES, V6_TABLES, V7_TABLES
+from partitions import partition_existing_tables
+from rollups import backfill_rollups
+
+logger = logging.getLogger(__name__)
+
+# Serializes migrations when several API processes start at once
+MIGRATION_LOCK = "sap_reporting_migrations"
+MIGRATION_LOCK_TIMEOUT_SECONDS = 300
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _existing_columns(conn: Connection) -> dict[str, dict[str, str]]:
+    """
+    {table: {column: column_type}} for the current schema, in one query.
+    """
+    rows = conn.execute(
+        text(
+            """
+            SELECT table_name, column_name, column_type
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE()
+            """
+        )
+    )
+    existing: dict[str, dict[str, str]] = {}
+    for table_name, column_name, column_type in rows:
+        existing.setdefault(table_name, {})[column_name] = column_type
+    return existing
+
+
+def _base_type(decl: str) -> str:
+    """
+    "DECIMAL(18,3) NULL" -> "decimal(18,3)"; integer display widths are
+    dropped so "int" matches information_schema's "int(11)".
+    """
+    base = re.split(r"\s+(?:NOT\s+NULL|NULL|DEFAULT|AUTO_INCREMENT)\b", decl, 1)[0]
+    return _normalize_type(base)
+
+
+def _normalize_type(column_type: str) -> str:
+    t = column_type.strip().lower()
+    if t != "tinyint(1)":
+        t = re.sub(r"^(tinyint|smallint|mediumint|int|bigint)\(\d+\)", r"\1", t)
+    # MariaDB reports JSON columns as longtext
+    return "longtext" if t == "json" else t
+
+
+# -------------------------------------------------------------------
+# Migrations
+# -------------------------------------------------------------------
+
+
+def _create_tables(conn: Connection, tables: dict[str, str]) -> None:
+    for create_sql in tables.values():
+        conn.execute(text(create_sql))
+
+
+def _declared_columns(create_sql: str) -> tuple[list[tuple[str, str]], bool]:
+    """
+    ([(column, declaration)], whether `id` is in the primary key) of a
+    CREATE TABLE statement from migration_ddl.py.
+    """
+    columns, id_key = [], False
+    for line in create_sql.splitlines():
+        line = line.strip().rstrip(",")
+        column = re.match(r"`(\w+)`\s+(.+)", line)
+        if column:
+            columns.append((column.group(1), column.group(2)))
+        elif line.startswith("PRIMARY KEY"):
+            id_key = "`id`" in line
+    return columns, id_key
+
+
+def _create_v1_tables(conn: Connection) -> None:
+    _create_tables(conn, V1_TABLES)
+
+
+def _reconcile_legacy_columns(conn: Connection) -> None:
+    """
+    Tables created earlier by DataFrame.to_sql have TEXT/DOUBLE columns,
+    no primary key and sometimes miss newer columns. Bring them in line
+    with the tables migration 1 declares.
+    """
+    existing = _existing_columns(conn)
+
+    for name, create_sql in V1_TABLES.items():
+        current = existing.get(name)
+        if current is None:
+            continue
+
+        columns, id_key = _declared_columns(create_sql)
+        alters = []
+        if id_key and "id" not in current:
+            alters.append(
+                "ADD COLUMN `id` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST"
+            )
+        for column, decl in columns:
+            if column == "id" and id_key:
+                continue
+            if column not in current:
+                alters.append(f"ADD COLUMN `{column}` {decl}")
+            elif _normalize_type(current[column]) != _base_type(decl):
+                alters.append(f"MODIFY COLUMN `{column}` {decl}")
+        # pandas' default index column from early to_sql calls
+        if "index" in current:
+            alters.append("DROP COLUMN `index`")
+
+        if alters:
+            logger.info("Reconciling %s: %d changes", name, len(alters))
+            conn.execute(text(f"ALTER TABLE `{name}` " + ", ".join(alters)))
+
+
+def _partition_snapshot_tables(conn: Connection) -> None:
+    partition_existing_tables(
+        conn, ["fact_inventory_snapshot", "fact_aging", "fact_zsdr030a"]
+    )
+
+
+def _version_material_master(conn: Connection) -> None:
+    conn.execute(
+        text(
+            """
+            ALTER TABLE dim_material_master
+                ADD COLUMN IF NOT EXISTS `row_hash` CHAR(32) NULL,
+                ADD COLUMN IF NOT EXISTS `valid_from` DATE NULL,
+                ADD COLUMN IF NOT EXISTS `valid_to` DATE NULL,
+                ADD COLUMN IF NOT EXISTS `is_current` TINYINT(1) NOT NULL DEFAULT 0
+            """
+        )
+    )
+    backfill_versions(conn)
+
+
+def _create_material_master_stats(conn: Connection) -> None:
+    _create_tables(conn, V5_TABLES)
+
+
+def _create_rollups(conn: Connection) -> None:
+    _create_tables(conn, V6_TABLES)
+    backfill_rollups(conn)
+
+
+def _create_final_aging(conn: Connection) -> None:
+    _create_tables(conn, V7_TABLES)
+
+
+def _add_aging_buckets(conn: Connection) -> None:
+    # History is filled in and the old "3-5Y" bucket relabelled by the
+    # REBUCKET_AGING job startup queues after this migration (see
+    # FOLLOW_UP_JOBS)
+    conn.execute(
+        text(
+            """
+            ALTER TABLE fact_zmmr015_power
+                ADD COLUMN IF NOT EXISTS `days` INT NULL,
+                ADD COLUMN IF NOT EXISTS `aging_bucket` VARCHAR(10) NULL
+            """
+        )
+    )
+    conn.execute(
+        text(
+            """
+            ALTER TABLE fact_odoo_aging
+                ADD COLUMN IF NOT EXISTS `aging_bucket` VARCHAR(10) NULL
+            """
+        )
+    )
+
+
+def _add_job_leases(conn: Connection) -> None:
+    conn.execute(
+        text(
+            """
+            ALTER TABLE ingest_jobs
+                ADD COLUMN IF NOT EXISTS `worker_id` VARCHAR(64) NULL
+                    AFTER `attempts`,
+                ADD COLUMN IF NOT EXISTS `lease_expires_at` DATETIME(3) NULL
+                    AFTER `worker_id`
+            """
+        )
+    )
+
+
+def _add_dates_coerced(conn: Connection) -> None:
+    conn.execute(
+        text(
+            """
+            ALTER TABLE ingest_jobs
+                ADD COLUMN IF NOT EXISTS `dates_coerced` TEXT NULL
+                    AFTER `rows_loaded`
+            """
+        )
+    )
+
+
+def _null_unknown_aging_buckets(conn: Connection) -> None:
+    # No DDL: rows with unknown days move from the overflow bucket to NULL
+    # through the REBUCKET_AGING job queued after this migration
+    pass
+
+
+# (version, description, migration). Append only; never renumber or edit
+# a migration that has shipped.
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create declared tables", _create_v1_tables),
+    (2, "retype legacy to_sql tables", _reconcile_legacy_columns),
+    (3, "partition snapshot fact tables by month", _partition_snapshot_tables),
+    (4, "version dim_material_master (SCD type 2)", _version_material_master),
+    (5, "create material_master_stats", _create_material_master_stats),
+    (6, "create and backfill inventory rollups", _create_rollups),
+    (7, "create fact_final_aging", _create_final_aging),
+    (8, "add aging buckets to Odoo and ZMMR015 Power", _add_aging_buckets),
+    (9, "add worker leases to ingest_jobs", _add_job_leases),
+    (10, "record coerced date values per ingest job", _add_dates_coerced),
+    (11, "no aging bucket for unknown days", _null_unknown_aging_buckets),
+]
+
+# Ingest jobs (by source name) to queue once a migration has been applied,
+# after the workers start. Migrations themselves never touch the queue.
+FOLLOW_UP_JOBS: dict[int, str] = {
+    8: "REBUCKET_AGING",
+    11: "REBUCKET_AGING",
+}
+
+
+def follow_up_jobs(applied: list[int]) -> list[str]:
+    # Once per job, however many applied migrations ask for it
+    jobs = [FOLLOW_UP_JOBS[v] for v in applied if v in FOLLOW_UP_JOBS]
+    return list(dict.fromkeys(jobs))
+
+
+# -------------------------------------------------------------------
+# Runner
+# -------------------------------------------------------------------
+
+
+def run_migrations() -> list[int]:
+    """
+    Apply pending migrations once, at startup. Returns the versions
+    applied by this call.
+    """
+    applied_now: list[int] = []
+
+    with engine.connect() as conn:
+        got_lock = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK, "timeout": MIGRATION_LOCK_TIMEOUT_SECONDS},
+        ).scalar()
+        if not got_lock:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+
+        try:
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INT NOT NULL PRIMARY KEY,
+                        description VARCHAR(255) NOT NULL,
+                        applied_at DATETIME(3) NOT NULL
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                    """
+                )
+            )
+            conn.commit()
+
+            done = set(
+                conn.execute(text("SELECT version FROM schema_version")).scalars()
+            )
+            for version, description, migrate in MIGRATIONS:
+                if version in done:
+                    continue
+                logger.info("Applying migration %d: %s", version, description)
+                # DDL commits implicitly in MariaDB, so a migration is not
+                # atomic; each one must be safe to re-run after a failure.
+                migrate(conn)
+                conn.execute(
+                    text(
+                        """
+                        INSERT INTO schema_version (version, description, applied_at)
+                        VALUES (:version, :description, NOW(3))
+                        """
+                    ),
+                    {"version": version, "description": description},
+                )
+                conn.commit()
+                applied_now.append(version)
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK})
+            conn.commit()
+
+    return applied_now
@@ -0,0 +1,224 @@
+# partitions.py
+from __future__ import annotations
+
+import logging
+import os
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from db import engine
+from schema import TABLES
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# Monthly partitions kept ready beyond the current month
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Whole months of snapshots to keep; older partitions are dropped.
+# 0 keeps everything.
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = int(
+    os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "86400")
+)
+
+
+def partitioned_tables() -> list[str]:
+    return [t.name for t in TABLES.values() if t.partition_by_month]
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partition(d: date) -> str:
+    """
+    Name of the monthly partition holding snapshot date d.
+    """
+    return f"p{d:%Y%m}"
+
+
+def _partition_defs(first: date, last: date) -> list[str]:
+    """
+    One pYYYYMM partition per month from `first` to `last` inclusive,
+    followed by the catch-all pmax.
+    """
+    defs = []
+    month = _month_start(first)
+    while month <= last:
+        bound = _add_months(month, 1)
+        defs.append(
+            f"PARTITION {month_partition(month)} "
+            f"VALUES LESS THAN ('{bound.isoformat()}')"
+        )
+        month = bound
+    defs.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return defs
+
+
+def table_partitions(conn: Connection, table: str) -> list[tuple[str, date | None]]:
+    """
+    [(partition_name, upper_bound)] in order; pmax has bound None.
+    Empty when the table is not partitioned.
+    """
+    rows = conn.execute(
+        text(
+            """
+            SELECT partition_name, partition_description
+            FROM information_schema.partitions
+            WHERE table_schema = DATABASE() AND table_name = :table
+              AND partition_name IS NOT NULL
+            ORDER BY partition_ordinal_position
+            """
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for name, description in rows:
+        bound = None
+        if description and description.upper() != "MAXVALUE":
+            bound = date.fromisoformat(description.strip("'"))
+        partitions.append((name, bound))
+    return partitions
+
+
+def _min_snapshot_date(conn: Connection, table: str) -> date | None:
+    return conn.execute(text(f"SELECT MIN(snapshot_date) FROM `{table}`")).scalar()
+
+
+# -------------------------------------------------------------------
+# Migration: partition existing tables
+# -------------------------------------------------------------------
+
+
+def partition_existing_tables(conn: Connection, tables: list[str]) -> None:
+    """
+    Tables created before partitioning was declared have a plain `id`
+    primary key. Widen the key to (id, snapshot_date) and split the
+    existing rows into monthly partitions. Rebuilds each table once.
+    """
+    last = _add_months(_month_start(date.today()), PARTITION_MONTHS_AHEAD)
+
+    for table in tables:
+        if table_partitions(conn, table):
+            continue
+
+        pk = conn.execute(
+            text(
+                """
+                SELECT column_name FROM information_schema.key_column_usage
+                WHERE table_schema = DATABASE() AND table_name = :table
+                  AND constraint_name = 'PRIMARY'
+                ORDER BY ordinal_position
+                """
+            ),
+            {"table": table},
+        ).scalars().all()
+        if list(pk) != ["id", "snapshot_date"]:
+            conn.execute(
+                text(
+                    f"ALTER TABLE `{table}` "
+                    "DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `snapshot_date`)"
+                )
+            )
+
+        first = _min_snapshot_date(conn, table) or date.today()
+        defs = ",\n    ".join(_partition_defs(first, last))
+        logger.info("Partitioning %s by month from %s", table, first)
+        conn.execute(
+            text(
+                f"ALTER TABLE `{table}` "
+                f"PARTITION BY RANGE COLUMNS(snapshot_date) (\n    {defs}\n)"
+            )
+        )
+
+
+# -------------------------------------------------------------------
+# Maintenance
+# -------------------------------------------------------------------
+
+
+def ensure_future_partitions(conn: Connection, table: str) -> list[str]:
+    """
+    Split pmax so monthly partitions exist through PARTITION_MONTHS_AHEAD
+    months from now. pmax is normally empty, so the reorganize is a
+    metadata-only change.
+    """
+    partitions = table_partitions(conn, table)
+    if not partitions:
+        logger.warning("%s is not partitioned; skipping", table)
+        return []
+
+    bounds = [bound for _, bound in partitions if bound is not None]
+    if bounds:
+        first = bounds[-1]
+    else:
+        # Only pmax so far: start at the oldest row it holds
+        first = _month_start(_min_snapshot_date(conn, table) or date.today())
+    last = _add_months(_month_start(date.today()), PARTITION_MONTHS_AHEAD)
+    if first > last:
+        return []
+
+    defs = _partition_defs(first, last)
+    conn.execute(
+        text(
+            f"ALTER TABLE `{table}` REORGANIZE PARTITION pmax INTO (\n    "
+            + ",\n    ".join(defs)
+            + "\n)"
+        )
+    )
+    added = [d.split()[1] for d in defs[:-1]]
+    logger.info("Added partitions to %s: %s", table, ", ".join(added))
+    return added
+
+
+def drop_expired_partitions(conn: Connection, table: str) -> list[str]:
+    """
+    Drop monthly partitions that lie entirely before the retention
+    window. Dropping a partition is a metadata operation, unlike a
+    DELETE over the same rows.
+    """
+    if PARTITION_RETENTION_MONTHS <= 0:
+        return []
+
+    cutoff = _add_months(_month_start(date.today()), -PARTITION_RETENTION_MONTHS)
+    expired = [
+        name
+        for name, bound in table_partitions(conn, table)
+        if bound is not None and bound <= cutoff
+    ]
+    if expired:
+        conn.execute(
+            text(f"ALTER TABLE `{table}` DROP PARTITION {', '.join(expired)}")
+        )
+        logger.info("Dropped expired partitions from %s: %s", table, expired)
+    return expired
+
+
+def maintain_partitions() -> dict[str, dict[str, list[str]]]:
+    """
+    Create upcoming monthly partitions and apply the retention policy
+    for every partitioned table.
+    """
+    result: dict[str, dict[str, list[str]]] = {}
+    with engine.connect() as conn:
+        for table in partitioned_tables():
+            added = ensure_future_partitions(conn, table)
+            dropped = drop_expired_partitions(conn, table)
+            conn.commit()
+            result[table] = {"added": added, "dropped": dropped}
+    return result
@@ -0,0 +1,407 @@
+# readers.py
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# Rows per chunk for streaming reads, so memory stays bounded on large
+# files. 0 reads the whole file at once (pd.read_excel for workbooks).
+EXCEL_CHUNK_ROWS = int(os.getenv("EXCEL_CHUNK_ROWS", "50000"))
+
+# pd.read_excel engine for whole-workbook reads: "openpyxl" or "calamine"
+# (Rust parser, from python-calamine). Chunked reads always stream with
+# openpyxl.
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "openpyxl")
+
+CSV_DELIMITER = os.getenv("CSV_DELIMITER", ",")
+CSV_ENCODING = os.getenv("CSV_ENCODING", "utf8")
+
+# Types tried, in order, for CSV columns not read as text
+_CSV_TYPES = (pa.int64(), pa.float64(), pa.timestamp("us"))
+
+Usecols = Callable[[str], bool]
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _convert_cell(cell):
+    """
+    Same cell conversion pandas' openpyxl reader applies, so chunked and
+    whole-file reads produce identical frames.
+    """
+    value = cell.value
+    if value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        as_int = int(value)
+        if as_int == value:
+            return as_int
+        return float(value)
+    return value
+
+
+def _convert_row(row) -> list:
+    values = [_convert_cell(cell) for cell in row]
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+
+def _to_frame(header: list, rows: list[list], dtype: dict | None) -> pd.DataFrame:
+    width = max(len(header), max((len(r) for r in rows), default=0))
+    padded = [r + [""] * (width - len(r)) for r in [header] + rows]
+    return TextParser(padded, header=0, dtype=dtype).read()
+
+
+def _is_blank(row) -> bool:
+    return all(cell.value is None for cell in row)
+
+
+def _chunk_rows(chunksize: int | None) -> int:
+    chunksize = chunksize if chunksize is not None else EXCEL_CHUNK_ROWS
+    return chunksize if chunksize and chunksize > 0 else 0
+
+
+def _excel_engine() -> str:
+    if EXCEL_ENGINE == "calamine" and not importlib.util.find_spec(
+        "python_calamine"
+    ):
+        logger.warning("EXCEL_ENGINE=calamine but python-calamine is missing")
+        return "openpyxl"
+    return EXCEL_ENGINE
+
+
+def _arrow_frame(table: pa.Table, dtype: dict | None) -> pd.DataFrame:
+    """
+    Arrow table -> the frame pd.read_excel gives for the same cells:
+    dates as datetime64, dtype=str columns as text with NaN for blanks,
+    dtype=object columns as cell values with NaN for blanks (integers stay
+    integers whether or not the chunk has nulls).
+    """
+    dtype = dtype or {}
+    for i, column in enumerate(table.schema):
+        if dtype.get(column.name) is str:
+            target = pa.string()
+        elif pa.types.is_date(column.type) or pa.types.is_timestamp(column.type):
+            # read_excel returns microsecond datetimes
+            target = pa.timestamp("us")
+        else:
+            continue
+        table = table.set_column(i, column.name, table[i].cast(target))
+    frame = table.to_pandas(date_as_object=False)
+    for name in frame.columns:
+        if dtype.get(name) is object:
+            values = table[name].to_pandas(integer_object_nulls=True)
+            frame[name] = values.astype(object).where(values.notna(), np.nan)
+    return frame
+
+
+def _csv_options() -> dict:
+    return {
+        "read_options": pa_csv.ReadOptions(encoding=CSV_ENCODING),
+        "parse_options": pa_csv.ParseOptions(delimiter=CSV_DELIMITER),
+    }
+
+
+def _csv_convert_options(
+    include: list[str] | None, types: dict
+) -> pa_csv.ConvertOptions:
+    return pa_csv.ConvertOptions(
+        include_columns=include, column_types=types, strings_can_be_null=True
+    )
+
+
+def _casts(column: pa.Array, target: pa.DataType) -> bool:
+    try:
+        column.cast(target)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return False
+    return True
+
+
+def _csv_column_types(file_path: Path, names: list[str]) -> dict[str, pa.DataType]:
+    """
+    Type per column that fits every value of the file, from one streaming
+    pass reading them as text: the first of _CSV_TYPES all non-null
+    values cast to, else string. Arrow's streaming reader infers types
+    from the first block only and fails on a later block that does not
+    fit them.
+    """
+    if not names:
+        return {}
+    candidates = {name: list(_CSV_TYPES) for name in names}
+    reader = pa_csv.open_csv(
+        file_path,
+        **_csv_options(),
+        convert_options=_csv_convert_options(
+            names, {name: pa.string() for name in names}
+        ),
+    )
+    for batch in reader:
+        for name, types in candidates.items():
+            column = batch.column(name)
+            candidates[name] = [t for t in types if _casts(column, t)]
+    return {
+        name: types[0] if types else pa.string()
+        for name, types in candidates.items()
+    }
+
+
+def _rechunk(
+    batches: Iterator[pa.RecordBatch], schema: pa.Schema, chunksize: int
+) -> Iterator[pa.Table]:
+    """
+    Tables of chunksize rows (the last one shorter) from record batches
+    of any size; one table of everything when chunksize is 0.
+    """
+    pending: list[pa.RecordBatch] = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while chunksize and rows >= chunksize:
+            table = pa.Table.from_batches(pending, schema)
+            yield table.slice(0, chunksize)
+            rest = table.slice(chunksize)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows or not chunksize:
+        yield pa.Table.from_batches(pending, schema)
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+def read_excel_header(file_path: Path) -> list[str]:
+    """
+    Header row of the first sheet (the first non-empty row), read
+    without loading the rest of the workbook.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = wb.worksheets[0]
+        sheet.reset_dimensions()
+        for row in sheet.rows:
+            values = _convert_row(row)
+            if values:
+                return [str(v) for v in values]
+        return []
+    finally:
+        wb.close()
+
+
+def iter_excel_rows(
+    file_path: Path,
+    chunksize: int,
+    usecols: Usecols | None = None,
+    dtype: dict | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream the first sheet of a workbook as DataFrames of at most
+    `chunksize` rows, using openpyxl read-only row iteration. Only the
+    cells of columns whose header passes `usecols` are converted.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = wb.worksheets[0]
+        sheet.reset_dimensions()
+
+        header: list | None = None
+        keep: list[int] | None = None
+        rows: list[list] = []
+        for row in sheet.rows:
+            if header is None:
+                values = _convert_row(row)
+                if values:
+                    header = values
+                    if usecols is not None:
+                        keep = [i for i, h in enumerate(header) if usecols(str(h))]
+                        header = [header[i] for i in keep]
+                continue
+            if keep is None:
+                values = _convert_row(row)
+                if not values:
+                    continue
+            else:
+                if _is_blank(row):
+                    continue
+                values = _convert_row([row[i] for i in keep if i < len(row)])
+            rows.append(values)
+            if len(rows) >= chunksize:
+                yield _to_frame(header, rows, dtype)
+                rows = []
+
+        if header is not None and rows:
+            yield _to_frame(header, rows, dtype)
+    finally:
+        wb.close()
+
+
+def read_excel_chunks(
+    file_path: Path,
+    chunksize: int | None = None,
+    usecols: Usecols | None = None,
+    dtype: dict | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the workbook as one or more DataFrames.
+
+    With chunksize 0 (or none and EXCEL_CHUNK_ROWS=0) this is a single
+    pd.read_excel call; otherwise rows are streamed in chunks so peak
+    memory stays bounded by the chunk size rather than the file size.
+    `usecols` (header -> keep?) and `dtype` are passed to the parser, so
+    columns nobody reads are never converted.
+    """
+    chunksize = _chunk_rows(chunksize)
+    if not chunksize:
+        wanted = None if usecols is None else (lambda h: usecols(str(h)))
+        yield pd.read_excel(
+            file_path, usecols=wanted, dtype=dtype, engine=_excel_engine()
+        )
+        return
+
+    yield from iter_excel_rows(file_path, chunksize, usecols, dtype)
+
+
+def read_csv_header(file_path: Path) -> list[str]:
+    return pa_csv.open_csv(file_path, **_csv_options()).schema.names
+
+
+def read_csv_chunks(
+    file_path: Path,
+    chunksize: int | None = None,
+    usecols: Usecols | None = None,
+    dtype: dict | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    CSV through pyarrow's streaming parser, so memory stays bounded by the
+    chunk size. Column types are settled over the whole file first (see
+    _csv_column_types), so every chunk gets the same ones.
+    """
+    header = read_csv_header(file_path)
+    include = [h for h in header if usecols(h)] if usecols is not None else None
+    strings = {h: pa.string() for h in dtype or {} if dtype[h] is str}
+    inferred = [h for h in include or header if h not in strings]
+    types = {**_csv_column_types(file_path, inferred), **strings}
+    reader = pa_csv.open_csv(
+        file_path,
+        **_csv_options(),
+        convert_options=_csv_convert_options(include, types),
+    )
+    for part in _rechunk(reader, reader.schema, _chunk_rows(chunksize)):
+        yield _arrow_frame(part, dtype)
+
+
+def read_parquet_header(file_path: Path) -> list[str]:
+    return pq.ParquetFile(file_path).schema_arrow.names
+
+
+def read_parquet_chunks(
+    file_path: Path,
+    chunksize: int | None = None,
+    usecols: Usecols | None = None,
+    dtype: dict | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Parquet, reading only the selected columns; with a chunksize the
+    file is streamed batch by batch.
+    """
+    parquet = pq.ParquetFile(file_path)
+    header = parquet.schema_arrow.names
+    columns = [h for h in header if usecols(h)] if usecols is not None else None
+    chunksize = _chunk_rows(chunksize)
+    if not chunksize:
+        yield _arrow_frame(parquet.read(columns=columns), dtype)
+        return
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+        yield _arrow_frame(pa.Table.from_batches([batch]), dtype)
+
+
+# -------------------------------------------------------------------
+# Reader backends by file type
+# -------------------------------------------------------------------
+
+
+class Reader(NamedTuple):
+    """
+    header(path) -> column names; chunks(path, chunksize, usecols, dtype)
+    -> DataFrames. Every backend yields the frames pd.read_excel would
+    for the same cells.
+    """
+
+    header: Callable[[Path], list[str]]
+    chunks: Callable[..., Iterator[pd.DataFrame]]
+
+
+_EXCEL = Reader(read_excel_header, read_excel_chunks)
+
+READERS: dict[str, Reader] = {
+    ".xlsx": _EXCEL,
+    ".xlsm": _EXCEL,
+    ".csv": Reader(read_csv_header, read_csv_chunks),
+    ".parquet": Reader(read_parquet_header, read_parquet_chunks),
+}
+
+
+def reader_for(file_path: Path) -> Reader:
+    """
+    Backend for the file's extension. Files without one are workbooks,
+    as uploads always were.
+    """
+    suffix = Path(file_path).suffix.lower()
+    if not suffix:
+        return _EXCEL
+    if suffix not in READERS:
+        raise ValueError(
+            f"Unsupported file type {suffix!r} "
+            f"(expected one of {', '.join(READERS)})"
+        )
+    return READERS[suffix]
+
+
+def read_header(file_path: Path) -> list[str]:
+    return reader_for(file_path).header(file_path)
+
+
+def read_chunks(
+    file_path: Path,
+    chunksize: int | None = None,
+    usecols: Usecols | None = None,
+    dtype: dict | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the file as one or more DataFrames, with the backend for its
+    type (see read_excel_chunks for chunksize, usecols and dtype).
+    """
+    yield from reader_for(file_path).chunks(file_path, chunksize, usecols, dtype)
+
+
+def read_frame(file_path: Path) -> pd.DataFrame:
+    """
+    The whole file as one DataFrame.
+    """
+    return next(read_chunks(file_path, chunksize=0))
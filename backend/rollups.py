@@ -0,0 +1,311 @@
+# rollups.py
+from __future__ import annotations
+
+import logging
+import os
+import time
+import traceback
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection
+
+from db import engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# Sources whose loads feed fact_inventory_snapshot
+ROLLUP_SOURCES = ("MB52", "ZMMR014")
+
+# Serializes refreshes, so the last one to run sees every committed load
+ROLLUP_LOCK = "inventory_rollup_refresh"
+ROLLUP_LOCK_TIMEOUT_SECONDS = int(os.getenv("ROLLUP_LOCK_TIMEOUT_SECONDS", "600"))
+
+
+class Rollup(NamedTuple):
+    """
+    A table of fact_inventory_snapshot aggregates, one row per group.
+    keys maps each group column to its SQL expression over the fact rows
+    (f) and the material group of their material (m).
+    """
+
+    table: str
+    keys: dict[str, str]
+
+
+_MEASURES = {
+    "row_count": "COUNT(*)",
+    "material_count": "COUNT(DISTINCT f.matnr)",
+    "total_qty": "SUM(f.qty)",
+    "total_value": "SUM(f.total_value)",
+}
+
+ROLLUPS: dict[str, Rollup] = {
+    r.table: r
+    for r in [
+        Rollup(
+            "agg_inventory_group",
+            {
+                "snapshot_date": "f.snapshot_date",
+                "source": "f.source",
+                "werks": "f.werks",
+                "lgort": "f.lgort",
+                "material_group_code": "m.material_group_code",
+            },
+        ),
+        Rollup(
+            "agg_inventory_plant",
+            {
+                "snapshot_date": "f.snapshot_date",
+                "source": "f.source",
+                "werks": "f.werks",
+            },
+        ),
+    ]
+}
+
+# Material group of each material as of the snapshot date (the version
+# of dim_material_master valid then), so a rollup never changes with
+# later material master builds
+_MATERIAL_GROUP_JOIN = """
+            LEFT JOIN (
+                SELECT material_code, MIN(material_group_code) AS material_group_code
+                FROM dim_material_master
+                WHERE valid_from <= :snapshot_date
+                  AND (valid_to IS NULL OR valid_to > :snapshot_date)
+                GROUP BY material_code
+            ) m ON m.material_code = f.matnr"""
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _refresh_rollup(
+    conn: Connection, rollup: Rollup, source: str, snapshot_date: date
+) -> int:
+    """
+    Replace the rollup rows of one (source, snapshot_date) with a fresh
+    aggregate of the fact rows. Returns the number of groups.
+    """
+    params = {"source": source, "snapshot_date": snapshot_date}
+    columns = {**rollup.keys, **_MEASURES}
+    join = _MATERIAL_GROUP_JOIN if "material_group_code" in rollup.keys else ""
+
+    conn.execute(
+        text(
+            f"""
+            DELETE FROM `{rollup.table}`
+            WHERE snapshot_date = :snapshot_date AND source = :source
+            """
+        ),
+        params,
+    )
+    return conn.execute(
+        text(
+            f"""
+            INSERT INTO `{rollup.table}` ({", ".join(f"`{c}`" for c in columns)})
+            SELECT {", ".join(columns.values())}
+            FROM fact_inventory_snapshot f{join}
+            WHERE f.snapshot_date = :snapshot_date AND f.source = :source
+            GROUP BY {", ".join(rollup.keys.values())}
+            """
+        ),
+        params,
+    ).rowcount
+
+
+def _set_status(
+    conn: Connection,
+    rollup: str,
+    source: str,
+    snapshot_date: date,
+    upload_batch_id: str | None,
+    rows: int,
+    duration: float,
+) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO rollup_refresh_status
+                (rollup, source, snapshot_date, upload_batch_id, status,
+                 rows_written, refreshed_at, duration_seconds, error)
+            VALUES
+                (:rollup, :source, :snapshot_date, :batch_id, 'fresh',
+                 :rows, NOW(3), :duration, NULL)
+            ON DUPLICATE KEY UPDATE
+                upload_batch_id = VALUES(upload_batch_id),
+                status = VALUES(status),
+                rows_written = VALUES(rows_written),
+                refreshed_at = VALUES(refreshed_at),
+                duration_seconds = VALUES(duration_seconds),
+                error = NULL
+            """
+        ),
+        {
+            "rollup": rollup,
+            "source": source,
+            "snapshot_date": snapshot_date,
+            "batch_id": upload_batch_id,
+            "rows": rows,
+            "duration": round(duration, 3),
+        },
+    )
+
+
+def _set_stale(
+    conn: Connection, rollup: str, source: str, snapshot_date: date, error: str
+) -> None:
+    # refreshed_at keeps the time of the last successful refresh
+    conn.execute(
+        text(
+            """
+            INSERT INTO rollup_refresh_status
+                (rollup, source, snapshot_date, status, error)
+            VALUES (:rollup, :source, :snapshot_date, 'stale', :error)
+            ON DUPLICATE KEY UPDATE
+                status = VALUES(status),
+                error = VALUES(error)
+            """
+        ),
+        {
+            "rollup": rollup,
+            "source": source,
+            "snapshot_date": snapshot_date,
+            "error": error,
+        },
+    )
+
+
+def _refresh_snapshot(
+    conn: Connection,
+    source: str,
+    snapshot_date: date,
+    upload_batch_id: str | None = None,
+) -> None:
+    """
+    Refresh every rollup for one (source, snapshot_date), each in its own
+    transaction. A failed refresh leaves the previous rows in place and
+    marks them stale.
+    """
+    for name, rollup in ROLLUPS.items():
+        start = time.perf_counter()
+        try:
+            rows = _refresh_rollup(conn, rollup, source, snapshot_date)
+            duration = time.perf_counter() - start
+            _set_status(
+                conn, name, source, snapshot_date, upload_batch_id, rows, duration
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception(
+                "Refreshing %s for %s %s failed", name, source, snapshot_date
+            )
+            _set_stale(conn, name, source, snapshot_date, traceback.format_exc())
+            conn.commit()
+            continue
+        logger.info(
+            "%s: refreshed %s %s, %d rows in %.2fs",
+            name,
+            source,
+            snapshot_date,
+            rows,
+            duration,
+        )
+
+
+def _stale_snapshots(conn: Connection) -> list[tuple[str, date]]:
+    return [
+        (source, snapshot_date)
+        for source, snapshot_date in conn.execute(
+            text(
+                """
+                SELECT DISTINCT source, snapshot_date
+                FROM rollup_refresh_status
+                WHERE status = 'stale'
+                ORDER BY snapshot_date, source
+                """
+            )
+        )
+    ]
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+def refresh_after_load(
+    source: str, snapshot_date: date, upload_batch_id: str | None = None
+) -> None:
+    """
+    Bring the rollups up to date after a job: the snapshot just loaded
+    (for sources that feed fact_inventory_snapshot) and any snapshot
+    marked stale. Failures are logged and recorded in
+    rollup_refresh_status rather than raised; the load itself succeeded.
+    """
+    with engine.connect() as conn:
+        got_lock = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": ROLLUP_LOCK, "timeout": ROLLUP_LOCK_TIMEOUT_SECONDS},
+        ).scalar()
+        if not got_lock:
+            logger.error("Timed out waiting for the rollup refresh lock")
+            return
+
+        try:
+            pending = _stale_snapshots(conn)
+            if source in ROLLUP_SOURCES:
+                pending.append((source, snapshot_date))
+            for pending_source, pending_date in dict.fromkeys(pending):
+                batch_id = upload_batch_id if pending_source == source else None
+                _refresh_snapshot(conn, pending_source, pending_date, batch_id)
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": ROLLUP_LOCK})
+            conn.commit()
+
+
+def mark_stale(conn: Connection, since: date, reason: str) -> int:
+    """
+    Mark the rollups of every snapshot from `since` on as stale, e.g.
+    when the material master versions they were built from change. The
+    caller owns the transaction.
+    """
+    return conn.execute(
+        text(
+            """
+            UPDATE rollup_refresh_status
+            SET status = 'stale', error = :reason
+            WHERE snapshot_date >= :since AND status = 'fresh'
+            """
+        ),
+        {"since": since, "reason": reason},
+    ).rowcount
+
+
+def backfill_rollups(conn: Connection) -> None:
+    """
+    Build the rollups for every snapshot already loaded.
+    """
+    snapshots = conn.execute(
+        text(
+            """
+            SELECT DISTINCT source, snapshot_date
+            FROM fact_inventory_snapshot
+            WHERE source IN :sources
+            ORDER BY snapshot_date, source
+            """
+        ).bindparams(bindparam("sources", expanding=True)),
+        {"sources": list(ROLLUP_SOURCES)},
+    ).all()
+    for source, snapshot_date in snapshots:
+        _refresh_snapshot(conn, source, snapshot_date)
+    logger.info("Rollups: backfilled %d snapshots", len(snapshots))
@@ -0,0 +1,714 @@
+# schema.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+# -------------------------------------------------------------------
+# Table declarations
+#
+# Single source of truth for every table the backend writes. The
+# migrations in migrations.py do not read them: each carries its own
+# DDL (migration_ddl.py), so a change here needs a new migration.
+# -------------------------------------------------------------------
+
+ID_COLUMN = ("id", "BIGINT NOT NULL AUTO_INCREMENT")
+
+
+@dataclass
+class Table:
+    name: str
+    columns: list[tuple[str, str]]
+    # Data tables get a surrogate auto-increment id as primary key
+    primary_key: tuple[str, ...] = ("id",)
+    options: str = "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+    extra_ddl: list[str] = field(default_factory=list)
+    # Monthly RANGE COLUMNS partitions on snapshot_date (see partitions.py).
+    # The partition column must be part of the primary key.
+    partition_by_month: bool = False
+
+    @property
+    def all_columns(self) -> list[tuple[str, str]]:
+        if "id" in self.primary_key:
+            return [ID_COLUMN] + self.columns
+        return self.columns
+
+    @property
+    def column_names(self) -> list[str]:
+        return [name for name, _ in self.all_columns]
+
+    def create_sql(self) -> str:
+        lines = [f"`{name}` {decl}" for name, decl in self.all_columns]
+        pk = ", ".join(f"`{c}`" for c in self.primary_key)
+        lines.append(f"PRIMARY KEY ({pk})")
+        lines.extend(self.extra_ddl)
+        body = ",\n    ".join(lines)
+        sql = (
+            f"CREATE TABLE IF NOT EXISTS `{self.name}` (\n    {body}\n) {self.options}"
+        )
+        if self.partition_by_month:
+            # Monthly partitions are split off pmax by partition maintenance
+            sql += (
+                "\nPARTITION BY RANGE COLUMNS(snapshot_date) "
+                "(PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+            )
+        return sql
+
+
+# Column type shorthands
+BATCH_ID = "VARCHAR(36) NOT NULL"
+SNAPSHOT_DATE = "DATE NOT NULL"
+SNAPSHOT_PK = ("id", "snapshot_date")
+SOURCE = "VARCHAR(20) NOT NULL"
+CODE = "VARCHAR(40) NULL"
+SHORT_CODE = "VARCHAR(10) NULL"
+NAME = "VARCHAR(255) NULL"
+LONG_TEXT = "TEXT NULL"
+QTY = "DECIMAL(18,3) NULL"
+AMOUNT = "DECIMAL(18,2) NULL"
+PRICE = "DECIMAL(18,4) NULL"
+DAY = "DATE NULL"
+DAYS = "INT NULL"
+
+
+_INVENTORY_KEYS = [
+    ("bukrs", "VARCHAR(4) NULL"),
+    ("werks", SHORT_CODE),
+    ("lgort", SHORT_CODE),
+    ("matnr", CODE),
+    ("mat_desc", NAME),
+    ("charg", "VARCHAR(20) NULL"),
+]
+
+_ZSDR030A_COLUMNS = [
+    ("channel", CODE),
+    ("sales_office", CODE),
+    ("sales_doc", "VARCHAR(20) NULL"),
+    ("document_date", DAY),
+    ("creation_date", DAY),
+    ("so_type", SHORT_CODE),
+    ("sold_to_number", CODE),
+    ("sold_to_name", NAME),
+    ("sold_to_country", CODE),
+    ("ship_to_number", CODE),
+    ("ship_to_name", NAME),
+    ("ship_to_country", CODE),
+    ("bill_to_number", CODE),
+    ("bill_to_name", NAME),
+    ("bill_to_country", CODE),
+    ("item", "VARCHAR(20) NULL"),
+    ("item_type", SHORT_CODE),
+    ("po_number", NAME),
+    ("po_item_number", CODE),
+    ("material", CODE),
+    ("brand", CODE),
+    ("material_desc", NAME),
+    ("storage_location", SHORT_CODE),
+    ("unit_price", PRICE),
+    ("so_qty", QTY),
+    ("dn_qty", QTY),
+    ("pgi_qty", QTY),
+    ("to_pgi_qty", QTY),
+    ("invoiced_qty", QTY),
+    ("to_invoice_qty", QTY),
+    ("open_so_qty", QTY),
+    ("so_amount", AMOUNT),
+    ("delivered_amount", AMOUNT),
+    ("inv_amount", AMOUNT),
+    ("inv_date", DAY),
+    ("so_open_amount", AMOUNT),
+    ("foc", SHORT_CODE),
+    ("cancel_reason", NAME),
+    ("req_deliv_date", DAY),
+    ("planned_gi_date", DAY),
+    ("actual_gi_date", DAY),
+    ("item_deliv_status", CODE),
+    ("delivery_status", CODE),
+    ("channel_code", CODE),
+    ("acctassgr", SHORT_CODE),
+    ("inside_sales_no", CODE),
+    ("inside_sales", NAME),
+    ("sales_employee_no", CODE),
+    ("sales_employee", NAME),
+    ("payment_term", CODE),
+    ("delivery_block", CODE),
+    ("debit_down_payment", AMOUNT),
+    ("cleared_down_payment", AMOUNT),
+    ("open_dp_amount", AMOUNT),
+    ("crm_id", CODE),
+    ("related_order", CODE),
+    ("related_order_item", CODE),
+    ("combination_no", CODE),
+    ("incompl_due_to", NAME),
+    ("glt_di_fee_item", CODE),
+    ("glt_di_fee_header", CODE),
+    ("model_no", NAME),
+    ("product_series", NAME),
+    ("product_category", NAME),
+    ("fob_stdprice", PRICE),
+    ("moving_price", PRICE),
+    ("price_ctl", SHORT_CODE),
+    ("contract", CODE),
+    ("profit_percent", "DECIMAL(12,4) NULL"),
+    ("project", NAME),
+    ("order_comments_header", LONG_TEXT),
+    ("currency", "VARCHAR(5) NULL"),
+    ("werks", SHORT_CODE),
+    ("lgort", SHORT_CODE),
+    ("matnr", CODE),
+    ("mat_desc", NAME),
+    ("open_qty", QTY),
+    ("upload_batch_id", BATCH_ID),
+    ("snapshot_date", SNAPSHOT_DATE),
+    ("source", SOURCE),
+]
+
+_ROLLUP_MEASURES = [
+    ("row_count", "INT NOT NULL"),
+    ("material_count", "INT NOT NULL"),
+    ("total_qty", "DECIMAL(20,3) NULL"),
+    ("total_value", "DECIMAL(20,2) NULL"),
+]
+
+TABLES: dict[str, Table] = {
+    t.name: t
+    for t in [
+        # ---------------- MB52 / inventory ----------------
+        Table(
+            "raw_mb52",
+            [("upload_batch_id", BATCH_ID)]
+            + _INVENTORY_KEYS
+            + [
+                ("labst", QTY),
+                ("value_unrestricted", AMOUNT),
+                ("meins", SHORT_CODE),
+                ("snapshot_date", SNAPSHOT_DATE),
+            ],
+        ),
+        Table(
+            "fact_inventory_snapshot",
+            [("upload_batch_id", BATCH_ID)]
+            + _INVENTORY_KEYS
+            + [
+                ("qty", QTY),
+                ("value_unrestricted", AMOUNT),
+                ("meins", SHORT_CODE),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                ("total_value", AMOUNT),
+            ],
+            primary_key=SNAPSHOT_PK,
+            partition_by_month=True,
+        ),
+        # Rollups of fact_inventory_snapshot per (snapshot_date, source),
+        # maintained by rollups.py
+        Table(
+            "agg_inventory_group",
+            [
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                ("werks", SHORT_CODE),
+                ("lgort", SHORT_CODE),
+                ("material_group_code", CODE),
+            ]
+            + _ROLLUP_MEASURES,
+        ),
+        Table(
+            "agg_inventory_plant",
+            [
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                ("werks", SHORT_CODE),
+            ]
+            + _ROLLUP_MEASURES,
+        ),
+        Table(
+            "rollup_refresh_status",
+            [
+                ("rollup", "VARCHAR(64) NOT NULL"),
+                ("source", SOURCE),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("upload_batch_id", "VARCHAR(36) NULL"),
+                # fresh | stale
+                ("status", "VARCHAR(10) NOT NULL"),
+                ("rows_written", "INT NULL"),
+                ("refreshed_at", "DATETIME(3) NULL"),
+                ("duration_seconds", "DECIMAL(12,3) NULL"),
+                ("error", LONG_TEXT),
+            ],
+            primary_key=("rollup", "source", "snapshot_date"),
+        ),
+        # ---------------- ZMMR014 ----------------
+        Table(
+            "raw_zmmr014",
+            [("upload_batch_id", BATCH_ID)]
+            + _INVENTORY_KEYS
+            + [
+                ("qty", QTY),
+                ("value_unrestricted", AMOUNT),
+                ("meins", SHORT_CODE),
+                ("plant", SHORT_CODE),
+                ("material", CODE),
+                ("model_no", NAME),
+                ("prod_hierarchy", CODE),
+                ("material_type", SHORT_CODE),
+                ("description", NAME),
+                ("prod_group", NAME),
+                ("prod_cat", NAME),
+                ("prod_line", NAME),
+                ("movement_type", SHORT_CODE),
+                ("movement_desc", NAME),
+                ("date_of_income", DAY),
+                ("days", DAYS),
+                ("aging_qty", QTY),
+                ("std_price", PRICE),
+                ("currency", "VARCHAR(5) NULL"),
+                ("aging_val", AMOUNT),
+                ("report_date", DAY),
+                ("report_time", "VARCHAR(20) NULL"),
+                ("zmmr015_power", "VARCHAR(50) NULL"),
+                ("odoo", "VARCHAR(50) NULL"),
+                ("final_aging", "VARCHAR(50) NULL"),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+            ],
+        ),
+        Table(
+            "fact_aging",
+            [
+                ("source", SOURCE),
+                ("upload_batch_id", BATCH_ID),
+                ("snapshot_date", SNAPSHOT_DATE),
+            ]
+            + _INVENTORY_KEYS[:5]
+            + [
+                ("date_of_income", DAY),
+                ("days", DAYS),
+                ("aging_qty", QTY),
+                ("std_price", PRICE),
+                ("currency", "VARCHAR(5) NULL"),
+                ("aging_val", AMOUNT),
+                ("aging_years", "DECIMAL(10,4) NULL"),
+                ("aging_bucket", SHORT_CODE),
+            ],
+            primary_key=SNAPSHOT_PK,
+            partition_by_month=True,
+        ),
+        # ZMMR014 aging with the date of income traced back through
+        # ZMMR015 Power and Odoo (final_aging.py)
+        Table(
+            "fact_final_aging",
+            [
+                ("source", SOURCE),
+                ("upload_batch_id", BATCH_ID),
+                ("snapshot_date", SNAPSHOT_DATE),
+            ]
+            + _INVENTORY_KEYS[:5]
+            + [
+                ("aging_qty", QTY),
+                ("aging_val", AMOUNT),
+                ("currency", "VARCHAR(5) NULL"),
+                # Candidate dates of income per source; the earliest wins
+                ("zmmr014_date_of_income", DAY),
+                ("zmmr015_power_date_of_income", DAY),
+                ("odoo_last_incoming", DAY),
+                ("date_of_income", DAY),
+                ("final_source", SOURCE),
+                ("days", DAYS),
+                ("aging_years", "DECIMAL(10,4) NULL"),
+                ("aging_bucket", SHORT_CODE),
+            ],
+            primary_key=SNAPSHOT_PK,
+            partition_by_month=True,
+        ),
+        # ---------------- ZMMR015 Power ----------------
+        Table(
+            "raw_zmmr015_power",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("werks", SHORT_CODE),
+                ("matnr", CODE),
+                ("mat_desc", NAME),
+                ("date_of_income", DAY),
+                ("aging_qty", QTY),
+                ("aging_val", AMOUNT),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                # Remaining Excel columns of the row, as a JSON object
+                ("extra_json", "JSON NULL"),
+            ],
+        ),
+        Table(
+            "fact_zmmr015_power",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("werks", SHORT_CODE),
+                ("matnr", CODE),
+                ("mat_desc", NAME),
+                ("date_of_income", DAY),
+                ("aging_qty", QTY),
+                ("aging_val", AMOUNT),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                ("days", DAYS),
+                ("aging_bucket", SHORT_CODE),
+            ],
+        ),
+        # ---------------- Odoo aging ----------------
+        Table(
+            "raw_odoo_aging",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("product_code", CODE),
+                ("product_name", NAME),
+                ("last_incoming", DAY),
+                ("last_outgoing", DAY),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+            ],
+        ),
+        Table(
+            "fact_odoo_aging",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("product_code", CODE),
+                ("product_name", NAME),
+                ("last_incoming", DAY),
+                ("last_outgoing", DAY),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                ("days_since_last_incoming", DAYS),
+                ("days_since_last_outgoing", DAYS),
+                ("aging_bucket", SHORT_CODE),
+            ],
+        ),
+        # ---------------- ZSDR030A ----------------
+        Table("raw_zsdr030a", list(_ZSDR030A_COLUMNS)),
+        Table(
+            "fact_zsdr030a",
+            list(_ZSDR030A_COLUMNS),
+            primary_key=SNAPSHOT_PK,
+            partition_by_month=True,
+        ),
+        # ---------------- ZSDR004 ----------------
+        Table(
+            "raw_zsdr004",
+            [
+                ("sales_org", CODE),
+                ("sales_office", CODE),
+                ("sales_group", CODE),
+                ("werks", SHORT_CODE),
+                ("item_net_value_usd", NAME),
+                ("order_quantity", NAME),
+                ("sales_quantity", NAME),
+                ("item_net_value_usd_num", AMOUNT),
+                ("order_quantity_num", QTY),
+                ("sales_quantity_num", QTY),
+                ("billing_date_raw", NAME),
+                ("billing_date", DAY),
+                ("matnr", CODE),
+                ("mat_desc", NAME),
+                ("upload_batch_id", BATCH_ID),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                # Remaining Excel columns of the row, as a JSON object
+                ("extra_json", "JSON NULL"),
+            ],
+        ),
+        Table(
+            "fact_zsdr004",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("sales_org", CODE),
+                ("sales_office", CODE),
+                ("sales_group", CODE),
+                ("werks", SHORT_CODE),
+                ("matnr", CODE),
+                ("mat_desc", NAME),
+                ("billing_date", DAY),
+                ("item_net_value_usd", AMOUNT),
+                ("order_quantity", QTY),
+                ("sales_quantity", QTY),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+            ],
+        ),
+        # ---------------- ZMM345E ----------------
+        Table(
+            "raw_zmm345e",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("material", CODE),
+                ("industry_sector", SHORT_CODE),
+                ("mat_type", SHORT_CODE),
+                ("plant", SHORT_CODE),
+                ("sloc", SHORT_CODE),
+                ("sales_org", SHORT_CODE),
+                ("dist_channel", SHORT_CODE),
+                ("description", NAME),
+                ("base_uom", SHORT_CODE),
+                ("mat_group", CODE),
+                ("old_part_no", CODE),
+                ("division", SHORT_CODE),
+                ("item_category_basic", SHORT_CODE),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+            ],
+        ),
+        Table(
+            "fact_zmm345e",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("werks", SHORT_CODE),
+                ("lgort", SHORT_CODE),
+                ("matnr", CODE),
+                ("mat_desc", NAME),
+                ("material_type", SHORT_CODE),
+                ("material_group", CODE),
+                ("base_uom", SHORT_CODE),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+            ],
+        ),
+        # ---------------- Material master ----------------
+        Table(
+            "dim_material_master",
+            [
+                ("material_code", CODE),
+                ("description", NAME),
+                ("brand", CODE),
+                ("product_line", NAME),
+                ("product_group", NAME),
+                ("product_series", NAME),
+                ("material_group_code", CODE),
+                ("material_group_desc", NAME),
+                ("material_group_desc2", NAME),
+                ("material_group_display_desc", NAME),
+                ("material_type_code", SHORT_CODE),
+                ("material_type_desc", NAME),
+                ("material_type_group", NAME),
+                ("sloc", SHORT_CODE),
+                ("sloc_description", NAME),
+                ("storage_group", CODE),
+                ("old_part_no", CODE),
+                ("serial_number_profile", SHORT_CODE),
+                ("is_serialized", "TINYINT(1) NULL"),
+                ("standard_price", PRICE),
+                ("price_control", SHORT_CODE),
+                ("vendor_code", CODE),
+                ("vendor_country", CODE),
+                ("vendor_postal_code", CODE),
+                ("vendor_search_term", NAME),
+                ("upload_batch_id", BATCH_ID),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("source", SOURCE),
+                # SCD type 2: a material's rows are versioned together.
+                # row_hash is the MD5 of all of its rows in that build;
+                # valid_to is NULL while the version is current.
+                ("row_hash", "CHAR(32) NULL"),
+                ("valid_from", DAY),
+                ("valid_to", DAY),
+                ("is_current", "TINYINT(1) NOT NULL DEFAULT 0"),
+            ],
+        ),
+        # Diagnostics of the current dimension, one row per build
+        Table(
+            "material_master_stats",
+            [
+                ("upload_batch_id", BATCH_ID),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("total_rows", "INT NOT NULL"),
+                ("serialized_rows", "INT NOT NULL"),
+                ("not_serialized_rows", "INT NOT NULL"),
+                ("distinct_brands", "INT NOT NULL"),
+                ("distinct_material_groups", "INT NOT NULL"),
+                ("distinct_vendors", "INT NOT NULL"),
+                ("rows_written", "INT NOT NULL"),
+                ("created_at", "DATETIME(3) NOT NULL"),
+            ],
+        ),
+        # ---------------- Ingest bookkeeping ----------------
+        Table(
+            "ingest_jobs",
+            [
+                ("job_id", "VARCHAR(36) NOT NULL"),
+                ("source", SOURCE),
+                ("upload_batch_id", BATCH_ID),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("file_paths", "TEXT NOT NULL"),
+                ("file_sha256", "CHAR(64) NULL"),
+                ("file_bytes", "BIGINT NULL"),
+                ("options", LONG_TEXT),
+                ("status", "VARCHAR(10) NOT NULL"),
+                ("attempts", "INT NOT NULL DEFAULT 0"),
+                # Worker running the job and when its lease runs out
+                ("worker_id", "VARCHAR(64) NULL"),
+                ("lease_expires_at", "DATETIME(3) NULL"),
+                ("rows_loaded", "BIGINT NULL"),
+                # {"SOURCE.column": n} of date values set to NULL
+                ("dates_coerced", LONG_TEXT),
+                ("error", LONG_TEXT),
+                ("created_at", "DATETIME(3) NOT NULL"),
+                ("started_at", "DATETIME(3) NULL"),
+                ("finished_at", "DATETIME(3) NULL"),
+                ("duration_seconds", "DECIMAL(12,3) NULL"),
+            ],
+            primary_key=("job_id",),
+            extra_ddl=["KEY `idx_ingest_jobs_status` (`status`, `created_at`)"],
+        ),
+        Table(
+            "upload_catalog",
+            [
+                ("file_sha256", "CHAR(64) NOT NULL"),
+                ("source", SOURCE),
+                ("snapshot_date", SNAPSHOT_DATE),
+                ("upload_batch_id", BATCH_ID),
+                ("file_bytes", "BIGINT NULL"),
+                ("created_at", "DATETIME(3) NOT NULL"),
+            ],
+            primary_key=("file_sha256", "source", "snapshot_date"),
+        ),
+    ]
+}
+
+
+# -------------------------------------------------------------------
+# Secondary indexes, per table: {index_name: columns}
+#
+# Reconciled against information_schema by indexes.py. Cover the filters
+# every dashboard uses: batch, snapshot date, plant and material.
+# -------------------------------------------------------------------
+
+INDEXES: dict[str, dict[str, tuple[str, ...]]] = {
+    "raw_mb52": {
+        "idx_raw_mb52_batch": ("upload_batch_id",),
+        "idx_raw_mb52_snap_werks": ("snapshot_date", "werks"),
+        "idx_raw_mb52_matnr": ("matnr",),
+    },
+    "fact_inventory_snapshot": {
+        "idx_fis_batch": ("upload_batch_id",),
+        "idx_fis_snap_source_werks": ("snapshot_date", "source", "werks", "lgort"),
+        "idx_fis_matnr_snap": ("matnr", "snapshot_date"),
+        # Keyset order of GET /facts/{table}
+        "idx_fis_snap_id": ("snapshot_date", "id"),
+    },
+    "agg_inventory_group": {
+        "idx_agg_inv_group_snap": ("snapshot_date", "source", "werks", "lgort"),
+    },
+    "agg_inventory_plant": {
+        "idx_agg_inv_plant_snap": ("snapshot_date", "source", "werks"),
+    },
+    "rollup_refresh_status": {
+        "idx_rollup_status": ("status", "snapshot_date"),
+    },
+    "raw_zmmr014": {
+        "idx_raw_zmmr014_batch": ("upload_batch_id",),
+        "idx_raw_zmmr014_snap_werks": ("snapshot_date", "werks"),
+        "idx_raw_zmmr014_matnr": ("matnr",),
+    },
+    "fact_aging": {
+        "idx_fact_aging_batch": ("upload_batch_id",),
+        "idx_fact_aging_snap_werks": ("snapshot_date", "werks"),
+        "idx_fact_aging_matnr_snap": ("matnr", "snapshot_date"),
+        # Keyset order of GET /facts/{table}
+        "idx_fact_aging_snap_id": ("snapshot_date", "id"),
+    },
+    "fact_final_aging": {
+        "idx_fact_final_aging_batch": ("upload_batch_id",),
+        "idx_fact_final_aging_snap_werks": ("snapshot_date", "werks"),
+        "idx_fact_final_aging_matnr_snap": ("matnr", "snapshot_date"),
+    },
+    "raw_zmmr015_power": {
+        "idx_raw_zmmr015_batch": ("upload_batch_id",),
+        "idx_raw_zmmr015_snap_werks": ("snapshot_date", "werks"),
+    },
+    "fact_zmmr015_power": {
+        "idx_fact_zmmr015_batch": ("upload_batch_id",),
+        "idx_fact_zmmr015_snap_werks": ("snapshot_date", "werks"),
+        "idx_fact_zmmr015_matnr_snap": ("matnr", "snapshot_date"),
+    },
+    "raw_odoo_aging": {
+        "idx_raw_odoo_batch": ("upload_batch_id",),
+        "idx_raw_odoo_snap": ("snapshot_date",),
+    },
+    "fact_odoo_aging": {
+        "idx_fact_odoo_batch": ("upload_batch_id",),
+        "idx_fact_odoo_product_snap": ("product_code", "snapshot_date"),
+    },
+    "raw_zsdr030a": {
+        "idx_raw_zsdr030a_batch": ("upload_batch_id",),
+        "idx_raw_zsdr030a_snap": ("snapshot_date",),
+    },
+    "fact_zsdr030a": {
+        "idx_fact_zsdr030a_batch": ("upload_batch_id",),
+        "idx_fact_zsdr030a_snap_matnr": ("snapshot_date", "matnr"),
+        "idx_fact_zsdr030a_sales_doc": ("sales_doc",),
+        # Keyset order of GET /facts/{table}
+        "idx_fact_zsdr030a_snap_id": ("snapshot_date", "id"),
+    },
+    "raw_zsdr004": {
+        "idx_raw_zsdr004_batch": ("upload_batch_id",),
+        "idx_raw_zsdr004_snap_werks": ("snapshot_date", "werks"),
+    },
+    "fact_zsdr004": {
+        "idx_fact_zsdr004_batch": ("upload_batch_id",),
+        "idx_fact_zsdr004_snap_werks": ("snapshot_date", "werks"),
+        "idx_fact_zsdr004_matnr_billing": ("matnr", "billing_date"),
+    },
+    "raw_zmm345e": {
+        "idx_raw_zmm345e_batch": ("upload_batch_id",),
+    },
+    "fact_zmm345e": {
+        "idx_fact_zmm345e_batch": ("upload_batch_id",),
+        "idx_fact_zmm345e_matnr_werks": ("matnr", "werks"),
+    },
+    "dim_material_master": {
+        "idx_dim_mm_material_code": ("material_code",),
+        "idx_dim_mm_is_serialized": ("is_serialized",),
+        "idx_dim_mm_brand_group": ("brand", "material_group_code"),
+        "idx_dim_mm_batch": ("upload_batch_id",),
+        # Current version by code; covers the build's diff query
+        "idx_dim_mm_current": ("is_current", "material_code", "row_hash"),
+    },
+    "material_master_stats": {
+        "idx_mm_stats_batch": ("upload_batch_id",),
+    },
+    "ingest_jobs": {
+        "idx_ingest_jobs_sha": ("file_sha256", "source", "snapshot_date"),
+    },
+}
+
+
+# -------------------------------------------------------------------
+# Helpers for loaders
+# -------------------------------------------------------------------
+
+
+def project_to_table(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """
+    Keep only the columns declared for `table`. When the table has an
+    extra_json column, the remaining columns of each row are packed into
+    it so nothing from the source file is lost.
+    """
+    declared = set(TABLES[table].column_names)
+    keep = [c for c in df.columns if c in declared]
+    out = df[keep]
+
+    if "extra_json" in declared:
+        extra = [c for c in df.columns if c not in declared]
+        out = out.copy()
+        if extra:
+            out["extra_json"] = (
+                df[extra]
+                .to_json(
+                    orient="records",
+                    lines=True,
+                    date_format="iso",
+                    default_handler=str,
+                )
+                .splitlines()
+            )
+        else:
+            out["extra_json"] = None
+    return out
@@ -0,0 +1,244 @@
+# snapshot_replace.py
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from bulk_writer import redirect_tables
+from db import engine
+from partitions import month_partition, table_partitions
+from schema import TABLES
+from sources import SOURCES
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+# Tables each source writes. A replace swaps the (source, snapshot_date)
+# rows of every one of them.
+SNAPSHOT_TABLES: dict[str, tuple[str, ...]] = {
+    name: spec.tables for name, spec in SOURCES.items()
+}
+
+UPLOAD_MODES = ("append", "replace")
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _staging_name(table: str, upload_batch_id: str) -> str:
+    return f"{table}__stg_{upload_batch_id.replace('-', '')[:12]}"
+
+
+def _snapshot_filter(table: str) -> str:
+    # Per-source raw tables without a source column hold one source only
+    if "source" in TABLES[table].column_names:
+        return "snapshot_date = :snapshot_date AND source = :source"
+    return "snapshot_date = :snapshot_date"
+
+
+def _create_staging(conn: Connection, table: str, staging: str) -> None:
+    conn.execute(text(f"DROP TABLE IF EXISTS `{staging}`"))
+    conn.execute(text(f"CREATE TABLE `{staging}` LIKE `{table}`"))
+    if TABLES[table].partition_by_month:
+        # EXCHANGE PARTITION needs a non-partitioned table of the same shape
+        conn.execute(text(f"ALTER TABLE `{staging}` REMOVE PARTITIONING"))
+        # CREATE LIKE restarts ids at 1; exchanged rows keep the live
+        # table's id order
+        next_id = conn.execute(
+            text(
+                """
+                SELECT AUTO_INCREMENT FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table
+                """
+            ),
+            {"table": table},
+        ).scalar()
+        if next_id:
+            conn.execute(text(f"ALTER TABLE `{staging}` AUTO_INCREMENT = {next_id}"))
+
+
+def _exchangeable_partition(
+    conn: Connection, table: str, source: str, snapshot_date: date
+) -> str | None:
+    """
+    The month partition for snapshot_date, when it holds nothing but the
+    rows being replaced, so the staging table can be swapped in whole.
+    """
+    if not TABLES[table].partition_by_month:
+        return None
+    partition = month_partition(snapshot_date)
+    if partition not in {name for name, _ in table_partitions(conn, table)}:
+        return None
+
+    others = conn.execute(
+        text(
+            f"""
+            SELECT 1 FROM `{table}` PARTITION ({partition})
+            WHERE NOT ({_snapshot_filter(table)})
+            LIMIT 1
+            """
+        ),
+        {"snapshot_date": snapshot_date, "source": source},
+    ).first()
+    return None if others else partition
+
+
+def _copy_rows(conn: Connection, table: str, staging: str, params: dict) -> None:
+    # Columns are listed by name, so the copy does not depend on staging
+    # keeping the live table's indexes
+    columns = ", ".join(f"`{name}`" for name, _ in TABLES[table].columns)
+    conn.execute(text(f"DELETE FROM `{table}` WHERE {_snapshot_filter(table)}"), params)
+    conn.execute(
+        text(f"INSERT INTO `{table}` ({columns}) SELECT {columns} FROM `{staging}`")
+    )
+
+
+def _exchange(
+    conn: Connection, table: str, partition: str, staging: str, params: dict
+) -> None:
+    """
+    Swap the staging table in as the partition: a metadata change, so the
+    table is locked for the same short time whatever the snapshot size
+    (MariaDB still reads staging to validate its rows). Afterwards staging
+    holds the old partition. Rows an append committed to the month after
+    _exchangeable_partition looked are among them; they are copied back.
+    """
+    try:
+        conn.execute(
+            text(
+                f"ALTER TABLE `{table}` EXCHANGE PARTITION {partition} "
+                f"WITH TABLE `{staging}`"
+            )
+        )
+    except DBAPIError:
+        # Structures differ, e.g. an index reconcile ran during the load
+        logger.warning(
+            "Exchange of %s partition %s failed; copying rows instead",
+            table,
+            partition,
+            exc_info=True,
+        )
+        conn.rollback()
+        _copy_rows(conn, table, staging, params)
+        conn.commit()
+        return
+
+    columns = ", ".join(f"`{name}`" for name in TABLES[table].column_names)
+    restored = conn.execute(
+        text(
+            f"""
+            INSERT INTO `{table}` ({columns})
+            SELECT {columns} FROM `{staging}`
+            WHERE NOT ({_snapshot_filter(table)})
+            """
+        ),
+        params,
+    ).rowcount
+    conn.commit()
+    if restored:
+        logger.warning(
+            "Restored %d rows appended to %s partition %s during the exchange",
+            restored,
+            table,
+            partition,
+        )
+    logger.info("Exchanged %s partition %s", table, partition)
+
+
+def _swap(
+    conn: Connection,
+    source: str,
+    snapshot_date: date,
+    staging: dict[str, str],
+) -> None:
+    """
+    Replace the snapshot rows of every table with its staging copy.
+
+    Tables whose month partition holds only this snapshot exchange the
+    partition; the others delete and re-insert the rows in one
+    transaction, which holds its locks for as long as the copy takes.
+    Exchanges are DDL and commit on their own, right after that
+    transaction: for those few milliseconds a reader can see the new
+    snapshot in some tables and the old one in others.
+    """
+    params = {"snapshot_date": snapshot_date, "source": source}
+    exchanges = {}
+    for table in staging:
+        partition = _exchangeable_partition(conn, table, source, snapshot_date)
+        if partition:
+            exchanges[table] = partition
+
+    for table, stg in staging.items():
+        if table not in exchanges:
+            _copy_rows(conn, table, stg, params)
+    # Catalog entries for the replaced files no longer describe the stored
+    # rows; the job records the new file when it finishes.
+    conn.execute(
+        text(
+            """
+            DELETE FROM upload_catalog
+            WHERE source = :source AND snapshot_date = :snapshot_date
+            """
+        ),
+        params,
+    )
+    conn.commit()
+
+    for table, partition in exchanges.items():
+        _exchange(conn, table, partition, staging[table], params)
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+@contextmanager
+def replace_snapshot(
+    source: str, snapshot_date: date, upload_batch_id: str
+) -> Iterator[None]:
+    """
+    Run a loader inside the block to replace, rather than append to, the
+    source's rows for snapshot_date. The loader writes to staging tables;
+    on success the rows are swapped in at the end, so readers never see a
+    partial or doubled snapshot and locks are held only for the swap.
+    """
+    if source not in SNAPSHOT_TABLES:
+        raise ValueError(f"Replace mode is not supported for {source}")
+
+    staging = {
+        table: _staging_name(table, upload_batch_id)
+        for table in SNAPSHOT_TABLES[source]
+    }
+    with engine.connect() as conn:
+        try:
+            for table, stg in staging.items():
+                _create_staging(conn, table, stg)
+            conn.commit()
+
+            with redirect_tables(staging):
+                yield
+
+            _swap(conn, source, snapshot_date, staging)
+            logger.info(
+                "Replaced %s snapshot %s (batch %s)",
+                source,
+                snapshot_date,
+                upload_batch_id,
+            )
+        finally:
+            conn.rollback()
+            for stg in staging.values():
+                conn.execute(text(f"DROP TABLE IF EXISTS `{stg}`"))
+            conn.commit()
@@ -0,0 +1,238 @@
+# source_spec.py
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple
+
+import pandas as pd
+
+from bulk_writer import insert_from_batch, write_frame
+from dates import parse_dates
+from db import engine
+from kernels import clean_text, to_number, zero_pad
+from readers import read_chunks, read_header
+from schema import project_to_table
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Spec
+# -------------------------------------------------------------------
+
+# Column kinds. Columns without a kind are stored as read.
+#   text         stripped text (clean_text)
+#   text_na      stripped text, missing values stay NULL
+#   number       numeric, unparseable -> NULL
+#   number_text  numeric from text with "," thousands separators
+#   int          whole number (nullable)
+#   date         date parsed with the spec's dayfirst
+#   sloc         4-character storage location ("7" -> "0007")
+KINDS = ("text", "text_na", "number", "number_text", "int", "date", "sloc")
+
+# Kinds whose cells are read as str, skipping type inference
+_STR_KINDS = {"text", "text_na"}
+
+
+class Derived(NamedTuple):
+    """
+    A table filled on the server with INSERT ... SELECT from a table the
+    source wrote (see bulk_writer.insert_from_batch).
+    """
+
+    table: str
+    source_table: str
+    select: dict[str, str]
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    """
+    Everything the generic loader needs to know about one source file.
+
+    columns maps each internal column name to the header(s) it may have
+    in the file; the first header present wins, matched case-insensitively
+    after trimming. Several names may share a header. Only the listed
+    headers are read unless keep_unmapped is set, in which case every
+    column is read and the leftovers end up in the table's extra_json.
+    outputs maps each table written from the frame to column renames
+    (table column -> frame column).
+    """
+
+    name: str
+    columns: dict[str, str | tuple[str, ...]]
+    outputs: dict[str, dict[str, str]]
+    kinds: dict[str, str] = field(default_factory=dict)
+    required: tuple[str, ...] = ()
+    derived: tuple[Derived, ...] = ()
+    keep_unmapped: bool = False
+    dayfirst: bool = True
+    # Source-specific columns computed from the normalized frame
+    derive: Callable[[pd.DataFrame, date], pd.DataFrame] | None = None
+
+    def __post_init__(self):
+        unknown = set(self.kinds.values()) - set(KINDS)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown column kinds {sorted(unknown)}")
+
+    @property
+    def tables(self) -> tuple[str, ...]:
+        """
+        Every table a load writes, in write order.
+        """
+        names = list(self.outputs) + [d.table for d in self.derived]
+        return tuple(dict.fromkeys(names))
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+
+def _norm(header: str) -> str:
+    return str(header).strip().lower()
+
+
+def _aliases(headers: str | tuple[str, ...]) -> tuple[str, ...]:
+    return (headers,) if isinstance(headers, str) else headers
+
+
+def resolve_columns(spec: SourceSpec, header: list[str]) -> dict[str, str]:
+    """
+    Internal name -> actual header in this file, for the columns present.
+    Raises ValueError when a required column is missing.
+    """
+    actual = {}
+    for h in header:
+        actual.setdefault(_norm(h), h)
+
+    resolved = {}
+    for name, headers in spec.columns.items():
+        for alias in _aliases(headers):
+            if _norm(alias) in actual:
+                resolved[name] = actual[_norm(alias)]
+                break
+        else:
+            if name in spec.required:
+                raise ValueError(
+                    f"{spec.name}: none of the columns "
+                    f"{', '.join(map(repr, _aliases(headers)))} found"
+                )
+    return resolved
+
+
+def _read_dtypes(
+    spec: SourceSpec, resolved: dict[str, str], unmapped: Iterable[str] = ()
+) -> dict[str, type]:
+    """
+    Read dtype per header, the same for every chunk of the file: str when
+    it feeds a text column, object (cell values, no numeric inference)
+    when it is only stored as read, like the `unmapped` headers a
+    keep_unmapped spec packs into extra_json. A batch of 123 then stays
+    123 whether or not its chunk also holds a blank. Other kinds are
+    inferred; their converters normalize the type.
+    """
+    kinds: dict[str, set] = {h: {None} for h in unmapped}
+    for name, header in resolved.items():
+        kinds.setdefault(header, set()).add(spec.kinds.get(name))
+    dtypes: dict[str, type] = {}
+    for h, k in kinds.items():
+        if k & _STR_KINDS and k <= _STR_KINDS | {None}:
+            dtypes[h] = str
+        elif k == {None}:
+            dtypes[h] = object
+    return dtypes
+
+
+def _convert(spec: SourceSpec, name: str, values: pd.Series) -> pd.Series:
+    kind = spec.kinds.get(name)
+    if kind == "text":
+        # Blanks stay NULL rather than "nan", decided per cell so the result
+        # does not depend on which other rows share the chunk
+        return clean_text(values).where(values.notna())
+    if kind == "text_na":
+        return values.astype("string").str.strip()
+    if kind == "number":
+        return to_number(values)
+    if kind == "number_text":
+        return to_number(values, thousands=True)
+    if kind == "int":
+        return to_number(values).astype("Int64")
+    if kind == "date":
+        parsed = parse_dates(values, spec.name, name, dayfirst=spec.dayfirst)
+        return parsed.dates.dt.date
+    if kind == "sloc":
+        return zero_pad(values, 4)
+    return values
+
+
+def normalize(
+    spec: SourceSpec,
+    df: pd.DataFrame,
+    resolved: dict[str, str],
+    upload_batch_id: str,
+    snapshot_date: date,
+) -> pd.DataFrame:
+    """
+    One chunk as read -> internal columns plus batch metadata (and the
+    original columns when the spec keeps them).
+    """
+    frame = pd.DataFrame(
+        {name: _convert(spec, name, df[h]) for name, h in resolved.items()},
+        index=df.index,
+    )
+    if spec.keep_unmapped:
+        original = df.rename(columns=lambda c: str(c).strip())
+        frame = pd.concat([original, frame], axis=1)
+    if spec.derive is not None:
+        frame = spec.derive(frame, snapshot_date)
+    return frame.assign(
+        upload_batch_id=upload_batch_id,
+        snapshot_date=snapshot_date,
+        source=spec.name,
+    )
+
+
+def _table_frame(frame: pd.DataFrame, table: str, renames: dict[str, str]):
+    present = {col: frame[src] for col, src in renames.items() if src in frame}
+    return project_to_table(frame.assign(**present), table)
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+
+def run_source(
+    spec: SourceSpec,
+    file_path: Path,
+    upload_batch_id: str,
+    snapshot_date: date,
+    chunksize: int | None = None,
+) -> int:
+    """
+    Load one file for `spec` in a single transaction: read only the
+    columns the spec uses, normalize each chunk, write the output tables,
+    then derive the server-side tables from the batch. Returns the row
+    count.
+    """
+    header = read_header(file_path)
+    resolved = resolve_columns(spec, header)
+    usecols = None if spec.keep_unmapped else set(resolved.values()).__contains__
+    dtype = _read_dtypes(spec, resolved, header if spec.keep_unmapped else [])
+
+    rows = 0
+    with engine.begin() as conn:
+        for df in read_chunks(file_path, chunksize, usecols, dtype):
+            rows += len(df)
+            frame = normalize(spec, df, resolved, upload_batch_id, snapshot_date)
+            for table, renames in spec.outputs.items():
+                write_frame(_table_frame(frame, table, renames), table, conn)
+
+        for d in spec.derived:
+            insert_from_batch(conn, d.table, d.source_table, d.select, upload_batch_id)
+
+    logger.info("%s: loaded %d rows (batch %s)", spec.name, rows, upload_batch_id)
+    return rows
@@ -0,0 +1,33 @@
+# sources.py
+from __future__ import annotations
+
+from source_spec import SourceSpec
+from mb52 import MB52_SPEC
+from zmmr014 import ZMMR014_SPEC
+from zmmr015_power import ZMMR015_POWER_SPEC
+from odoo_aging import ODOO_AGING_SPEC
+from zsdr030a import ZSDR030A_SPEC
+from zsdr004 import ZSDR004_SPEC
+from ZMM345E import ZMM345E_SPEC
+
+# Single-file snapshot sources by name. The material master (five files
+# merged into one dimension) is loaded separately.
+SOURCES: dict[str, SourceSpec] = {
+    spec.name: spec
+    for spec in (
+        MB52_SPEC,
+        ZMMR014_SPEC,
+        ZMMR015_POWER_SPEC,
+        ODOO_AGING_SPEC,
+        ZSDR030A_SPEC,
+        ZSDR004_SPEC,
+        ZMM345E_SPEC,
+    )
+}
+
+
+def get_source(name: str) -> SourceSpec | None:
+    """
+    Spec for a source name, ignoring case ("zmmr015_power" works).
+    """
+    return SOURCES.get(name.upper())
@@ -0,0 +1,79 @@
+# conftest.py
+from __future__ import annotations
+
+import sqlite3
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from schema import TABLES  # noqa: E402
+
+# -------------------------------------------------------------------
+# SQLite stand-in for MariaDB
+#
+# Enough of the MariaDB functions the modules call for their SQL to run
+# unchanged on SQLite. Locks always succeed: tests use one connection
+# at a time.
+# -------------------------------------------------------------------
+
+
+def _now(precision: int) -> str:
+    return datetime.now().isoformat(" ")
+
+
+def _datediff(a: str | None, b: str | None) -> int | None:
+    if a is None or b is None:
+        return None
+    return (date.fromisoformat(a[:10]) - date.fromisoformat(b[:10])).days
+
+
+# DATE and DATETIME columns read back as date and datetime, as from
+# MariaDB
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter(
+    "DATETIME", lambda b: datetime.fromisoformat(b.decode())
+)
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path: Path) -> Engine:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"detect_types": sqlite3.PARSE_DECLTYPES},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _functions(dbapi_conn, _):
+        dbapi_conn.create_function("NOW", 1, _now)
+        dbapi_conn.create_function("DATEDIFF", 2, _datediff)
+        dbapi_conn.create_function("GET_LOCK", 2, lambda name, timeout: 1)
+        dbapi_conn.create_function("RELEASE_LOCK", 1, lambda name: 1)
+
+    return engine
+
+
+def create_tables(engine: Engine, *names: str) -> None:
+    """
+    The declared tables, with their declared column types, so values are
+    stored as MariaDB would store them rather than as the first row
+    suggests.
+    """
+    with engine.begin() as conn:
+        for name in names:
+            table = TABLES[name]
+            columns = [
+                "id INTEGER PRIMARY KEY AUTOINCREMENT"
+                if column == "id"
+                else f"{column} {decl.split()[0]}"
+                for column, decl in table.all_columns
+            ]
+            if "id" not in table.primary_key:
+                keys = ", ".join(table.primary_key)
+                columns.append(f"PRIMARY KEY ({keys})")
+            conn.execute(text(f"CREATE TABLE {name} ({', '.join(columns)})"))
@@ -0,0 +1,122 @@
+# test_aging_buckets.py
+"""
+The SQL CASE and the pandas searchsorted bucket days the same way, and
+REBUCKET_AGING rewrites history chunk by chunk.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import aging_buckets
+from aging_buckets import aging_bucket_sql, aging_buckets as buckets
+from conftest import create_tables
+
+# Each bound, the days either side of it, and unknown days
+EDGES = [-1, 0, 1, 365, 366, 729, 730, 731, 1825, 1826, 2555, 2556, 3650, 3651]
+EXPECTED = [
+    "0-1Y",
+    "0-1Y",
+    "0-1Y",
+    "0-1Y",
+    "1-2Y",
+    "1-2Y",
+    "1-2Y",
+    "2-5Y",
+    "2-5Y",
+    "5-7Y",
+    "5-7Y",
+    "7-10Y",
+    "7-10Y",
+    "10+Y",
+]
+
+
+def test_pandas_buckets_at_the_edges():
+    days = pd.Series(EDGES + [None], dtype="Int64")
+    assert buckets(days).tolist() == EXPECTED + [None]
+    # Floats, text and unparseable values go through to_numeric
+    assert buckets(pd.Series([365.0, "366", "n/a", float("nan")])).tolist() == [
+        "0-1Y",
+        "1-2Y",
+        None,
+        None,
+    ]
+
+
+def test_sql_buckets_match_pandas(sqlite_engine):
+    values = EDGES + [None]
+    with sqlite_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE days (n INTEGER, d INTEGER)"))
+        conn.execute(
+            text("INSERT INTO days VALUES (:n, :d)"),
+            [{"n": n, "d": d} for n, d in enumerate(values)],
+        )
+        sql = conn.execute(
+            text(f"SELECT {aging_bucket_sql('d')} FROM days ORDER BY n")
+        ).scalars().all()
+    assert sql == buckets(pd.Series(values, dtype="Int64")).tolist()
+
+
+@pytest.fixture
+def engine(monkeypatch, sqlite_engine):
+    tables = [aging.table for aging in aging_buckets.AGING_TABLES]
+    create_tables(sqlite_engine, *tables)
+    monkeypatch.setattr(aging_buckets, "engine", sqlite_engine)
+    # Several UPDATEs per table, with a gap in the ids
+    monkeypatch.setattr(aging_buckets, "REBUCKET_CHUNK_ROWS", 2)
+    with sqlite_engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO fact_aging (id, snapshot_date, days, aging_bucket)
+                VALUES (:id, '2024-06-30', :days, :bucket)
+                """
+            ),
+            [
+                {"id": 1, "days": 100, "bucket": "0-1Y"},
+                {"id": 2, "days": 1000, "bucket": "3-5Y"},
+                {"id": 3, "days": None, "bucket": "10+Y"},
+                {"id": 7, "days": 4000, "bucket": "10+Y"},
+                {"id": 8, "days": 366, "bucket": "0-1Y"},
+            ],
+        )
+        conn.execute(
+            text(
+                """
+                INSERT INTO fact_zmmr015_power (snapshot_date, date_of_income,
+                    days, aging_bucket)
+                VALUES ('2024-06-30', :income, NULL, NULL)
+                """
+            ),
+            [{"income": date(2024, 1, 1)}, {"income": None}],
+        )
+    return sqlite_engine
+
+
+def _column(engine, table: str, column: str) -> list:
+    with engine.connect() as conn:
+        return conn.execute(
+            text(f"SELECT {column} FROM {table} ORDER BY id")
+        ).scalars().all()
+
+
+def test_rebucket_rewrites_changed_rows_in_chunks(engine):
+    # Buckets of ids 2, 3 and 8 change; the first Power row gets its days
+    # and a bucket; the second has neither and stays as it is
+    assert aging_buckets.rebucket_aging("batch", date(2024, 7, 1)) == 4
+    assert _column(engine, "fact_aging", "aging_bucket") == [
+        "0-1Y",
+        "2-5Y",
+        None,
+        "10+Y",
+        "1-2Y",
+    ]
+    assert _column(engine, "fact_zmmr015_power", "days") == [181, None]
+    assert _column(engine, "fact_zmmr015_power", "aging_bucket") == ["0-1Y", None]
+
+    # Nothing left to change
+    assert aging_buckets.rebucket_aging("batch", date(2024, 7, 1)) == 0
@@ -0,0 +1,135 @@
+# test_dates.py
+"""
+parse_dates: inferred column formats, the per-value fallback and the
+coerced counts.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import dates
+from dates import collect_coerced, parse_dates
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(dates, "_format_cache", {})
+
+
+def _days(parsed: dates.ParsedDates) -> list[str | None]:
+    return [None if pd.isna(d) else d.strftime("%Y-%m-%d") for d in parsed.dates]
+
+
+def test_dayfirst_column():
+    parsed = parse_dates(pd.Series(["03/06/2024", "13/06/2024"]), "SRC", "d")
+    assert _days(parsed) == ["2024-06-03", "2024-06-13"]
+    assert parsed.coerced == 0
+    assert dates._format_cache[("SRC", "d")] == "%d/%m/%Y"
+
+
+def test_monthfirst_column():
+    values = pd.Series(["06/03/2024", "06/13/2024"])
+    parsed = parse_dates(values, "SRC", "d", dayfirst=False)
+    assert _days(parsed) == ["2024-06-03", "2024-06-13"]
+    assert dates._format_cache[("SRC", "d")] == "%m/%d/%Y"
+
+
+def test_year_first_values_ignore_dayfirst():
+    parsed = parse_dates(pd.Series(["2024-06-03", "2024-06-13"]), "SRC", "d")
+    assert _days(parsed) == ["2024-06-03", "2024-06-13"]
+
+
+def test_mixed_formats_fall_back_per_value():
+    values = pd.Series(
+        [
+            "03/06/2024",
+            "04/06/2024",
+            "05/06/2024",
+            # Other guessable formats, parsed in one pass per format
+            "2024-06-06",
+            "07.06.2024",
+            # No guessable format: the dayfirst parse of old
+            "8-Jun-24",
+        ]
+    )
+    parsed = parse_dates(values, "SRC", "d")
+    assert _days(parsed) == [
+        "2024-06-03",
+        "2024-06-04",
+        "2024-06-05",
+        "2024-06-06",
+        "2024-06-07",
+        "2024-06-08",
+    ]
+    assert parsed.coerced == 0
+
+
+def test_unparseable_values_are_counted_blanks_are_not():
+    values = pd.Series(["03/06/2024", "not a date", "", None, "  ", "31/02/2024"])
+    parsed = parse_dates(values, "SRC", "d")
+    assert _days(parsed) == ["2024-06-03", None, None, None, None, None]
+    assert parsed.coerced == 2
+
+
+def test_cached_format_is_reused_while_it_fits():
+    dates._format_cache[("SRC", "d")] = "%m/%d/%Y"
+    # dayfirst would read June 3; the cached format still parses the
+    # whole sample, so it wins
+    parsed = parse_dates(pd.Series(["06/03/2024"]), "SRC", "d")
+    assert _days(parsed) == ["2024-06-03"]
+    assert dates._format_cache[("SRC", "d")] == "%m/%d/%Y"
+
+
+def test_format_is_reinferred_when_the_hit_rate_drops():
+    parse_dates(pd.Series(["03/06/2024"] * 5), "SRC", "d")
+    assert dates._format_cache[("SRC", "d")] == "%d/%m/%Y"
+
+    # The source switched to ISO dates; one old-style value is left
+    values = pd.Series(["2024-06-04"] * 9 + ["05/06/2024"])
+    parsed = parse_dates(values, "SRC", "d")
+    assert dates._format_cache[("SRC", "d")] == "%Y-%m-%d"
+    assert _days(parsed) == ["2024-06-04"] * 9 + ["2024-06-05"]
+
+
+def test_cache_is_per_source_and_column():
+    parse_dates(pd.Series(["03/06/2024"]), "SRC", "d")
+    parse_dates(pd.Series(["06/13/2024"]), "SRC", "m", dayfirst=False)
+    parse_dates(pd.Series(["2024-06-03"]), "OTHER", "d")
+    assert dates._format_cache == {
+        ("SRC", "d"): "%d/%m/%Y",
+        ("SRC", "m"): "%m/%d/%Y",
+        ("OTHER", "d"): "%Y-%m-%d",
+    }
+
+
+def test_datetimes_and_numbers_are_not_text():
+    values = pd.Series([datetime(2024, 6, 3), "04/06/2024", None], dtype=object)
+    parsed = parse_dates(values, "SRC", "d")
+    assert _days(parsed) == ["2024-06-03", "2024-06-04", None]
+    already = pd.Series(pd.to_datetime(["2024-06-03"]))
+    assert parse_dates(already, "SRC", "d").dates is already
+
+
+def test_collect_coerced_counts_per_column():
+    with collect_coerced() as counts:
+        parse_dates(pd.Series(["03/06/2024", "x"]), "SRC", "a")
+        parse_dates(pd.Series(["y", "z"]), "SRC", "b")
+        parse_dates(pd.Series(["q"]), "SRC", "a")
+        # Nothing coerced, nothing recorded
+        parse_dates(pd.Series(["03/06/2024"]), "SRC", "c")
+    assert counts == {"SRC.a": 2, "SRC.b": 2}
+
+
+def test_collect_coerced_nests_and_stops_at_the_block():
+    with collect_coerced() as outer:
+        parse_dates(pd.Series(["x"]), "SRC", "a")
+        with collect_coerced() as inner:
+            parse_dates(pd.Series(["y"]), "SRC", "b")
+        parse_dates(pd.Series(["z"]), "SRC", "a")
+    parse_dates(pd.Series(["w"]), "SRC", "a")
+    assert inner == {"SRC.b": 1}
+    assert outer == {"SRC.a": 2}
+    assert dates._coerced is None
@@ -0,0 +1,145 @@
+# test_fact_reads.py
+"""
+Keyset pages of GET /facts/{table}, their ETags and the page cache.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import fact_reads
+import main
+from conftest import create_tables
+
+TABLE = "fact_aging"
+
+
+@pytest.fixture
+def engine(monkeypatch, sqlite_engine):
+    create_tables(sqlite_engine, TABLE, "ingest_jobs")
+    monkeypatch.setattr(fact_reads, "engine", sqlite_engine)
+    monkeypatch.setattr(fact_reads, "_pages", fact_reads.OrderedDict())
+    monkeypatch.setattr(fact_reads, "_pages_bytes", 0)
+    monkeypatch.setattr(fact_reads, "_versions", {})
+    # Ids out of snapshot order: the later snapshot was loaded first
+    _insert(sqlite_engine, date(2024, 2, 29), ["1", "2", "3"])
+    _insert(sqlite_engine, date(2024, 1, 31), ["4", "5"])
+    _finish_job(sqlite_engine, "batch-1")
+    return sqlite_engine
+
+
+def _insert(engine, snapshot_date: date, materials: list[str]) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO {TABLE} (matnr, werks, snapshot_date)
+                VALUES (:matnr, '1000', :snapshot_date)
+                """
+            ),
+            [{"matnr": m, "snapshot_date": snapshot_date} for m in materials],
+        )
+
+
+def _finish_job(engine, batch_id: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO ingest_jobs (job_id, source, upload_batch_id,
+                    snapshot_date, file_paths, status, attempts, created_at,
+                    finished_at)
+                VALUES (:batch, 'ZMMR014', :batch, '2024-02-29', '[]',
+                    'done', 1, NOW(3), NOW(3))
+                """
+            ),
+            {"batch": batch_id},
+        )
+
+
+def test_keyset_pages_cover_every_row_once(engine):
+    version = fact_reads.data_version(TABLE)
+    seen = []
+    after = None
+    while True:
+        page = json.loads(fact_reads.read_page(TABLE, {}, after, 2, version))
+        seen.extend((row["snapshot_date"], row["matnr"]) for row in page["rows"])
+        if page["next"] is None:
+            break
+        after = fact_reads.parse_cursor(page["next"])
+
+    assert seen == [
+        ("2024-01-31", "4"),
+        ("2024-01-31", "5"),
+        ("2024-02-29", "1"),
+        ("2024-02-29", "2"),
+        ("2024-02-29", "3"),
+    ]
+
+
+def test_filters_apply_to_every_page(engine):
+    version = fact_reads.data_version(TABLE)
+    filters = {"snapshot_date": date(2024, 2, 29)}
+    first = json.loads(fact_reads.read_page(TABLE, filters, None, 2, version))
+    after = fact_reads.parse_cursor(first["next"])
+    second = json.loads(fact_reads.read_page(TABLE, filters, after, 2, version))
+    assert [row["matnr"] for row in first["rows"] + second["rows"]] == [
+        "1",
+        "2",
+        "3",
+    ]
+    assert second["next"] is None
+
+
+def test_etag_answers_304_until_a_new_batch_lands(monkeypatch, engine):
+    monkeypatch.setattr(fact_reads, "READ_VERSION_TTL_SECONDS", 0)
+    client = TestClient(main.app)
+    url = f"/facts/{TABLE}?limit=2"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    unchanged = client.get(url, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+
+    _finish_job(engine, "batch-2")
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_bad_cursor_is_rejected(engine):
+    client = TestClient(main.app)
+    assert client.get(f"/facts/{TABLE}?after=yesterday").status_code == 400
+
+
+def test_data_version_is_reused_within_its_ttl(monkeypatch, engine):
+    monkeypatch.setattr(fact_reads, "READ_VERSION_TTL_SECONDS", 60)
+    version = fact_reads.data_version(TABLE)
+    _finish_job(engine, "batch-2")
+    assert fact_reads.data_version(TABLE) == version
+
+    monkeypatch.setattr(fact_reads, "READ_VERSION_TTL_SECONDS", 0)
+    assert fact_reads.data_version(TABLE).startswith("batch-2:")
+
+
+def test_page_cache_is_bounded_by_bytes(monkeypatch, engine):
+    version = fact_reads.data_version(TABLE)
+    page = fact_reads.read_page(TABLE, {}, None, 1, version)
+    monkeypatch.setattr(fact_reads, "READ_CACHE_BYTES", 2 * len(page) + 1)
+    monkeypatch.setattr(fact_reads, "_pages", fact_reads.OrderedDict())
+    monkeypatch.setattr(fact_reads, "_pages_bytes", 0)
+
+    for matnr in ("1", "2", "3"):
+        fact_reads.read_page(TABLE, {"matnr": matnr}, None, 1, version)
+    assert fact_reads._pages_bytes <= fact_reads.READ_CACHE_BYTES
+    assert [dict(key[1])["matnr"] for key in fact_reads._pages] == ["2", "3"]
+
+    # A page larger than the whole budget is served but not kept
+    fact_reads.read_page(TABLE, {}, None, 5, version)
+    assert len(fact_reads._pages) == 2
@@ -0,0 +1,114 @@
+# test_final_aging.py
+"""
+combine_aging: the as-of joins to ZMMR015 Power and Odoo and the choice
+of the earliest date of income.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+
+from final_aging import combine_aging
+
+SNAPSHOT = date(2024, 6, 30)
+
+
+def _aging(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "werks": werks,
+                "matnr": matnr,
+                "date_of_income": pd.NaT if income is None else pd.Timestamp(income),
+                "days": days,
+                "aging_qty": 1,
+            }
+            for werks, matnr, income, days in rows
+        ]
+    )
+
+
+def _power(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["werks", "matnr", "date_of_income"])
+
+
+def _odoo(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["product_code", "last_incoming"])
+
+
+def _final(df: pd.DataFrame) -> list[tuple]:
+    return [
+        (row.final_source, str(row.date_of_income), row.days, row.aging_bucket)
+        for row in df.itertuples()
+    ]
+
+
+def test_power_joins_on_plant_and_material():
+    aging = _aging(
+        [
+            ("1000", "000000000000000123", "2024-01-01", 181),
+            ("2000", "123", "2024-01-01", 181),
+        ]
+    )
+    power = _power([(" 1000", "123", "2020-01-01")])
+    result = combine_aging(aging, power, _odoo([]), SNAPSHOT)
+    assert _final(result) == [
+        ("ZMMR015_POWER", "2020-01-01", 181 + 1461, "2-5Y"),
+        ("ZMMR014", "2024-01-01", 181, "0-1Y"),
+    ]
+    assert len(result) == 2
+
+
+def test_earliest_date_wins():
+    aging = _aging(
+        [
+            ("1000", "A", "2024-01-01", 181),
+            ("1000", "B", "2024-01-01", 181),
+            ("1000", "C", "2024-01-01", 181),
+        ]
+    )
+    power = _power(
+        [
+            ("1000", "A", "2023-01-01"),
+            ("1000", "B", "2023-01-01"),
+            # Same day as ZMMR014: ties keep ZMMR014
+            ("1000", "C", "2024-01-01"),
+        ]
+    )
+    odoo = _odoo(
+        [
+            ("A", "2022-01-01"),
+            # After the ZMMR014 date: not the receipt of this stock
+            ("B", "2024-03-01"),
+            # The latest date on or before ZMMR014's, not the earliest
+            ("A", "2021-01-01"),
+        ]
+    )
+    result = combine_aging(aging, power, odoo, SNAPSHOT)
+    assert [(r[0], r[1]) for r in _final(result)] == [
+        ("ODOO_AGING", "2022-01-01"),
+        ("ZMMR015_POWER", "2023-01-01"),
+        ("ZMMR014", "2024-01-01"),
+    ]
+    odoo_dates = [None if pd.isna(d) else d for d in result["odoo_last_incoming"]]
+    assert odoo_dates == [date(2022, 1, 1), None, None]
+
+
+def test_missing_zmmr014_date_falls_back_to_other_sources():
+    aging = _aging(
+        [
+            ("1000", "124", None, None),
+            ("1000", "125", None, 400),
+            ("1000", "126", None, None),
+        ]
+    )
+    odoo = _odoo([("124", "2022-01-01"), ("124", "2025-01-01")])
+    result = combine_aging(aging, _power([]), odoo, SNAPSHOT)
+    assert _final(result) == [
+        # Latest Odoo date on or before the snapshot, counted from it
+        ("ODOO_AGING", "2022-01-01", 911, "2-5Y"),
+        # No date anywhere: SAP's count stays, or the age is unknown
+        ("ZMMR014", "NaT", 400, "1-2Y"),
+        ("ZMMR014", "NaT", pd.NA, None),
+    ]
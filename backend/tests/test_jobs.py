@@ -0,0 +1,76 @@
+# test_jobs.py
+"""
+Jobs left running by a restart are re-queued once their lease expires.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+import jobs
+from conftest import create_tables
+
+
+@pytest.fixture
+def submitted(monkeypatch, sqlite_engine) -> list[str]:
+    create_tables(sqlite_engine, "ingest_jobs")
+    monkeypatch.setattr(jobs, "engine", sqlite_engine)
+    monkeypatch.setattr(jobs, "_new_pool", lambda: None)
+    calls: list[str] = []
+    monkeypatch.setattr(jobs, "_submit", calls.append)
+    return calls
+
+
+def _running(engine, job_id: str, lease: timedelta) -> None:
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO ingest_jobs (job_id, source, snapshot_date,
+                    file_paths, status, attempts, worker_id,
+                    lease_expires_at, created_at)
+                VALUES (:job_id, 'MB52', '2024-01-31', '[]', 'running', 1,
+                    'old-worker', :lease, :now)
+                """
+            ),
+            {"job_id": job_id, "lease": str(now + lease), "now": str(now)},
+        )
+
+
+def _status(engine, job_id: str) -> str:
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT status FROM ingest_jobs WHERE job_id = :job_id"),
+            {"job_id": job_id},
+        ).scalar_one()
+
+
+def test_expired_lease_is_requeued_at_startup(sqlite_engine, submitted):
+    _running(sqlite_engine, "expired", timedelta(seconds=-1))
+    jobs.start_workers()
+    assert submitted == ["expired"]
+    assert _status(sqlite_engine, "expired") == "queued"
+
+
+def test_unexpired_lease_at_restart_is_recovered_by_the_sweep(
+    sqlite_engine, submitted
+):
+    _running(sqlite_engine, "live", timedelta(minutes=5))
+    jobs.start_workers()
+    assert submitted == []
+    assert _status(sqlite_engine, "live") == "running"
+
+    # The worker holding the lease died in the restart and never renews it
+    with sqlite_engine.begin() as conn:
+        conn.execute(
+            text("UPDATE ingest_jobs SET lease_expires_at = :past"),
+            {"past": str(datetime.now() - timedelta(seconds=1))},
+        )
+    assert jobs.recover_expired_jobs() == ["live"]
+    assert submitted == ["live"]
+    assert _status(sqlite_engine, "live") == "queued"
+    # A second sweep finds nothing left to recover
+    assert jobs.recover_expired_jobs() == []
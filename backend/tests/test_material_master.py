@@ -0,0 +1,115 @@
+# test_material_master.py
+"""
+SCD type 2 versions of dim_material_master.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import material_master
+from conftest import create_tables
+
+JUNE = date(2024, 6, 30)
+JULY = date(2024, 7, 31)
+
+
+@pytest.fixture
+def stale(monkeypatch, sqlite_engine) -> list[date]:
+    create_tables(sqlite_engine, "dim_material_master", "material_master_stats")
+    monkeypatch.setattr(material_master, "engine", sqlite_engine)
+    calls: list[date] = []
+    monkeypatch.setattr(
+        material_master,
+        "mark_stale",
+        lambda conn, snapshot_date, reason: calls.append(snapshot_date),
+    )
+    return calls
+
+
+def _dim(descriptions: dict[str, str]) -> pd.DataFrame:
+    rows = []
+    for code, description in descriptions.items():
+        row = {column: None for column in material_master._VERSION_COLUMNS}
+        row.update(
+            material_code=code,
+            description=description,
+            brand="ACME",
+            is_serialized=False,
+            standard_price=1.5,
+        )
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _build(descriptions: dict[str, str], snapshot_date: date, batch: str) -> int:
+    return material_master._write_versions(_dim(descriptions), batch, snapshot_date)
+
+
+def _versions(engine) -> list[tuple]:
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                """
+                SELECT material_code, description, valid_from, valid_to,
+                       is_current
+                FROM dim_material_master
+                ORDER BY material_code, valid_from
+                """
+            )
+        ).all()
+
+
+def test_first_build_opens_a_version_per_material(sqlite_engine, stale):
+    assert _build({"A": "a", "B": "b"}, JUNE, "b1") == 2
+    assert _versions(sqlite_engine) == [
+        ("A", "a", JUNE, None, 1),
+        ("B", "b", JUNE, None, 1),
+    ]
+    assert stale == [JUNE]
+
+
+def test_unchanged_materials_are_not_written(sqlite_engine, stale):
+    _build({"A": "a", "B": "b"}, JUNE, "b1")
+    assert _build({"A": "a", "B": "b"}, JULY, "b2") == 0
+    assert len(_versions(sqlite_engine)) == 2
+    # Nothing changed, rollups stay fresh
+    assert stale == [JUNE]
+
+
+def test_changed_new_and_removed_materials(sqlite_engine, stale):
+    _build({"A": "a", "B": "b", "C": "c"}, JUNE, "b1")
+    # A changes, B stays, C is gone, D is new
+    assert _build({"A": "a2", "B": "b", "D": "d"}, JULY, "b2") == 2
+    assert _versions(sqlite_engine) == [
+        ("A", "a", JUNE, JULY, 0),
+        ("A", "a2", JULY, None, 1),
+        ("B", "b", JUNE, None, 1),
+        ("C", "c", JUNE, JULY, 0),
+        ("D", "d", JULY, None, 1),
+    ]
+    assert stale == [JUNE, JULY]
+
+
+def test_same_day_rebuild_replaces_the_version(sqlite_engine, stale):
+    _build({"A": "a"}, JUNE, "b1")
+    _build({"A": "a2"}, JULY, "b2")
+    _build({"A": "a3"}, JULY, "b3")
+    assert _versions(sqlite_engine) == [
+        ("A", "a", JUNE, JULY, 0),
+        ("A", "a3", JULY, None, 1),
+    ]
+
+
+def test_out_of_order_snapshot_is_rejected(sqlite_engine, stale):
+    _build({"A": "a"}, JULY, "b1")
+    with pytest.raises(ValueError, match="older than the current version"):
+        _build({"A": "a2"}, JUNE, "b2")
+    # Nothing written, no stats recorded
+    assert _versions(sqlite_engine) == [("A", "a", JULY, None, 1)]
+    with sqlite_engine.connect() as conn:
+        stats = conn.execute(text("SELECT COUNT(*) FROM material_master_stats"))
+        assert stats.scalar() == 1
@@ -0,0 +1,98 @@
+# test_migrations.py
+"""
+Replaying every migration on an empty database gives the tables schema.py
+declares.
+"""
+from __future__ import annotations
+
+import re
+
+import pytest
+
+import migrations
+from schema import TABLES
+
+
+class _Result:
+    rowcount = 0
+
+    def __iter__(self):
+        return iter(())
+
+    def scalar(self):
+        return None
+
+    def scalars(self):
+        return iter(())
+
+
+class _RecordingConnection:
+    """
+    Records the DDL migrations send, as to an empty database.
+    """
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return _Result()
+
+
+_ADD_COLUMN = re.compile(
+    r"ADD COLUMN IF NOT EXISTS `(\w+)`\s+(.+?)(?:\s+AFTER `(\w+)`)?\s*(?:,|$)",
+    re.S,
+)
+
+
+def _replay(statements: list[str]) -> dict[str, list[tuple[str, str]]]:
+    """
+    {table: [(column, base type)]} after the CREATE TABLE and ALTER TABLE
+    ... ADD COLUMN statements, in column order.
+    """
+    tables: dict[str, list[tuple[str, str]]] = {}
+    for sql in statements:
+        sql = sql.strip()
+        create = re.match(r"CREATE TABLE IF NOT EXISTS `?(\w+)`?", sql)
+        alter = re.match(r"ALTER TABLE `?(\w+)`?", sql)
+        if create:
+            columns, _ = migrations._declared_columns(sql)
+            tables[create.group(1)] = [
+                (name, migrations._base_type(decl)) for name, decl in columns
+            ]
+        elif alter and "ADD COLUMN" in sql:
+            columns = tables[alter.group(1)]
+            for name, decl, after in _ADD_COLUMN.findall(sql):
+                column = (name, migrations._base_type(decl))
+                if after:
+                    position = [c for c, _ in columns].index(after) + 1
+                    columns.insert(position, column)
+                else:
+                    columns.append(column)
+    return tables
+
+
+@pytest.fixture
+def replayed(monkeypatch) -> dict[str, list[tuple[str, str]]]:
+    # Data backfills and partitioning change no columns
+    monkeypatch.setattr(migrations, "backfill_versions", lambda conn: None)
+    monkeypatch.setattr(migrations, "backfill_rollups", lambda conn: None)
+    monkeypatch.setattr(
+        migrations, "partition_existing_tables", lambda conn, tables: None
+    )
+    conn = _RecordingConnection()
+    for _, _, migrate in migrations.MIGRATIONS:
+        migrate(conn)
+    return _replay(conn.statements)
+
+
+def test_migrations_create_every_declared_table(replayed):
+    assert sorted(replayed) == sorted(TABLES)
+
+
+@pytest.mark.parametrize("table", sorted(TABLES))
+def test_migrated_columns_match_schema(replayed, table):
+    declared = [
+        (name, migrations._base_type(decl)) for name, decl in TABLES[table].all_columns
+    ]
+    assert replayed[table] == declared
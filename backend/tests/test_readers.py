@@ -0,0 +1,77 @@
+# test_readers.py
+"""
+Reader backends yield the same frames whatever the chunking or engine.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.csv as pa_csv
+import pytest
+
+import readers
+
+FRAME = pd.DataFrame(
+    {
+        "Material": ["000123", "124", "125", "126", "127", "128"],
+        # Whole numbers in the first rows only: a reader inferring from
+        # the first block would fail on 2.5
+        "Qty": [1, 2, 3, 4, 2.5, None],
+        # Numbers first, text later
+        "Batch": ["1", "2", "3", "4", "5", "A6"],
+        "Posted": ["2024-01-31"] * 3 + [None, "2024-02-29", "2024-03-31"],
+    }
+)
+
+
+@pytest.fixture
+def csv_file(monkeypatch, tmp_path: Path) -> Path:
+    path = tmp_path / "small_blocks.csv"
+    FRAME.to_csv(path, index=False)
+    options = readers._csv_options()
+    # A block of a row or two, so the file streams in many batches
+    options["read_options"] = pa_csv.ReadOptions(
+        encoding=readers.CSV_ENCODING, block_size=40
+    )
+    monkeypatch.setattr(readers, "_csv_options", lambda: options)
+    return path
+
+
+def test_csv_types_fit_every_block(csv_file):
+    [whole] = readers.read_csv_chunks(csv_file, 0)
+    assert whole["Qty"].tolist()[:5] == [1.0, 2.0, 3.0, 4.0, 2.5]
+    assert whole["Batch"].tolist() == ["1", "2", "3", "4", "5", "A6"]
+    assert str(whole["Posted"].dtype).startswith("datetime64")
+    # Text columns keep their leading zeros
+    [text] = readers.read_csv_chunks(csv_file, 0, dtype={"Material": str})
+    assert text["Material"].iloc[0] == "000123"
+
+
+@pytest.mark.parametrize("chunksize", [1, 4, 100])
+def test_csv_chunks_match_whole_file(csv_file, chunksize):
+    [whole] = readers.read_csv_chunks(csv_file, 0)
+    chunks = list(readers.read_csv_chunks(csv_file, chunksize))
+    assert [len(c) for c in chunks[:-1]] == [chunksize] * (len(chunks) - 1)
+    chunked = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_csv_usecols_reads_only_those_columns(csv_file):
+    [frame] = readers.read_csv_chunks(csv_file, 0, usecols={"Qty"}.__contains__)
+    assert list(frame.columns) == ["Qty"]
+
+
+def test_calamine_matches_openpyxl(monkeypatch, tmp_path: Path):
+    pytest.importorskip("python_calamine")
+    path = tmp_path / "book.xlsx"
+    FRAME.assign(Posted=pd.to_datetime(FRAME["Posted"])).to_excel(
+        path, index=False
+    )
+    dtype = {"Material": str}
+
+    monkeypatch.setattr(readers, "EXCEL_ENGINE", "openpyxl")
+    [openpyxl] = readers.read_excel_chunks(path, 0, dtype=dtype)
+    monkeypatch.setattr(readers, "EXCEL_ENGINE", "calamine")
+    [calamine] = readers.read_excel_chunks(path, 0, dtype=dtype)
+    pd.testing.assert_frame_equal(calamine, openpyxl, check_dtype=False)
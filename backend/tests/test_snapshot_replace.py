@@ -0,0 +1,147 @@
+# test_snapshot_replace.py
+"""
+A replace swaps one snapshot for another without doubling it, and
+readers see the old snapshot until the swap commits.
+
+SQLite has no EXCHANGE PARTITION; these cover the row-copy path.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+import snapshot_replace
+from bulk_writer import target_table
+from conftest import create_tables
+
+SNAPSHOT = date(2024, 1, 31)
+OTHER = date(2024, 1, 15)
+
+
+@pytest.fixture
+def engine(monkeypatch, sqlite_engine):
+    create_tables(
+        sqlite_engine, "raw_mb52", "fact_inventory_snapshot", "upload_catalog"
+    )
+
+    def create_staging(conn, table, staging):
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        conn.execute(text(f"CREATE TABLE {staging} AS SELECT * FROM {table} WHERE 0"))
+
+    monkeypatch.setattr(snapshot_replace, "engine", sqlite_engine)
+    monkeypatch.setattr(snapshot_replace, "_create_staging", create_staging)
+    monkeypatch.setattr(
+        snapshot_replace, "_exchangeable_partition", lambda *args: None
+    )
+    _insert(sqlite_engine, SNAPSHOT, "old", ["1", "2", "3"])
+    _insert(sqlite_engine, OTHER, "other", ["4", "5"])
+    with sqlite_engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO upload_catalog (file_sha256, source, snapshot_date,
+                    upload_batch_id, created_at)
+                VALUES ('abc', 'MB52', :snapshot_date, 'old', '2024-02-01')
+                """
+            ),
+            {"snapshot_date": SNAPSHOT},
+        )
+    return sqlite_engine
+
+
+def _insert(engine, snapshot_date, batch, materials, raw=None, fact=None):
+    rows = [
+        {"batch": batch, "matnr": m, "snapshot_date": snapshot_date}
+        for m in materials
+    ]
+    raw = raw or "raw_mb52"
+    fact = fact or "fact_inventory_snapshot"
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO {raw} (upload_batch_id, matnr, snapshot_date)
+                VALUES (:batch, :matnr, :snapshot_date)
+                """
+            ),
+            rows,
+        )
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO {fact} (upload_batch_id, matnr, snapshot_date, source)
+                VALUES (:batch, :matnr, :snapshot_date, 'MB52')
+                """
+            ),
+            rows,
+        )
+
+
+def _batches(engine, table: str) -> dict[str, int]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                f"""
+                SELECT upload_batch_id, COUNT(*) FROM {table}
+                GROUP BY upload_batch_id
+                """
+            )
+        )
+        return dict(rows.all())
+
+
+def test_replace_swaps_the_snapshot_without_doubling(engine):
+    with snapshot_replace.replace_snapshot("MB52", SNAPSHOT, "new-batch"):
+        _insert(
+            engine,
+            SNAPSHOT,
+            "new",
+            ["1", "2"],
+            raw=target_table("raw_mb52"),
+            fact=target_table("fact_inventory_snapshot"),
+        )
+        # Nothing reaches the live tables before the swap
+        assert _batches(engine, "raw_mb52") == {"old": 3, "other": 2}
+
+    for table in ("raw_mb52", "fact_inventory_snapshot"):
+        assert _batches(engine, table) == {"new": 2, "other": 2}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM upload_catalog")).scalar() == 0
+        # Staging tables are dropped
+        names = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE name LIKE '%__stg_%'")
+        ).all()
+    assert names == []
+
+
+def test_old_snapshot_is_visible_until_the_swap_commits(monkeypatch, engine):
+    seen = []
+    copy_rows = snapshot_replace._copy_rows
+
+    def copy_and_look(conn, table, staging, params):
+        copy_rows(conn, table, staging, params)
+        # Another connection still reads the old snapshot
+        seen.append(_batches(engine, table))
+
+    monkeypatch.setattr(snapshot_replace, "_copy_rows", copy_and_look)
+    with snapshot_replace.replace_snapshot("MB52", SNAPSHOT, "new-batch"):
+        _insert(
+            engine,
+            SNAPSHOT,
+            "new",
+            ["1"],
+            raw=target_table("raw_mb52"),
+            fact=target_table("fact_inventory_snapshot"),
+        )
+
+    assert seen == [{"old": 3, "other": 2}, {"old": 3, "other": 2}]
+    assert _batches(engine, "fact_inventory_snapshot") == {"new": 1, "other": 2}
+
+
+def test_failed_load_leaves_the_old_snapshot(engine):
+    with pytest.raises(RuntimeError):
+        with snapshot_replace.replace_snapshot("MB52", SNAPSHOT, "new-batch"):
+            raise RuntimeError("load failed")
+    assert _batches(engine, "raw_mb52") == {"old": 3, "other": 2}
@@ -0,0 +1,153 @@
+# test_source_spec.py
+"""
+A chunked load stores exactly what a whole-file load stores.
+
+    python -m pytest backend/tests
+"""
+from __future__ import annotations
+
+import dataclasses
+import sys
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import source_spec  # noqa: E402
+from conftest import create_tables  # noqa: E402
+from mb52 import MB52_SPEC  # noqa: E402
+from schema import TABLES  # noqa: E402
+from zmmr014 import ZMMR014_SPEC  # noqa: E402
+from zsdr030a import ZSDR030A_SPEC  # noqa: E402
+
+# MB52 with a text column and no server-side derivation, which needs
+# MariaDB
+SPEC = dataclasses.replace(
+    MB52_SPEC, kinds={**MB52_SPEC.kinds, "mat_desc": "text"}, derived=()
+)
+
+
+@pytest.fixture(params=[".xlsx", ".csv"])
+def source_file(request, tmp_path: Path) -> Path:
+    path = tmp_path / f"mb52{request.param}"
+    frame = pd.DataFrame(
+        {
+            "Plant": ["1000", "1000", "2000", "2000", "2000"],
+            "Material": ["000123", "124", "125", "126", "127"],
+            # Whole-file inference makes this float (blank); chunks of
+            # two would be int, int, float
+            "Batch": pd.array([123, 124, 125, None, 126], dtype="Int64"),
+            # Blank in the whole second chunk only
+            "Material Description": ["A", "B", None, None, "E"],
+            "Unrestricted": ["1,000", "2", "3.5", "", "5"],
+        }
+    )
+    if path.suffix == ".csv":
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_excel(path, index=False)
+    return path
+
+
+def _load(monkeypatch, path: Path, chunksize: int) -> pd.DataFrame:
+    engine = create_engine("sqlite://")
+    # Declared types, so the stored values do not depend on the first chunk
+    columns = ", ".join(
+        f"{name} {decl.split()[0]}" for name, decl in TABLES["raw_mb52"].columns
+    )
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE raw_mb52 ({columns})"))
+    monkeypatch.setattr(source_spec, "engine", engine)
+    rows = source_spec.run_source(SPEC, path, "batch", date(2024, 1, 31), chunksize)
+    assert rows == 5
+    return pd.read_sql("SELECT * FROM raw_mb52", engine)
+
+
+def _values(column: pd.Series) -> list:
+    return [None if pd.isna(v) else v for v in column]
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 3])
+def test_chunked_load_matches_whole_file(monkeypatch, source_file, chunksize):
+    whole = _load(monkeypatch, source_file, 0)
+    chunked = _load(monkeypatch, source_file, chunksize)
+    pd.testing.assert_frame_equal(chunked, whole)
+    assert _values(whole["charg"]) == ["123", "124", "125", None, "126"]
+    assert _values(whole["mat_desc"]) == ["A", "B", None, None, "E"]
+
+
+# Files of the other sources, each with blanks confined to some chunks
+SOURCE_FILES = {
+    "ZSDR030A": (
+        ZSDR030A_SPEC,
+        {
+            "Sales doc.": ["5001", "5001", "5002", "5003", "5004"],
+            "Document Date": ["31/01/2024", "", "01/02/2024", "", "13/02/2024"],
+            "Material": ["000123", "124", None, "126", "127"],
+            "Mat. Desc.": ["A", None, None, "D", "E"],
+            "Storage Location": ["0001", "0001", "0002", None, "0003"],
+            "Open SO QTY": pd.array([10, None, 30, 40, None], dtype="Int64"),
+            "SO Amount": [100.5, 200, None, 400, 500],
+            "Currency": ["USD", "USD", "EUR", None, "EUR"],
+        },
+    ),
+    "ZMMR014": (
+        ZMMR014_SPEC,
+        {
+            "Plant": ["1000", "1000", "2000", "2000", "2000"],
+            "Material#": ["000123", "124", "125", "126", "127"],
+            "Description": ["A", "B", "C", "D", "E"],
+            "MOVEMENT TYPE": pd.array([101, None, None, 261, 101], dtype="Int64"),
+            "Date of Income": ["31/01/2020", "", "", "15/06/2023", "01/01/2010"],
+            "Days": pd.array([1461, None, None, 230, 5143], dtype="Int64"),
+            "Aging Qty.": [1, 2, None, 4, 5],
+            "Std. Price": [1.5, 2.5, 3.5, None, 5.5],
+            "Currency": ["USD", "USD", "USD", "EUR", "EUR"],
+            "Aging Val.": [1.5, 5, None, 0, 27.5],
+        },
+    ),
+}
+
+
+def _load_tables(monkeypatch, spec, path: Path, chunksize: int) -> dict:
+    engine = create_engine("sqlite://")
+    create_tables(engine, *spec.tables)
+    monkeypatch.setattr(source_spec, "engine", engine)
+    rows = source_spec.run_source(spec, path, "batch", date(2024, 2, 29), chunksize)
+    assert rows == 5
+    return {
+        table: pd.read_sql(f"SELECT * FROM {table} ORDER BY id", engine)
+        for table in spec.tables
+    }
+
+
+@pytest.mark.parametrize("chunksize", [1, 2])
+@pytest.mark.parametrize("suffix", [".xlsx", ".csv"])
+@pytest.mark.parametrize("name", sorted(SOURCE_FILES))
+def test_chunked_source_load_matches_whole_file(
+    monkeypatch, tmp_path, name, suffix, chunksize
+):
+    spec, columns = SOURCE_FILES[name]
+    path = tmp_path / f"{name}{suffix}"
+    if suffix == ".csv":
+        pd.DataFrame(columns).to_csv(path, index=False)
+    else:
+        pd.DataFrame(columns).to_excel(path, index=False)
+
+    whole = _load_tables(monkeypatch, spec, path, 0)
+    chunked = _load_tables(monkeypatch, spec, path, chunksize)
+    for table in spec.tables:
+        pd.testing.assert_frame_equal(chunked[table], whole[table], obj=table)
+
+    raw = whole[spec.tables[0]]
+    assert _values(raw["matnr"])[:2] == ["000123", "124"]
+    if name == "ZSDR030A":
+        blank = [d is None for d in _values(raw["document_date"])]
+        assert blank == [False, True, False, True, False]
+    else:
+        blank = [d is None for d in _values(raw["date_of_income"])]
+        assert blank == [False, True, True, False, False]
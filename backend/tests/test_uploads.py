@@ -0,0 +1,102 @@
+# test_uploads.py
+"""
+Uploads are content-addressed; the same files for the same snapshot are
+queued once, including the five files of a material master build.
+"""
+from __future__ import annotations
+
+import io
+from datetime import date
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import jobs
+import main
+import upload_store
+from conftest import create_tables
+from upload_store import StoredUpload, combine_uploads
+
+MATERIAL_MASTER_FILES = (
+    "zmm345e_file",
+    "storage_location_file",
+    "material_group_file",
+    "material_type_file",
+    "mkvz_file",
+)
+
+
+@pytest.fixture
+def client(monkeypatch, sqlite_engine, tmp_path: Path) -> TestClient:
+    create_tables(sqlite_engine, "ingest_jobs", "upload_catalog")
+    monkeypatch.setattr(jobs, "engine", sqlite_engine)
+    monkeypatch.setattr(jobs, "_submit", lambda job_id: None)
+    monkeypatch.setattr(upload_store, "engine", sqlite_engine)
+    monkeypatch.setattr(upload_store, "UPLOAD_DIR", tmp_path / "uploads")
+    return TestClient(main.app)
+
+
+def _material_master(client: TestClient, contents: dict[str, bytes] | None = None):
+    files = {
+        name: (f"{name}.xlsx", io.BytesIO((contents or {}).get(name, name.encode())))
+        for name in MATERIAL_MASTER_FILES
+    }
+    return client.post(
+        "/upload_material_master", files=files, data={"snapshot_date": "2024-06-30"}
+    )
+
+
+def test_combined_hash_covers_files_and_roles():
+    a = StoredUpload(Path("a"), "1" * 64, 10)
+    b = StoredUpload(Path("b"), "2" * 64, 5)
+    combined = combine_uploads({"x": a, "y": b})
+    assert combined.size == 15
+    assert combined.sha256 == combine_uploads({"y": b, "x": a}).sha256
+    assert combined.sha256 != combine_uploads({"x": b, "y": a}).sha256
+
+
+def test_material_master_upload_is_deduplicated(client):
+    first = _material_master(client)
+    assert first.status_code == 202
+    assert first.json()["status"] == "queued"
+
+    # Same files while the first job is still queued: that job
+    again = _material_master(client).json()
+    assert again["job_id"] == first.json()["job_id"]
+
+    # One file differs: a new job
+    changed = _material_master(client, {"mkvz_file": b"other vendors"}).json()
+    assert changed["status"] == "queued"
+    assert changed["job_id"] != first.json()["job_id"]
+
+
+def test_loaded_material_master_upload_is_a_duplicate(client, sqlite_engine):
+    first = _material_master(client).json()
+    # What _finish_job records for a done job (its upsert is MariaDB-only)
+    job = jobs.get_job(first["job_id"])
+    with sqlite_engine.begin() as conn:
+        conn.execute(
+            text("UPDATE ingest_jobs SET status = 'done' WHERE job_id = :job_id"),
+            {"job_id": first["job_id"]},
+        )
+        conn.execute(
+            text(
+                """
+                INSERT INTO upload_catalog (file_sha256, source, snapshot_date,
+                    upload_batch_id, file_bytes, created_at)
+                VALUES (:sha, 'MATERIAL_MASTER', :snapshot_date, :batch, 1, NOW(3))
+                """
+            ),
+            {
+                "sha": job["file_sha256"],
+                "snapshot_date": date(2024, 6, 30),
+                "batch": first["batch_id"],
+            },
+        )
+
+    again = _material_master(client)
+    assert again.status_code == 200
+    assert again.json()["status"] == "duplicate"
+    assert again.json()["batch_id"] == first["batch_id"]
@@ -0,0 +1,232 @@
+# upload_store.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import BinaryIO
+
+from sqlalchemy import text
+
+from db import engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "/tmp/uploads"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# 0 disables the limit
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+
+# Garbage collection: files older than the retention window are removed,
+# then the oldest files go until the store fits in UPLOAD_STORE_MAX_BYTES.
+UPLOAD_RETENTION_HOURS = float(os.getenv("UPLOAD_RETENTION_HOURS", "72"))
+UPLOAD_STORE_MAX_BYTES = int(
+    os.getenv("UPLOAD_STORE_MAX_BYTES", str(20 * 1024 * 1024 * 1024))
+)
+UPLOAD_GC_INTERVAL_SECONDS = int(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", "3600"))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    sha256: str
+    size: int
+
+
+# -------------------------------------------------------------------
+# Content-addressed store
+# -------------------------------------------------------------------
+
+
+def _content_path(sha256: str, filename: str | None) -> Path:
+    suffix = Path(filename or "").suffix.lower()
+    return UPLOAD_DIR / sha256[:2] / f"{sha256}{suffix}"
+
+
+def save_upload(stream: BinaryIO, filename: str | None) -> StoredUpload:
+    """
+    Copy stream into the store in fixed-size chunks, hashing as we go,
+    and file it under its SHA-256. Identical content is stored once.
+    """
+    tmp_dir = UPLOAD_DIR / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_dir / f"{uuid.uuid4()}.part"
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            while chunk := stream.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if MAX_UPLOAD_BYTES and size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    sha256 = digest.hexdigest()
+    path = _content_path(sha256, filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        tmp_path.unlink()
+        # Refresh mtime so the garbage collector treats it as recent
+        path.touch()
+    else:
+        os.replace(tmp_path, path)
+
+    return StoredUpload(path=path, sha256=sha256, size=size)
+
+
+def combine_uploads(uploads: dict[str, StoredUpload]) -> StoredUpload:
+    """
+    One StoredUpload for a load built from several files, keyed by the
+    role each was uploaded as. Its hash covers every file in its role, so
+    dedup and the catalog treat the set as one upload; its size is the
+    total and its path the first file's.
+    """
+    digest = hashlib.sha256()
+    for role, upload in sorted(uploads.items()):
+        digest.update(f"{role}={upload.sha256}\n".encode())
+    return StoredUpload(
+        path=next(iter(uploads.values())).path,
+        sha256=digest.hexdigest(),
+        size=sum(upload.size for upload in uploads.values()),
+    )
+
+
+# -------------------------------------------------------------------
+# Catalog (hash -> source -> batch_id -> snapshot_date)
+# -------------------------------------------------------------------
+
+
+def find_cataloged_batch(
+    file_sha256: str, source: str, snapshot_date: date
+) -> str | None:
+    """
+    Batch id of an earlier successful load of the same file, if any.
+    """
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                """
+                SELECT upload_batch_id FROM upload_catalog
+                WHERE file_sha256 = :sha AND source = :source
+                  AND snapshot_date = :snapshot_date
+                """
+            ),
+            {"sha": file_sha256, "source": source, "snapshot_date": snapshot_date},
+        ).scalar()
+
+
+def record_catalog(
+    conn,
+    file_sha256: str,
+    source: str,
+    snapshot_date: date,
+    upload_batch_id: str,
+    file_bytes: int | None,
+) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO upload_catalog
+                (file_sha256, source, snapshot_date, upload_batch_id,
+                 file_bytes, created_at)
+            VALUES (:sha, :source, :snapshot_date, :batch_id, :bytes, NOW(3))
+            ON DUPLICATE KEY UPDATE
+                upload_batch_id = VALUES(upload_batch_id),
+                file_bytes = VALUES(file_bytes),
+                created_at = VALUES(created_at)
+            """
+        ),
+        {
+            "sha": file_sha256,
+            "source": source,
+            "snapshot_date": snapshot_date,
+            "batch_id": upload_batch_id,
+            "bytes": file_bytes,
+        },
+    )
+
+
+# -------------------------------------------------------------------
+# Garbage collection
+# -------------------------------------------------------------------
+
+
+def _pending_paths() -> set[Path]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                """
+                SELECT file_paths FROM ingest_jobs
+                WHERE status IN ('queued', 'running')
+                """
+            )
+        ).scalars()
+        return {
+            Path(p).resolve()
+            for file_paths in rows
+            for p in json.loads(file_paths).values()
+        }
+
+
+def collect_garbage() -> dict:
+    """
+    Trim UPLOAD_DIR: drop files past the retention window, then the
+    oldest files until the store is under UPLOAD_STORE_MAX_BYTES. Files
+    still needed by queued or running jobs are never removed.
+    """
+    if not UPLOAD_DIR.exists():
+        return {"removed_files": 0, "removed_bytes": 0, "kept_bytes": 0}
+
+    pending = _pending_paths()
+    cutoff = time.time() - UPLOAD_RETENTION_HOURS * 3600
+
+    files = []
+    for path in UPLOAD_DIR.rglob("*"):
+        if not path.is_file() or path.resolve() in pending:
+            continue
+        st = path.stat()
+        if path.suffix == ".part" and st.st_mtime >= cutoff:
+            # Upload still being written
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    files.sort()
+
+    total = sum(size for _, size, _ in files)
+    removed_files = 0
+    removed_bytes = 0
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= UPLOAD_STORE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed_files += 1
+        removed_bytes += size
+
+    if removed_files:
+        logger.info(
+            "Upload GC removed %d files (%d bytes)", removed_files, removed_bytes
+        )
+    return {
+        "removed_files": removed_files,
+        "removed_bytes": removed_bytes,
+        "kept_bytes": total,
+    }